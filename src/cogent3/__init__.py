@@ -37,8 +37,10 @@ from cogent3.evolve.fast_distance import (
 )
 from cogent3.evolve.models import available_models, get_model
 from cogent3.parse.cogent3_json import load_from_json
+from cogent3.parse.fasta import IndexedFasta, MinimalFastaParser, fasta_to_seqs
 from cogent3.parse.newick import parse_string as newick_parse_string
-from cogent3.parse.sequence import FromFilenameParser
+from cogent3.parse.newick import parse_strings as newick_parse_strings
+from cogent3.parse.sequence import PARSERS, FromFilenameParser
 from cogent3.parse.table import load_delimited
 from cogent3.parse.tree_xml import parse_string as tree_xml_parse_string
 from cogent3.util.misc import get_format_suffixes, open_
@@ -209,6 +211,7 @@ def load_unaligned_seqs(
     label_to_name=None,
     parser_kw=None,
     info=None,
+    lazy=False,
     **kw,
 ):
     """
@@ -226,12 +229,16 @@ def load_unaligned_seqs(
         function for converting original name into another name.
     parser_kw : dict
         optional arguments for the parser
+    lazy : bool
+        applies to uncompressed FASTA only. Returns an ``IndexedFasta``,
+        which reads sequences from the file on demand using a faidx
+        compatible index.
 
     Returns
     -------
-    ``SequenceCollection``
+    ``SequenceCollection``, or ``IndexedFasta`` if lazy
     """
-    file_format, _ = get_format_suffixes(filename)
+    file_format, compress_format = get_format_suffixes(filename)
     if file_format == "json":
         return load_from_json(filename, (SequenceCollection,))
 
@@ -240,6 +247,22 @@ def load_unaligned_seqs(
         msg = "could not determined file format, set using the format argument"
         raise ValueError(msg)
 
+    if lazy:
+        if compress_format or PARSERS.get(format.lower()) is not MinimalFastaParser:
+            raise ValueError("lazy loading requires an uncompressed FASTA file")
+        unsupported = [
+            name
+            for name, value in (
+                ("label_to_name", label_to_name),
+                ("parser_kw", parser_kw),
+                ("info", info),
+            )
+            if value
+        ] + list(kw)
+        if unsupported:
+            raise ValueError(f"lazy loading does not support {unsupported}")
+        return IndexedFasta(filename, moltype=moltype)
+
     parser_kw = parser_kw or {}
     for other_kw in ("constructor_kw", "kw"):
         other_kw = kw.pop(other_kw, None) or {}
@@ -300,6 +323,21 @@ def load_aligned_seqs(
     for other_kw in ("constructor_kw", "kw"):
         other_kw = kw.pop(other_kw, None) or {}
         kw.update(other_kw)
+    is_fasta = PARSERS.get(format.lower()) is MinimalFastaParser
+    if array_align and not parser_kw and is_fasta:
+        # sequence bytes are mapped directly into the alignment array
+        assert isinstance(info or {}, dict), "info must be a dict"
+        info = dict(info or {})
+        info["source"] = filename
+        return fasta_to_seqs(
+            filename,
+            moltype=moltype,
+            label_to_name=label_to_name,
+            info=info,
+            upper=True,
+            **kw,
+        )
+
     data = list(FromFilenameParser(filename, format, **parser_kw))
     return make_aligned_seqs(
         data,
@@ -621,3 +659,31 @@ def load_tree(filename, format=None, underscore_unmunge=False):
             format = "xml"
 
     return make_tree(treestring, format=format, underscore_unmunge=underscore_unmunge)
+
+
+def load_trees(filename, underscore_unmunge=False):
+    """Generates the trees in a file of ';' terminated Newick trees.
+
+    Parameters
+    ----------
+    filename : str
+        a file path, e.g. bootstrap or MCMC samples of trees
+    underscore_unmunge : bool
+        replace underscores with spaces in all names read, i.e. "sp_name"
+        becomes "sp name".
+
+    Returns
+    -------
+    generator of PhyloNode
+    """
+    with open_(filename) as tfile:
+        treestring = tfile.read()
+
+    for tree in newick_parse_strings(
+        treestring,
+        lambda: TreeBuilder().create_edge,
+        underscore_unmunge=underscore_unmunge,
+    ):
+        if not tree.name_loaded:
+            tree.name = "root"
+        yield tree
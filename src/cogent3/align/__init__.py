@@ -4,6 +4,7 @@ from .align import (
     _align_pairwise,
     classic_align_pairwise,
     global_pairwise,
+    global_pairwise_to_ref,
     local_pairwise,
     make_dna_scoring_dict,
     make_generic_scoring_dict,
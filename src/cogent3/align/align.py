@@ -68,9 +68,14 @@ def make_generic_scoring_dict(match, mtype):
 def _align_pairwise(
     s1, s2, mprobs, psub, TM, local, return_alignment=True, return_score=False, **kw
 ):
-    """Generic alignment with any substitution model and indel model"""
-    [p1, p2] = [make_likelihood_tree_leaf(seq) for seq in [s1, s2]]
-    [p1, p2] = [pairwise.AlignableSeq(leaf) for leaf in [p1, p2]]
+    """Generic alignment with any substitution model and indel model
+
+    s1 and s2 can be sequences or pre-built AlignableSeq instances.
+    """
+    [p1, p2] = [
+        s if isinstance(s, pairwise.AlignableSeq) else _make_alignable(s)
+        for s in [s1, s2]
+    ]
     pair = pairwise.Pair(p1, p2)
     EP = pair.make_simple_emission_probs(mprobs, [psub])
     hmm = EP.make_pair_HMM(TM)
@@ -86,17 +91,44 @@ def _align_pairwise(
         return score
 
 
-def classic_align_pairwise(s1, s2, Sd, d, e, local, return_score=False, **kw):
-    """Alignment specified by gap costs and a score matrix"""
+def _make_alignable(seq):
+    return pairwise.AlignableSeq(make_likelihood_tree_leaf(seq))
+
+
+def classic_scoring(Sd, d, e, alpha1, alpha2=None):
+    """returns motif probs, substitution and transition matrices for
+    alignment specified by gap costs and a score matrix
+
+    Parameters
+    ----------
+    Sd : dict
+        scoring dict keyed by (motif1, motif2)
+    d, e
+        gap insertion and extension penalties
+    alpha1, alpha2
+        alphabets of the two sequences, alpha2 defaults to alpha1
+
+    Notes
+    -----
+    The result depends only on the arguments, so can be computed once and
+    reused for aligning many sequence pairs.
+    """
+    alpha2 = alpha1 if alpha2 is None else alpha2
     TM = indel_model.classic_gap_scores(d, e)
-    a1 = s1.moltype.alphabet
-    a2 = s2.moltype.alphabet
-    S = numpy.zeros([len(a1), len(a2)], Float)
-    for (i, m1) in enumerate(a1):
-        for (j, m2) in enumerate(a2):
+    S = numpy.zeros([len(alpha1), len(alpha2)], Float)
+    for (i, m1) in enumerate(alpha1):
+        for (j, m2) in enumerate(alpha2):
             S[i, j] = Sd[m1, m2]
     psub = numpy.exp(S)
     mprobs = numpy.ones(len(psub), Float) / len(psub)
+    return mprobs, psub, TM
+
+
+def classic_align_pairwise(s1, s2, Sd, d, e, local, return_score=False, **kw):
+    """Alignment specified by gap costs and a score matrix"""
+    mprobs, psub, TM = classic_scoring(
+        Sd, d, e, s1.moltype.alphabet, s2.moltype.alphabet
+    )
     return _align_pairwise(
         s1, s2, mprobs, psub, TM, local, return_score=return_score, **kw
     )
@@ -112,3 +144,74 @@ def local_pairwise(s1, s2, S, d, e, return_score=False):
 
 def global_pairwise(s1, s2, S, d, e, return_score=False):
     return classic_align_pairwise(s1, s2, S, d, e, False, return_score=return_score)
+
+
+def _gapped_to_ref(ref, seq, mprobs, psub, TM, gap="-"):
+    """returns gapped string of seq for the positions in ref
+
+    Columns in which ref has a gap (insertions in seq) are discarded.
+    """
+    aln = _align_pairwise(ref, seq, mprobs, psub, TM, False)
+    ref_name = ref.leaf.edge_name
+    name = [n for n in aln.names if n != ref_name][0]
+    gapped_ref = numpy.frombuffer(
+        str(aln.get_gapped_seq(ref_name)).encode("utf8"), dtype=numpy.uint8
+    )
+    gapped_seq = numpy.frombuffer(
+        str(aln.get_gapped_seq(name)).encode("utf8"), dtype=numpy.uint8
+    )
+    return name, gapped_seq[gapped_ref != ord(gap)].tobytes().decode("utf8")
+
+
+def global_pairwise_to_ref(
+    ref_seq, seqs, S, d, e, parallel=False, par_kw=None, gap="-"
+):
+    """aligns every sequence to a single reference sequence
+
+    Parameters
+    ----------
+    ref_seq
+        the reference sequence, must have a name
+    seqs
+        series of sequences to be aligned to ref_seq
+    S : dict
+        scoring dict
+    d, e
+        gap insertion and extension penalties
+    parallel : bool
+        if True, the pairwise alignments are distributed across processes
+    par_kw : dict
+        arguments passed to cogent3.util.parallel.map
+    gap : str
+        the gap character
+
+    Returns
+    -------
+    {name: gapped seq, ...} with gapped sequences the length of ref_seq,
+    including ref_seq itself. Insertions relative to ref_seq are discarded.
+
+    Notes
+    -----
+    The scoring matrices and the alignable form of ref_seq are computed once
+    and reused for all sequences.
+    """
+    from functools import partial
+
+    from cogent3.util import parallel as PAR
+
+    alphabet = ref_seq.moltype.alphabet
+    mprobs, psub, TM = classic_scoring(S, d, e, alphabet)
+    ref = _make_alignable(ref_seq)
+    ref_name = ref.leaf.edge_name
+    to_ref = partial(_gapped_to_ref, ref, mprobs=mprobs, psub=psub, TM=TM, gap=gap)
+    seqs = [seq for seq in seqs if seq.name != ref_name]
+    if parallel:
+        par_kw = dict(par_kw or {})
+        par_kw["if_serial"] = par_kw.get("if_serial", "ignore")
+        results = PAR.map(to_ref, seqs, **par_kw)
+    else:
+        results = [to_ref(seq) for seq in seqs]
+
+    aligned = {ref_name: str(ref_seq)}
+    aligned.update(results)
+    return aligned
@@ -8,6 +8,7 @@ produced by the same code."""
 HIRSCHBERG_LIMIT = 10 ** 8
 
 import warnings
+import weakref
 
 import numpy
 
@@ -472,16 +473,34 @@ class AlignablePOG(_Alignable):
         self.pog = pog
         if children is not None:
             self.aligneds = self._calcAligneds(children)
+            # weak, so sub-alignments are not kept alive by their parent
+            self._children = [weakref.ref(child) for child in children]
+        else:
+            self._children = None
         self.leaf = leaf
 
     def __repr__(self):
         return "AlPOG(%s,%s)" % (self.pog.all_jumps, repr(self.leaf))
 
+    def __getstate__(self):
+        # weak references cannot be pickled
+        state = self.__dict__.copy()
+        state["_children"] = None
+        return state
+
     def get_alignment(self):
         from cogent3 import make_aligned_seqs
 
         return make_aligned_seqs(self.aligneds)
 
+    def get_children(self):
+        """returns the child alignables, or None if unknown or no longer
+        referenced elsewhere"""
+        if self._children is None:
+            return None
+        children = [ref() for ref in self._children]
+        return None if any(child is None for child in children) else children
+
     def _calcAligneds(self, children):
         word_length = self.alphabet.get_motif_len()
         (starts, ends, maps) = map_traceback(self.pog.get_full_aligned_positions())
@@ -1,9 +1,14 @@
 #!/usr/bin/env python
 
+from collections import OrderedDict
+from hashlib import md5
 
 from cogent3 import make_tree
+from cogent3.align.pairwise import AlignablePOG, AlignableSeq
 from cogent3.core.info import Info
-from cogent3.evolve.distance import EstimateDistances
+from cogent3.evolve.distance import EstimateDistances, get_name_combinations
+from cogent3.evolve.fast_distance import DistanceMatrix
+from cogent3.maths.stats.number import NumberCounter
 from cogent3.phylo import nj as NJ
 from cogent3.util import progress_display as UI
 
@@ -18,6 +23,174 @@ __email__ = "pm67nz@gmail.com"
 __status__ = "Production"
 
 
+def _seq_key(name, seq):
+    return name, md5(str(seq).encode("utf8")).hexdigest()
+
+
+def _params_key(model, param_vals, indel_rate, indel_length):
+    params = tuple(sorted((k, repr(v)) for k, v in param_vals.items()))
+    return model.name, params, indel_rate, indel_length
+
+
+def _subtree_keys(tree, seq_keys):
+    """returns {frozenset of tip names: key} for the internal nodes of tree
+
+    The key captures the topology of the subtree and the names and sequences
+    of its tips, ignoring the order of children."""
+    keys = {}
+
+    def subtree_key(node):
+        if node.istip():
+            return seq_keys[node.name]
+        key = frozenset(subtree_key(child) for child in node.children)
+        keys[frozenset(node.get_tip_names())] = key
+        return key
+
+    subtree_key(tree)
+    return keys
+
+
+def _collapse_cached(tree, subtree_keys, pog_cache, params_key):
+    """returns tree with subtrees present in pog_cache replaced by tips and
+    a {tip name: AlignablePOG} dict of the replaced subtrees"""
+    tree = tree.deepcopy()
+    pogs = {}
+
+    def collapse(node):
+        for child in node.children:
+            if child.istip():
+                continue
+            key = subtree_keys[frozenset(child.get_tip_names())]
+            pog = pog_cache.get((params_key, key), None)
+            if pog is None:
+                collapse(child)
+            else:
+                pogs[child.name] = pog
+                del child[:]
+
+    collapse(tree)
+    return tree, pogs
+
+
+def _update_pog_cache(pog, subtree_keys, pog_cache, params_key):
+    """adds the sub-alignments of the internal nodes below pog to pog_cache"""
+    for child in pog.get_children() or []:
+        if not isinstance(child, AlignablePOG):
+            continue
+        key = subtree_keys[frozenset(n for n, _ in child.aligneds)]
+        pog_cache[(params_key, key)] = child
+        _update_pog_cache(child, subtree_keys, pog_cache, params_key)
+
+
+def _pairwise_estimates(model, seqs, est_params, seq_keys, pair_cache):
+    """returns {(name1, name2): {param: value}} from pairwise alignment of
+    seqs, only estimating pairs absent from pair_cache"""
+    params = tuple(est_params or [])
+    result = {}
+    missing = {}
+    for pair in get_name_combinations(seqs.names, 2):
+        key = (model.name, params, frozenset(seq_keys[n] for n in pair))
+        ests = pair_cache.get(key, None)
+        if ests is None:
+            missing[pair] = key
+        else:
+            result[pair] = ests
+
+    if missing:
+        dcalc = EstimateDistances(
+            seqs, model, do_pair_align=True, est_params=est_params
+        )
+        dcalc.run(combinations=list(missing))
+        for pair, ests in dcalc.get_all_param_values().items():
+            pair_cache[missing[pair]] = ests
+            result[pair] = ests
+    return result
+
+
+class _LRUDict(OrderedDict):
+    """dict holding at most max_size entries, the least recently used
+    entries are discarded first. Unbounded if max_size is None."""
+
+    def __init__(self, max_size=None):
+        super(_LRUDict, self).__init__()
+        self.max_size = max_size
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key, value):
+        super(_LRUDict, self).__setitem__(key, value)
+        self.move_to_end(key)
+        self._trim()
+
+    def _trim(self):
+        while self.max_size is not None and len(self) > self.max_size:
+            self.popitem(last=False)
+
+
+class PogCache:
+    """sub-alignments and pairwise estimates retained between TreeAlign calls
+
+    Attributes
+    ----------
+    pogs
+        sub-alignments (AlignablePOG) of internal nodes of guide trees
+    pairs
+        pairwise parameter estimates used for guide trees
+
+    Notes
+    -----
+    Both are discarded in least recently used order, with separate bounds.
+    """
+
+    def __init__(self, max_pogs=None, max_pairs=None):
+        """
+        Parameters
+        ----------
+        max_pogs : int or None
+            maximum number of sub-alignments retained, if None twice the
+            number of sequences in the most recent alignment
+        max_pairs : int or None
+            maximum number of pairwise estimates retained, if None the
+            number of pairs of sequences in the most recent alignment
+        """
+        self._max_pogs = max_pogs
+        self._max_pairs = max_pairs
+        self.pogs = _LRUDict(max_pogs)
+        self.pairs = _LRUDict(max_pairs)
+
+    def _size_for(self, num_seqs):
+        """sets unspecified bounds for aligning num_seqs sequences"""
+        if self._max_pogs is None:
+            self.pogs.max_size = max(self.pogs.max_size or 0, 2 * num_seqs)
+        if self._max_pairs is None:
+            num_pairs = num_seqs * (num_seqs - 1) // 2
+            self.pairs.max_size = max(self.pairs.max_size or 0, num_pairs)
+
+
+def _set_seqs_and_pogs(lf, named_seqs, pogs, tip_names):
+    """sets the tip values of lf to a mix of sequences and sub-alignments
+
+    Motif probabilities are computed from all the sequences, as they would
+    be without the sub-alignments.
+    """
+    leaves = {
+        n: AlignableSeq(lf.model.convert_sequence(s, n)) for n, s in named_seqs.items()
+    }
+    counts = sum(leaf.leaf.get_motif_counts() for leaf in leaves.values())
+    leaves = {n: leaves[n] for n in tip_names if n in leaves}
+    leaves.update(pogs)
+    with lf.updates_postponed():
+        # not using lf.set_pogs() as motif counts are not defined for pogs
+        for name, leaf in leaves.items():
+            lf.set_param_rule("leaf", edge=name, value=leaf, is_constant=True)
+        if lf.mprobs_from_alignment:
+            lf.set_motif_probs(counts / counts.sum(), is_constant=True, auto=True)
+
+
 @UI.display_wrap
 def TreeAlign(
     model,
@@ -28,6 +201,7 @@ def TreeAlign(
     ui=None,
     ests_from_pairwise=True,
     param_vals=None,
+    pog_cache=None,
 ):
     """Returns a multiple alignment and tree.
 
@@ -52,7 +226,18 @@ def TreeAlign(
     param_vals
         named key, value pairs for model parameters. These
         override ests_from_pairwise.
-
+    pog_cache : PogCache or None
+        if provided, sub-alignments of internal nodes are stored in
+        pog_cache.pogs keyed by the model, the user provided param_vals, and
+        the topology, names and sequences of their subtree. Subtrees whose
+        sub-alignment is already present are not re-aligned, so only nodes on
+        the path from new or changed sequences to the root are computed.
+        Pairwise estimates used for the guide tree and ests_from_pairwise are
+        stored in pog_cache.pairs, so only pairs involving new or changed
+        sequences are estimated. Reused sub-alignments retain the branch
+        lengths, motif probabilities and pairwise parameter estimates in
+        effect when they were computed, so adding or changing sequences can
+        give a (slightly) different likelihood to aligning from scratch.
     """
     from cogent3 import get_model
 
@@ -62,16 +247,24 @@ def TreeAlign(
     two_seqs = len(seq_names) == 2
 
     model = get_model(model)
+    if pog_cache is not None:
+        if not isinstance(pog_cache, PogCache):
+            raise TypeError(f"pog_cache must be a PogCache, not {type(pog_cache)}")
+        pog_cache._size_for(len(seq_names))
+        named_seqs = seqs if isinstance(seqs, dict) else seqs.named_seqs
+        seq_keys = {n: _seq_key(n, s) for n, s in named_seqs.items()}
+        # estimates from pairwise change with the sequences, so only the
+        # user provided values identify cached sub-alignments
+        params_key = _params_key(model, param_vals, indel_rate, indel_length)
     if tree:
         tip_names = tree.get_tip_names()
         tip_names.sort()
         seq_names.sort()
-        assert (
-            tip_names == seq_names
-        ), "names don't match between seqs and tree: tree=%s; seqs=%s" % (
-            tip_names,
-            seq_names,
-        )
+        if tip_names != seq_names:
+            raise ValueError(
+                "names don't match between seqs and tree: tree=%s; seqs=%s"
+                % (tip_names, seq_names)
+            )
         ests_from_pairwise = False
     elif two_seqs:
         tree = make_tree(tip_names=seqs.names)
@@ -86,33 +279,49 @@ def TreeAlign(
         else:
             est_params = None
 
-        dcalc = EstimateDistances(
-            seqs, model, do_pair_align=True, est_params=est_params
-        )
-        dcalc.run()
-        dists = dcalc.get_pairwise_distances().to_dict()
-        tree = NJ.nj(dists)
+        if pog_cache is None:
+            dcalc = EstimateDistances(
+                seqs, model, do_pair_align=True, est_params=est_params
+            )
+            dcalc.run()
+            pair_ests = dcalc.get_all_param_values()
+        else:
+            pair_ests = _pairwise_estimates(
+                model, seqs, est_params, seq_keys, pog_cache.pairs
+            )
+        dists = {pair: ests["length"] for pair, ests in pair_ests.items()}
+        tree = NJ.nj(DistanceMatrix(dists).to_dict())
 
-    LF = model.make_likelihood_function(
-        tree.bifurcating(name_unnamed=True), aligned=False
-    )
     if ests_from_pairwise and not param_vals:
         # we use the median to avoid the influence of outlier pairs
         param_vals = {}
         for param in est_params:
-            numbers = dcalc.get_param_values(param)
+            numbers = NumberCounter([ests[param] for ests in pair_ests.values()])
             param_vals[param] = numbers.median
 
+    guide = tree.bifurcating(name_unnamed=True)
+    pogs = {}
+    if pog_cache is not None:
+        subtree_keys = _subtree_keys(guide, seq_keys)
+        guide, pogs = _collapse_cached(guide, subtree_keys, pog_cache.pogs, params_key)
+
+    LF = model.make_likelihood_function(guide, aligned=False)
     ui.display("Doing %s alignment" % ["progressive", "pairwise"][two_seqs])
     with LF.updates_postponed():
         for param, val in list(param_vals.items()):
             LF.set_param_rule(param, value=val, is_constant=True)
         LF.set_param_rule("indel_rate", value=indel_rate, is_constant=True)
         LF.set_param_rule("indel_length", value=indel_length, is_constant=True)
-        LF.set_sequences(seqs)
+        if pogs:
+            _set_seqs_and_pogs(LF, named_seqs, pogs, guide.get_tip_names())
+        else:
+            LF.set_sequences(seqs)
     lnL = LF.get_log_likelihood()
     edge = lnL.edge
-    align = edge.get_viterbi_path().get_alignment()
+    pog = edge.get_viterbi_path().get_alignable()
+    if pog_cache is not None:
+        _update_pog_cache(pog, subtree_keys, pog_cache.pogs, params_key)
+    align = pog.get_alignment()
     align = align.to_moltype(model.moltype)
     param_vals.update(
         dict(
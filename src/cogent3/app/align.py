@@ -2,12 +2,13 @@ import warnings
 
 from cogent3 import make_tree
 from cogent3.align import (
-    global_pairwise,
+    global_pairwise_to_ref,
     make_dna_scoring_dict,
     make_generic_scoring_dict,
 )
-from cogent3.align.progressive import TreeAlign
+from cogent3.align.progressive import PogCache, TreeAlign
 from cogent3.app import dist
+from cogent3.core.alignment import ArrayAlignment
 from cogent3.core.moltype import get_moltype
 from cogent3.evolve.models import get_model
 
@@ -31,24 +32,6 @@ __email__ = "Gavin.Huttley@anu.edu.au"
 __status__ = "Alpha"
 
 
-class _GapInRef:
-    """assumes first element of series is reference, returns True if that matches
-    gap_state"""
-
-    def __init__(self, moltype, gap):
-        self.gap_state = moltype.alphabet.to_indices(gap)[0]
-        self.func = self._ref_gap if gap == "-" else self._array_ref_gap
-
-    def _ref_gap(self, x):
-        return x[0] != self.gap_state
-
-    def _array_ref_gap(self, x):
-        return x.flatten()[0] != self.gap_state
-
-    def __call__(self, x):
-        return self.func(x)
-
-
 class align_to_ref(ComposableSeq):
     """Aligns to a reference seq, no gaps in the reference.
     Returns an Alignment object."""
@@ -64,6 +47,8 @@ class align_to_ref(ComposableSeq):
         insertion_penalty=20,
         extension_penalty=2,
         moltype="dna",
+        parallel=False,
+        par_kw=None,
     ):
         """
         Parameters
@@ -79,6 +64,10 @@ class align_to_ref(ComposableSeq):
             penalty for gap extension
         moltype : str
             molecular type
+        parallel : bool
+            if True, sequences are aligned to the reference in parallel
+        par_kw : dict
+            arguments passed to cogent3.util.parallel.map, e.g. max_workers
         """
         super(align_to_ref, self).__init__(
             input_types=self._input_types,
@@ -94,9 +83,7 @@ class align_to_ref(ComposableSeq):
             if self._moltype.label == "dna"
             else make_generic_scoring_dict(10, self._moltype)
         )
-        self._kwargs = dict(
-            S=S, d=insertion_penalty, e=extension_penalty, return_score=False
-        )
+        self._kwargs = dict(S=S, d=insertion_penalty, e=extension_penalty)
         if ref_seq.lower() == "longest":
             self.func = self.align_to_longest
         else:
@@ -104,6 +91,8 @@ class align_to_ref(ComposableSeq):
             self._ref_name = ref_seq
 
         self._gap_state = None  # can be character or int, depends on aligner
+        self._parallel = parallel
+        self._par_kw = par_kw
 
     def align_to_longest(self, seqs):
         """returns alignment to longest seq"""
@@ -122,27 +111,28 @@ class align_to_ref(ComposableSeq):
             seqs = seqs.to_moltype(self._moltype)
 
         ref_seq = seqs.get_seq(self._ref_name)
-        aligned = None
-        kwargs = self._kwargs.copy()
-        no_ref_gap = None
-
-        for i in range(seqs.num_seqs):
-            seq = seqs.seqs[i]
-            if seq.name == self._ref_name:
-                continue
-
-            result = global_pairwise(ref_seq, seq, **kwargs)
-            if no_ref_gap is None:
-                no_ref_gap = _GapInRef(result.moltype, seqs.moltype.gap)
+        aligned = global_pairwise_to_ref(
+            ref_seq,
+            seqs.seqs,
+            gap=seqs.moltype.gap,
+            parallel=self._parallel,
+            par_kw=self._par_kw,
+            **self._kwargs,
+        )
+        # order matches the previous incremental construction, reference first
+        names = [self._ref_name] + [n for n in seqs.names if n != self._ref_name]
+        new = ArrayAlignment(
+            data=[(n, aligned[n]) for n in names], moltype=self._moltype
+        )
+        return new
 
-            # as we're going to be using a pairwise distance that excludes gaps
-            # eliminating positions with deletions in the reference
-            result = result.filtered(no_ref_gap)
-            aligned = result if aligned is None else aligned.add_from_ref_aln(result)
 
-        # default to ArrayAlign
-        new = aligned.to_type(array_align=True, moltype=self._moltype)
-        return new
+def _make_pog_cache(incremental):
+    if not incremental:
+        return None
+    if incremental is True:
+        return PogCache()
+    return PogCache(max_pogs=incremental)
 
 
 class progressive_align(ComposableSeq):
@@ -163,6 +153,7 @@ class progressive_align(ComposableSeq):
         indel_length=1e-1,
         indel_rate=1e-10,
         distance="percent",
+        incremental=False,
     ):
         """
         Parameters
@@ -195,6 +186,13 @@ class progressive_align(ComposableSeq):
             the proportion of differences. This is applicable for any moltype,
             and sequences with very high percent identity. For more diverged
             sequences we recommend 'paralinear'.
+        incremental : bool or int
+            whether to retain sub-alignments of internal nodes of the guide
+            tree. Subsequent calls only re-align nodes whose tips include new
+            or changed sequences. An int sets the maximum number of retained
+            sub-alignments (default is twice the number of sequences), the
+            least recently used are discarded first. See TreeAlign pog_cache
+            and PogCache for details.
         """
         super(progressive_align, self).__init__(
             input_types=self._input_types,
@@ -246,6 +244,7 @@ class progressive_align(ComposableSeq):
             tree=self._guide_tree,
             param_vals=self._param_vals,
             show_progress=False,
+            pog_cache=_make_pog_cache(incremental),
         )
 
         self.func = self.multiple_align
@@ -14,6 +14,7 @@ from cogent3.core.profile import (
 )
 from cogent3.evolve.fast_distance import DistanceMatrix
 from cogent3.format.alignment import FORMATTERS
+from cogent3.parse.fasta import MinimalFastaParser, fasta_to_seqs
 from cogent3.parse.sequence import PARSERS
 from cogent3.util.deserialise import deserialise_object
 from cogent3.util.table import Table
@@ -133,9 +134,28 @@ class _seq_loader:
             # we use a data store as it's read() handles compression
             path = SingleReadDataStore(path)[0]
 
-        data = path.read().splitlines()
-        data = dict(record for record in self._parser(data))
-        seqs = self.klass(data=data, moltype=self.moltype)
+        if self._parser is MinimalFastaParser:
+            # the underlying binary file is read, avoiding text decoding
+            infile = path.open()
+            data = getattr(infile, "buffer", infile).read()
+            path.close()
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            aligned = self.klass is ArrayAlignment
+            seqs = fasta_to_seqs(
+                data,
+                moltype=self.moltype,
+                aligned=aligned,
+                upper=aligned,
+            )
+            if aligned and seqs.names != sorted(seqs.names):
+                # consistent with construction from a dict
+                order = sorted(range(len(seqs.names)), key=seqs.names.__getitem__)
+                seqs = seqs.get_sub_alignment(seqs=order)
+        else:
+            data = path.read()
+            data = dict(record for record in self._parser(data.splitlines()))
+            seqs = self.klass(data=data, moltype=self.moltype)
         seqs.info.source = abs_path
 
         if self._output_types & {"sequences"}:
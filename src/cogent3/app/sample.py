@@ -4,7 +4,7 @@ from numpy import array
 from numpy import random as np_random
 
 from cogent3.core.alignment import Alignment, ArrayAlignment
-from cogent3.core.genetic_code import get_code
+from cogent3.core.genetic_code import get_code, to_codon_indices
 from cogent3.core.moltype import get_moltype
 
 from .composable import (
@@ -15,7 +15,6 @@ from .composable import (
     ComposableSeq,
     NotCompleted,
 )
-from .translate import get_fourfold_degenerate_sets
 
 
 __author__ = "Gavin Huttley"
@@ -138,9 +137,17 @@ class omit_degenerates(ComposableAligned):
             # try converting
             aln = aln.to_moltype(self.moltype)
 
-        result = aln.no_degenerates(
+        if isinstance(aln, ArrayAlignment):
+            # evaluated without intermediate alignments
+            result = aln.lazy()
+        else:
+            result = aln
+        result = result.no_degenerates(
             motif_length=self._motif_length, allow_gap=self._allow_gap
         )
+        if isinstance(aln, ArrayAlignment):
+            result = result.to_alignment()
+
         if not result:
             result = NotCompleted(
                 "FAIL", self, "all columns contained degenerates", source=aln
@@ -189,9 +196,17 @@ class omit_gap_pos(ComposableAligned):
             # try converting
             aln = aln.to_moltype(self.moltype)
 
-        result = aln.omit_gap_pos(
+        if isinstance(aln, ArrayAlignment):
+            # evaluated without intermediate alignments
+            result = aln.lazy()
+        else:
+            result = aln
+        result = result.omit_gap_pos(
             allowed_gap_frac=self._allowed_frac, motif_length=self._motif_length
         )
+        if isinstance(aln, ArrayAlignment):
+            result = result.to_alignment()
+
         if not result:
             result = NotCompleted(
                 "FAIL", self, "all columns exceeded gap threshold", source=aln
@@ -243,14 +258,9 @@ class take_codon_positions(ComposableAligned):
 
         self._moltype = moltype
         self._four_fold_degen = fourfold_degenerate
-        self._fourfold_degen_sets = None
 
         if fourfold_degenerate:
-            gc = get_code(gc)
-            sets = get_fourfold_degenerate_sets(
-                gc, alphabet=moltype.alphabet, as_indices=True
-            )
-            self._fourfold_degen_sets = sets
+            self._gc = get_code(gc)
             self.func = self.take_fourfold_positions
             return
 
@@ -272,17 +282,18 @@ class take_codon_positions(ComposableAligned):
         if self._moltype and self._moltype != aln.moltype:
             aln = aln.to_moltype(self._moltype)
 
-        fourfold_codon_sets = self._fourfold_degen_sets
-
-        def ffold(x):
-            x = set(tuple(e) for e in list(x))
-            for codon_set in fourfold_codon_sets:
-                if x <= codon_set:
-                    return True
-            return False
-
-        new = aln.filtered(ffold, motif_length=3)
-        return new[2::3]
+        # Alignment instances are coded via an ArrayAlignment copy, the
+        # selected positions are then taken from the original
+        array_aln = (
+            aln if isinstance(aln, ArrayAlignment) else aln.to_type(array_align=True)
+        )
+        codons = to_codon_indices(array_aln.array_seqs, array_aln.alphabet)
+        # all codons fourfold degenerate and sharing the first two positions
+        keep = self._gc.fourfold_degenerate_mask.take(codons).all(axis=0)
+        keep &= (codons // 4 == codons[:1] // 4).all(axis=0)
+        if not keep.any():
+            raise ValueError("no fourfold degenerate positions")
+        return aln.take_positions((3 * keep.nonzero()[0] + 2).tolist())
 
     def take_codon_position(self, aln):
         if isinstance(aln, Alignment):
@@ -327,7 +338,12 @@ class take_named_seqs(ComposableSeq):
 
     def take_seqs(self, data):
         try:
-            data = data.take_seqs(self._names, negate=self._negate)
+            if isinstance(data, ArrayAlignment):
+                # selects the array rows, without constructing sequences
+                selected = data.lazy().take_seqs(self._names, negate=self._negate)
+                data = selected.to_alignment() if selected.num_seqs else {}
+            else:
+                data = data.take_seqs(self._names, negate=self._negate)
         except KeyError:
             missing = set(self._names) - set(data.names)
             msg = f"named seq(s) {missing} not in {data.names}"
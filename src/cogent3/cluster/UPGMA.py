@@ -12,11 +12,13 @@ Both return a PhyloNode object of the UPGMA cluster
 
 import numpy
 
-from numpy import argmin, array, average, diag, ma, ravel, sum, take
+from numpy import argmin, array, average, ma, ravel, sum, take
 
 from cogent3.core.tree import PhyloNode
 from cogent3.util.dict_array import DictArray
 
+from .UPGMA_numba import upgma_joins
+
 
 __author__ = "Catherine Lozupone"
 __copyright__ = "Copyright 2007-2020, The Cogent Project"
@@ -103,11 +105,15 @@ def condense_node_order(matrix, smallest_index, node_order):
     Also sets the branch length of the nodes to 1/2 of the distance between
     the nodes in the matrix"""
     index1, index2 = smallest_index
+    return _join_nodes(node_order, index1, index2, matrix[index1, index2])
+
+
+def _join_nodes(node_order, index1, index2, distance):
+    """joins the nodes at index1 and index2 of node_order"""
     node1 = node_order[index1]
     node2 = node_order[index2]
-    # get the distance between the nodes and assign 1/2 the distance to the
-    # lengthproperty of each node
-    distance = matrix[index1, index2]
+    # assign 1/2 the distance between the nodes to the length property of
+    # each node
     nodes = [node1, node2]
     d = distance / 2.0
     for n in nodes:
@@ -138,21 +144,17 @@ def UPGMA_cluster(matrix, node_order, large_number):
     should be much larger than any value already in the matrix.
 
     WARNING: Changes matrix in-place.
-    WARNING: Expects matrix to already have diagonals assigned to large_number
-             before this function is called.
+
+    The diagonal of matrix is ignored. The joins are the same as from
+    repeated calls to find_smallest_index, condense_node_order and
+    condense_matrix, but are computed in compiled code.
     """
-    num_entries = len(node_order)
+    matrix = numpy.asarray(matrix, dtype=float)
+    pairs, distances = upgma_joins(matrix, large_number)
     tree = None
-    for i in range(num_entries - 1):
-        smallest_index = find_smallest_index(matrix)
-        index1, index2 = smallest_index
-        # if smallest_index is on the diagonal set the diagonal to large_number
-        if index1 == index2:
-            matrix[diag([True] * len(matrix))] = large_number
-            smallest_index = find_smallest_index(matrix)
-        row_order = condense_node_order(matrix, smallest_index, node_order)
-        matrix = condense_matrix(matrix, smallest_index, large_number)
-        tree = node_order[smallest_index[0]]
+    for (index1, index2), distance in zip(pairs.tolist(), distances.tolist()):
+        _join_nodes(node_order, index1, index2, distance)
+        tree = node_order[index1]
     return tree
 
 
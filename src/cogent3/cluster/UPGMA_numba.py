@@ -0,0 +1,88 @@
+import numpy
+
+from numba import njit
+
+
+__author__ = "Gavin Huttley"
+__copyright__ = "Copyright 2007-2020, The Cogent Project"
+__credits__ = ["Gavin Huttley"]
+__license__ = "BSD-3"
+__version__ = "2020.7.2a"
+__maintainer__ = "Gavin Huttley"
+__email__ = "gavin.huttley@anu.edu.au"
+__status__ = "Alpha"
+
+
+# smallest distance from row i to a later row that is still in use
+@njit(cache=True)
+def _get_row_min(matrix, live, i):
+    smallest = numpy.inf
+    index = -1
+    for j in range(i + 1, len(matrix)):
+        if live[j] and (index < 0 or matrix[i, j] < smallest):
+            smallest = matrix[i, j]
+            index = j
+    return smallest, index
+
+
+# clusters rows of a distance matrix by averaging them
+@njit(cache=True)
+def upgma_joins(matrix, large_value):
+    """joins the closest pair of rows until one remains, modifying matrix in
+    place.
+
+    Returns the pairs of row indices joined and the distance between them.
+    The joined row replaces the first of the pair, the second is filled with
+    large_value. The diagonal is ignored and ties are resolved as for
+    numpy.argmin on the matrix.
+
+    The smallest value in each row, to the right of the diagonal, is cached
+    and only recomputed if the column holding it was joined, making each
+    join linear in the number of rows in most cases."""
+
+    num_rows = len(matrix)
+    live = numpy.ones(num_rows, dtype=numpy.bool_)
+    row_min = numpy.empty(num_rows, dtype=numpy.float64)
+    row_arg = numpy.empty(num_rows, dtype=numpy.int64)
+    for i in range(num_rows):
+        row_min[i], row_arg[i] = _get_row_min(matrix, live, i)
+
+    pairs = numpy.empty((max(num_rows - 1, 0), 2), dtype=numpy.int64)
+    distances = numpy.empty(max(num_rows - 1, 0), dtype=numpy.float64)
+    for step in range(num_rows - 1):
+        smallest = numpy.inf
+        first = -1
+        for i in range(num_rows):
+            if not live[i] or row_arg[i] < 0:
+                continue
+            if first < 0 or row_min[i] < smallest:
+                smallest = row_min[i]
+                first = i
+
+        second = row_arg[first]
+        pairs[step, 0] = first
+        pairs[step, 1] = second
+        distances[step] = matrix[first, second]
+
+        live[second] = False
+        for k in range(num_rows):
+            if live[k] and k != first:
+                value = (matrix[first, k] + matrix[second, k]) / 2
+                matrix[first, k] = value
+                matrix[k, first] = value
+            matrix[second, k] = large_value
+            matrix[k, second] = large_value
+
+        row_min[first], row_arg[first] = _get_row_min(matrix, live, first)
+        for k in range(second):
+            if not live[k] or k == first:
+                continue
+            if row_arg[k] == first or row_arg[k] == second:
+                row_min[k], row_arg[k] = _get_row_min(matrix, live, k)
+            elif k < first:
+                value = matrix[k, first]
+                if value < row_min[k] or (value == row_min[k] and first < row_arg[k]):
+                    row_min[k] = value
+                    row_arg[k] = first
+
+    return pairs, distances
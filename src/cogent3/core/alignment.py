@@ -53,10 +53,16 @@ from numpy.random import choice, permutation, randint
 import cogent3  # will use to get at cogent3.parse.fasta.MinimalFastaParser,
 
 from cogent3.core.annotation import Map, _Annotatable
-from cogent3.core.genetic_code import get_code
+from cogent3.core.genetic_code import get_code, to_codon_indices
 from cogent3.core.info import Info as InfoClass
+from cogent3.core.location import IndelMap
 from cogent3.core.profile import PSSM, MotifCountsArray
-from cogent3.core.sequence import ArraySequence, Sequence, frac_same
+from cogent3.core.sequence import (
+    ArraySequence,
+    Sequence,
+    _translate_indices,
+    frac_same,
+)
 # which is a circular import otherwise.
 from cogent3.format.alignment import save_to_filename
 from cogent3.format.fasta import alignment_to_fasta
@@ -64,7 +70,7 @@ from cogent3.format.nexus import nexus_from_alignment
 from cogent3.format.phylip import alignment_to_phylip
 from cogent3.maths.stats.number import CategoryCounter
 from cogent3.maths.util import safe_log
-from cogent3.parse.gff import gff_parser
+from cogent3.parse.gff import gff_records
 from cogent3.util import progress_display as UI
 from cogent3.util.dict_array import DictArrayTemplate
 from cogent3.util.misc import (
@@ -2021,21 +2027,29 @@ class SequenceCollection(_SequenceCollectionBase):
         Skips sequences in the file that are not in self.
         """
 
-        seq_dict = {}
-
-        for gff_dict in gff_parser(f):
-            if gff_dict["SeqID"] not in self.named_seqs:
-                continue
-            seq_id = gff_dict["SeqID"]
-            if seq_id not in seq_dict.keys():
-                seq_dict[seq_id] = [gff_dict]
-                continue
-            seq_dict[seq_id].append(gff_dict)
-        for seq_id in seq_dict.keys():
+        records = gff_records(f, seqids=self.named_seqs)
+        seq_indices = {}
+        for i, seq_id in enumerate(records["SeqID"]):
+            seq_indices.setdefault(seq_id, []).append(i)
+        for seq_id, indices in seq_indices.items():
             seq = self.named_seqs[seq_id]
             if not hasattr(seq, "annotations"):
                 seq = seq.data
-            seq.annotate_from_gff(seq_dict[seq_id], pre_parsed=True)
+            seq.annotate_from_gff(records[array(indices, dtype=int)])
+
+
+def _as_contiguous_slice(index):
+    """returns a slice if index is an int, slice with step 1, or a Map
+    consisting of a single forward span, None otherwise"""
+    if isinstance(index, int):
+        return index
+    if isinstance(index, slice):
+        return index if (index.step or 1) == 1 else None
+    if isinstance(index, Map) and len(index.spans) == 1:
+        span = index.spans[0]
+        if not (span.lost or span.reverse):
+            return slice(span.start, span.end)
+    return None
 
 
 @total_ordering
@@ -2043,18 +2057,44 @@ class Aligned(object):
     """One sequence in an alignment, a map between alignment coordinates and
     sequence coordinates"""
 
+    __slots__ = ("_indel_map", "_map", "data", "name", "_info")
+
     def __init__(self, map, data, length=None):
         # Unlike the normal map constructor, here we take a list of pairs of
         # alignment coordinates, NOT a list of pairs of sequence coordinates
         if isinstance(map, list):
             map = Map(map, parent_length=length).inverse()
-        self.map = map
+        # an IndelMap is only converted to a Map if required
+        if isinstance(map, IndelMap):
+            self._indel_map, self._map = map, None
+        else:
+            self._indel_map, self._map = None, map
         self.data = data
-        if hasattr(data, "info"):
-            self.info = data.info
+        self._info = None
         if hasattr(data, "name"):
             self.name = data.name
 
+    @property
+    def info(self):
+        """info object, that of the underlying sequence unless assigned"""
+        if self._info is None:
+            return self.data.info
+        return self._info
+
+    @info.setter
+    def info(self, info):
+        self._info = info
+
+    @property
+    def map(self):
+        if self._map is None:
+            self._map = self._indel_map.to_map()
+        return self._map
+
+    def _get_map(self):
+        """returns the IndelMap, if present, otherwise the Map"""
+        return self.map if self._indel_map is None else self._indel_map
+
     @extend_docstring_from(Sequence.annotate_matches_to)
     def annotate_matches_to(
         self, pattern, annot_type, name, allow_multiple=False
@@ -2073,7 +2113,7 @@ class Aligned(object):
 
     def copy(self):
         """Returns a shallow copy of self"""
-        return self.__class__(self.map, self.data)
+        return self.__class__(self._get_map(), self.data)
 
     def deepcopy(self, sliced=True):
         """
@@ -2088,12 +2128,15 @@ class Aligned(object):
         a copy of self
         """
         new_seq = self.data.copy()
-        if sliced:
+        if sliced and self._indel_map is not None:
+            new_seq = new_seq[self._indel_map.start : self._indel_map.end]
+            new_map = self._indel_map.zeroed()
+        elif sliced:
             span = self.map.get_covering_span()
             new_seq = new_seq[span.start : span.end]
             new_map = self.map.zeroed()
         else:
-            new_map = self.map
+            new_map = self._get_map()
 
         return self.__class__(new_map, new_seq)
 
@@ -2137,33 +2180,39 @@ class Aligned(object):
 
     def get_gapped_seq(self, recode_gaps=False, moltype=None):
         """Returns sequence as an object, including gaps."""
+        if self._indel_map is not None and isinstance(self.data, Sequence):
+            return self.data.gapped_by_map(self._indel_map, recode_gaps)
         return self.data.gapped_by_map(self.map, recode_gaps)
 
     def __len__(self):
         # these make it look like Aligned should be a subclass of Map,
         # but then you have to be careful with __getitem__, __init__ and
         # inverse.
-        return len(self.map)
+        return len(self._get_map())
 
     def __add__(self, other):
         if self.data is other.data:
-            (map, seq) = (self.map + other.map, self.data)
+            (map, seq) = (self._get_map() + other._get_map(), self.data)
         else:
             seq = self.get_gapped_seq() + other.get_gapped_seq()
             (map, seq) = seq.parse_out_gaps()
         return Aligned(map, seq)
 
     def __getitem__(self, slice):
+        if self._indel_map is not None:
+            index = _as_contiguous_slice(slice)
+            if index is not None:
+                return Aligned(self._indel_map[index], self.data)
         return Aligned(self.map[slice], self.data)
 
     def rc(self):
         return Aligned(self.map.reversed(), self.data)
 
     def to_rna(self):
-        return Aligned(self.map, self.data.to_rna())
+        return Aligned(self._get_map(), self.data.to_rna())
 
     def to_dna(self):
-        return Aligned(self.map, self.data.to_dna())
+        return Aligned(self._get_map(), self.data.to_dna())
 
     def to_rich_dict(self):
         coords = self.map.get_covering_span().get_coordinates()
@@ -2186,7 +2235,7 @@ class Aligned(object):
     def to_moltype(self, moltype):
         """returns copy of self with moltype seqs"""
         data = self.data.to_moltype(moltype)
-        return self.__class__(map=self.map, data=data)
+        return self.__class__(map=self._get_map(), data=data)
 
     def remapped_to(self, map):
         result = Aligned(map[self.map.inverse()].inverse(), self.data)
@@ -2210,7 +2259,7 @@ class Aligned(object):
         and shadow masked."""
         new_data = self.data.with_masked_annotations(annot_types, mask_char, shadow)
         # we remove the mask annotations from self and new_data
-        return self.__class__(self.map, new_data)
+        return self.__class__(self._get_map(), new_data)
 
     def strand_symmetry(self, motif_length=1):
         """returns G-test for strand symmetry"""
@@ -2512,18 +2561,12 @@ class AlignmentI(object):
             )
             raise ValueError(msg)
 
-        is_array = isinstance(self, ArrayAlignment)
-        alpha = self.alphabet
         if allow_gap:
-            chars.extend(self.moltype.gap)
-            alpha = self.moltype.alphabet.gapped
+            chars.append(self.moltype.gap)
 
-        if is_array:
-            chars = list(map(alpha.index, chars))
-
-        predicate = AllowedCharacters(chars, is_array=is_array)
-        new = self.filtered(predicate, motif_length=motif_length)
-        return new
+        data, chars = self._get_coded_array(chars)
+        keep = _allowed_chars_keep(chars)(self._get_motif_array(data, motif_length))
+        return self._take_motifs(keep, motif_length)
 
     def omit_gap_pos(self, allowed_gap_frac=1 - eps, motif_length=1):
         """Returns new alignment where all cols (motifs) have <= allowed_gap_frac gaps.
@@ -2541,23 +2584,37 @@ class AlignmentI(object):
             is included in the counting. Default is 1.
 
         """
-        is_array = isinstance(self, ArrayAlignment)
-        try:
-            alpha = self.moltype.alphabets.degen_gapped
-        except:
-            alpha = self.moltype.alphabet
+        data, gaps = self._get_coded_array(self.moltype.gaps)
+        keep = _gap_frac_keep(gaps, allowed_gap_frac)
+        keep = keep(self._get_motif_array(data, motif_length))
+        return self._take_motifs(keep, motif_length)
 
-        gaps = list(self.moltype.gaps)
-        if is_array:
-            gaps = list(map(alpha.index, gaps))
+    def _get_coded_array(self, chars):
+        """returns seqs x positions array and the codes for chars within it
 
-        gaps_ok = GapsOk(
-            gaps, allowed_gap_frac, is_array=is_array, motif_length=motif_length
-        )
-        # if we're not deleting the 'naughty' seqs that contribute to the
-        # gaps, it's easy...
-        result = self.filtered(gaps_ok, motif_length=motif_length)
-        return result
+        Notes
+        -----
+        For ArrayAlignment the codes are alphabet indices, otherwise
+        the ordinals of the characters. chars absent from the alphabet
+        are ignored.
+        """
+        if isinstance(self, ArrayAlignment):
+            alpha = self.alphabet
+            codes = [alpha.index(c) for c in chars if c in alpha]
+            return self.array_seqs, codes
+
+        data = "".join(str(self.get_gapped_seq(n)) for n in self.names)
+        data = numpy.frombuffer(data.encode("latin-1"), dtype=uint8)
+        data = data.reshape((self.num_seqs, self.seq_len))
+        codes = [ord(c) for c in chars if ord(c) < 256]
+        return data, codes
+
+    def _get_motif_array(self, data, motif_length):
+        """returns seqs x positions array as (num_seqs, num_motifs,
+        motif_length), dropping any incomplete terminal motif"""
+        num_motifs = data.shape[1] // motif_length
+        data = data[:, : num_motifs * motif_length]
+        return data.reshape((data.shape[0], num_motifs, motif_length))
 
     def get_gap_array(self, include_ambiguity=True):
         """returns bool array with gap state True, False otherwise
@@ -2757,6 +2814,129 @@ class AlignmentI(object):
             for pos in range(start, end, step):
                 yield self[pos : pos + window]
 
+    def window_stats(
+        self,
+        window,
+        step,
+        start=None,
+        end=None,
+        stats=None,
+    ):
+        """returns statistics for sliding windows, computed in a single pass
+
+        Parameters
+        ----------
+        window
+            The length of each window.
+        step
+            The interval between the start of successive windows.
+        start
+            first window start position
+        end
+            last window start position
+        stats
+            series of statistic names from the following. Defaults to all
+            except 'counts', 'gc' is only included for nucleic acids.
+            'counts': counts of each canonical state, one column per state
+            'gc': fraction of canonical nucleotides that are G or C, requires
+                a nucleic acid moltype
+            'gap_frac': fraction of characters that are gaps
+            'entropy': mean Shannon entropy (bits) per position, positions
+                with no canonical states are ignored
+            'variable': number of positions with more than one canonical state
+            'pdist': mean proportion of differing canonical states between
+                pairs of sequences
+
+        Returns
+        -------
+        Table with a 'start' column and a column for each statistic, one row
+        per window. Windows are those produced by sliding_windows() with the
+        same arguments.
+
+        Notes
+        -----
+        Per-position values are summed over windows via cumulative sums, so
+        no sub-alignments are created.
+        """
+        valid = ("counts", "gc", "gap_frac", "entropy", "variable", "pdist")
+        nucleic = bool(self.moltype.complements)
+        if stats is None:
+            stats = [s for s in valid[1:] if nucleic or s != "gc"]
+        unknown = set(stats) - set(valid)
+        if unknown:
+            raise ValueError(f"unknown stats {unknown}, must be from {valid}")
+
+        from cogent3.util.table import Table
+
+        length = len(self)
+        start = [start, 0][start is None]
+        end = [end, length - window + 1][end is None]
+        end = min(length - window + 1, end)
+        if start < end and length - end >= window - 1:
+            starts = arange(start, end, step)
+        else:
+            starts = arange(0)
+
+        if isinstance(self, ArrayAlignment):
+            aln = self
+        else:
+            aln = self.to_type(array_align=True)
+        alphabet = aln.alphabet
+        canonical = list(self.moltype.alphabet)
+        # map alphabet indices to canonical state indices, -1 otherwise
+        to_state = numpy.full(len(alphabet), -1, dtype=int)
+        for i, char in enumerate(canonical):
+            if char in alphabet:
+                to_state[alphabet.index(char)] = i
+        states = to_state.take(aln.array_seqs)
+
+        per_pos = {}
+        counts = [(states == i).sum(axis=0) for i in range(len(canonical))]
+        counts = numpy.array(counts, dtype=float).T
+        num = counts.sum(axis=1)
+        if "counts" in stats:
+            per_pos["counts"] = counts
+        if "gc" in stats:
+            if not nucleic:
+                raise ValueError("'gc' requires a nucleic acid moltype")
+            gc = counts[:, canonical.index("G")] + counts[:, canonical.index("C")]
+            per_pos["gc"] = numpy.stack([gc, num], axis=1)
+        if "gap_frac" in stats:
+            per_pos["gap_frac"] = aln.get_gap_array().sum(axis=0).astype(float)
+        if "entropy" in stats:
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                probs = counts / num[:, None]
+                entropy = -(probs * numpy.log2(probs))
+            entropy = numpy.nansum(entropy, axis=1)
+            per_pos["entropy"] = numpy.stack([entropy, num > 0], axis=1)
+        if "variable" in stats:
+            per_pos["variable"] = ((counts > 0).sum(axis=1) > 1).astype(float)
+        if "pdist" in stats:
+            pairs = num * (num - 1) / 2
+            diffs = pairs - (counts * (counts - 1) / 2).sum(axis=1)
+            per_pos["pdist"] = numpy.stack([diffs, pairs], axis=1)
+
+        def window_sums(values):
+            cumsum = numpy.zeros((length + 1,) + values.shape[1:])
+            cumsum[1:] = values.cumsum(axis=0)
+            return cumsum[starts + window] - cumsum[starts]
+
+        columns = {"start": starts}
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            for stat in stats:
+                sums = window_sums(per_pos[stat])
+                if stat == "counts":
+                    for i, char in enumerate(canonical):
+                        columns[char] = sums[:, i].astype(int)
+                elif stat == "gap_frac":
+                    columns[stat] = sums / (window * self.num_seqs)
+                elif stat == "variable":
+                    columns[stat] = sums.astype(int)
+                else:
+                    columns[stat] = sums[:, 0] / sums[:, 1]
+
+        return Table(header=list(columns), data=columns)
+
     def _get_raw_pretty(self, name_order):
         """returns dict {name: seq, ...} for pretty print"""
         if name_order is not None:
@@ -3550,6 +3730,17 @@ def aln_from_array(a, array_type=None, alphabet=None):
     return transpose(result), None
 
 
+def _aln_from_array_view(a, array_type=None, alphabet=None):
+    """Alignment from array of pos x seq without copying the data.
+
+    Used internally for arrays that are views on, or fresh copies of, the
+    data of another alignment.
+    """
+    if array_type is not None:
+        a = a.astype(array_type, copy=False)
+    return transpose(a), None
+
+
 def aln_from_array_seqs(seqs, array_type=None, alphabet=None):
     """Alignment from ArraySequence objects: seqs -> array, names from seqs.
 
@@ -3768,7 +3959,9 @@ class ArrayAlignment(AlignmentI, _SequenceCollectionBase):
         """Returns new ArrayAlignment object. Inherits from SequenceCollection."""
         kwargs["suppress_named_seqs"] = True
         super(ArrayAlignment, self).__init__(*args, **kwargs)
-        self.array_positions = transpose(self.seq_data.astype(self.alphabet.array_type))
+        self.array_positions = transpose(
+            self.seq_data.astype(self.alphabet.array_type, copy=False)
+        )
         self.array_seqs = transpose(self.array_positions)
         self.seq_data = self.array_seqs
         self.seq_len = len(self.array_positions)
@@ -3811,16 +4004,27 @@ class ArrayAlignment(AlignmentI, _SequenceCollectionBase):
         return iter(self.positions)
 
     def __getitem__(self, item):
+        """aln[i] returns an alignment of position i, slices return an
+        alignment that shares data with self.
+
+        Notes
+        -----
+        The array data of a slice is a read-only view, assigning into it
+        raises a ValueError. Use copy() (or get_sub_alignment()) to obtain an
+        alignment with independent, writeable data.
+        """
         if not isinstance(item, slice):
             data = self.array_seqs[:, item]
             data = vstack(data)
         else:
+            # a view, mutating requires an explicit copy
             data = self.array_seqs[:, item]
+            data.flags.writeable = False
         result = self.__class__(
             data.T,
             list(map(str, self.names)),
             self.alphabet,
-            conversion_f=aln_from_array,
+            conversion_f=_aln_from_array_view,
             info=self.info,
         )
         result._repr_policy.update(self._repr_policy)
@@ -3870,14 +4074,27 @@ class ArrayAlignment(AlignmentI, _SequenceCollectionBase):
             names = [self.names[i] for i in seqs]
         else:
             names = self.names
+        if data is self.array_positions:
+            data = data.copy()
         return self.__class__(
             data,
             list(map(str, names)),
             self.alphabet,
-            conversion_f=aln_from_array,
+            conversion_f=_aln_from_array_view,
             info=self.info,
         )
 
+    def lazy(self):
+        """returns a LazyArrayAlignment for deferred selection of sequences
+        and positions from self
+
+        Notes
+        -----
+        Chained selections and filters are materialised once, e.g.
+        ``aln.lazy().take_seqs(names).omit_gap_pos()[:300].to_alignment()``
+        """
+        return LazyArrayAlignment(self)
+
     def __str__(self):
         """Returns FASTA-format string.
 
@@ -3998,25 +4215,17 @@ class ArrayAlignment(AlignmentI, _SequenceCollectionBase):
                 "aligned length not divisible by " "motif_length=%d" % motif_length
             )
 
-        num_motifs = length // motif_length
-        shaped = self.array_seqs
-        if motif_length != 1:
-            shaped = shaped[:, : num_motifs * motif_length]
+        shaped = self._get_motif_array(self.array_seqs, motif_length)
+        keep = [predicate(shaped[:, i]) for i in range(shaped.shape[1])]
+        return self._take_motifs(array(keep, dtype=bool), motif_length)
 
-        shaped = shaped.reshape((self.num_seqs, num_motifs, motif_length))
-        indices = []
-        elements = arange(motif_length)
-        for i in range(num_motifs):
-            if not predicate(shaped[:, i]):
-                continue
-
-            start = motif_length * i
-            indices.extend(elements + start)
-
-        if not indices:
+    def _take_motifs(self, keep, motif_length):
+        """returns alignment of motifs where keep is True, None if none are"""
+        if not keep.any():
             return None
 
-        positions = self.array_seqs.take(indices, axis=1)
+        indices = arange(len(keep) * motif_length).reshape((len(keep), motif_length))
+        positions = self.array_seqs.take(indices[keep].flatten(), axis=1)
         result = self.__class__(
             positions,
             force_same_data=True,
@@ -4057,38 +4266,30 @@ class ArrayAlignment(AlignmentI, _SequenceCollectionBase):
         if len(self) % 3 != 0 and not allow_partial:
             raise ValueError("alignment length not divisible by 3")
 
-        stops = gc["*"]
-        get_index = self.alphabet.degen.index
-        stop_indices = {tuple(map(get_index, stop)) for stop in stops}
-        new_data = self.array_seqs.copy()
-
-        gap_indices = {get_index(gap) for gap in self.moltype.gaps}
+        get_index = self.alphabet.index
+        gap_indices = [get_index(gap) for gap in self.moltype.gaps]
         gap_index = get_index(self.moltype.gap)
-
-        trim_length = len(self)
-        seqs_with_stops = 0
-        for seq_num, seq in enumerate(new_data):
-            # reverse find first non-gap character
-            nondegen_index = None
-            for i in range(len(self) - 1, -1, -1):
-                e = seq[i]
-                if e not in gap_indices:
-                    nondegen_index = i + 1
-                    if nondegen_index % 3 != 0 and not allow_partial:
-                        raise ValueError(
-                            "'%s' length not divisible by 3" % self.names[seq_num]
-                        )
-                    break
-
-            if nondegen_index is None or nondegen_index < 3:
-                continue
-
-            # slice last three valid positions and see if stop
-            end_codon = tuple(seq[nondegen_index - 3 : nondegen_index])
-            if end_codon in stop_indices:
-                seqs_with_stops += 1
-                seq[nondegen_index - 3 : nondegen_index] = gap_index
-                trim_length = min([trim_length, nondegen_index - 3])
+        new_data = self.array_seqs.copy()
+        num_seqs, length = new_data.shape
+
+        # index following the last non-gap character in each sequence
+        not_gap = ~numpy.isin(new_data, gap_indices)
+        ends = length - not_gap[:, ::-1].argmax(axis=1)
+        ends[~not_gap.any(axis=1)] = 0
+        if not allow_partial:
+            partial = (ends % 3 != 0) & (ends > 0)
+            if partial.any():
+                name = self.names[int(partial.argmax())]
+                raise ValueError("'%s' length not divisible by 3" % name)
+
+        # the last codon of each sequence
+        rows = numpy.arange(num_seqs)
+        has_codon = ends >= 3
+        codon_pos = (ends[has_codon] - 3)[:, None] + arange(3)
+        end_codons = new_data[rows[has_codon, None], codon_pos]
+        codons = to_codon_indices(end_codons, self.alphabet)[:, 0]
+        stops = gc.get_stop_mask(codons)
+        new_data[rows[has_codon][stops, None], codon_pos[stops]] = gap_index
 
         result = self.__class__(
             new_data.T, moltype=self.moltype, names=self.names, info=self.info
@@ -4096,16 +4297,76 @@ class ArrayAlignment(AlignmentI, _SequenceCollectionBase):
         # this is an ugly hack for rather odd standard behaviour
         # we find the last alignment column to have not just gap chars
         # and trim up to that
-        i = 0
-        for i in range(len(result) - 1, -1, -1):
-            col = set(result.array_seqs[:, i])
-            if not col <= gap_indices:
-                break
+        not_gap_cols = (~numpy.isin(result.array_seqs, gap_indices)).any(axis=0)
+        i = len(result) - 1 - not_gap_cols[::-1].argmax() if not_gap_cols.any() else 0
         if len(result) != i:
             result = result[: i + 1]
 
         return result
 
+    def get_translation(self, gc=None, incomplete_ok=False, **kwargs):
+        """translate from nucleic acid to protein
+
+        Parameters
+        ----------
+        gc
+            genetic code, either the number or name
+            (use cogent3.core.genetic_code.available_codes)
+        incomplete_ok : bool
+            codons that are mixes of nucleotide and gaps converted to '?'.
+            raises a ValueError if False
+        kwargs
+            related to construction of the resulting object
+
+        Returns
+        -------
+        A new instance of self translated into protein
+
+        Notes
+        -----
+        Nucleic acid alignments are translated directly from the array of
+        indices without constructing sequence objects.
+        """
+        moltype = self.moltype
+        if (
+            kwargs
+            or len(self) < 3
+            or moltype.label not in ("dna", "rna")
+            or self.alphabet != moltype.alphabets.degen_gapped
+        ):
+            return super(ArrayAlignment, self).get_translation(
+                gc=gc, incomplete_ok=incomplete_ok, **kwargs
+            )
+
+        gc = get_code(gc)
+        data = _translate_indices(
+            self.array_seqs, gc, moltype, incomplete_ok, self.names
+        )
+        protein = cogent3.PROTEIN
+        return self.__class__(
+            data.T,
+            names=self.names[:],
+            moltype=protein,
+            alphabet=protein.alphabets.degen_gapped,
+            info=self.info,
+        )
+
+    def rc(self):
+        """Returns the reverse complement alignment"""
+        complement = getattr(self.alphabet, "_complement_array", None)
+        if complement is None or not len(self):
+            return super(ArrayAlignment, self).rc()
+
+        data = complement.take(self.array_seqs)[:, ::-1]
+        return self.__class__(
+            data.T,
+            names=self.names[:],
+            name=self.name,
+            moltype=self.moltype,
+            alphabet=self.alphabet,
+            info=self.info,
+        )
+
     def get_degapped_relative_to(self, name):
         """Remove all columns with gaps in sequence with given name.
 
@@ -4338,6 +4599,299 @@ class ArrayAlignment(AlignmentI, _SequenceCollectionBase):
         return result
 
 
+def _gap_frac_keep(gaps, allowed_frac):
+    """returns function returning bool array of motif columns whose gap
+    fraction is <= allowed_frac
+
+    Notes
+    -----
+    Input to the returned function is a (num_seqs, num_motifs, motif_length)
+    array of indices. Gaps are counted as characters, consistent with GapsOk.
+    """
+    gaps = array(sorted(gaps), dtype=int)
+
+    def keep(shaped):
+        num_seqs, _, motif_length = shaped.shape
+        num_gaps = numpy.isin(shaped, gaps).sum(axis=(0, 2))
+        return num_gaps / (num_seqs * motif_length) <= allowed_frac
+
+    return keep
+
+
+def _allowed_chars_keep(chars):
+    """returns function returning bool array of motif columns containing only
+    the allowed character indices"""
+    chars = array(sorted(chars), dtype=int)
+
+    def keep(shaped):
+        return numpy.isin(shaped, chars).all(axis=(0, 2))
+
+    return keep
+
+
+class LazyArrayAlignment:
+    """deferred selection of sequences and positions from an ArrayAlignment
+
+    Row selections, slices and column filters are accumulated as indices into
+    the source alignment. Consecutive column filters with the same
+    motif_length are evaluated together, in one pass over the selected data.
+    The source data is copied once, when the result is materialised via
+    ``to_alignment()`` or ``array_seqs``.
+
+    Notes
+    -----
+    Methods return self, so calls can be chained, e.g.
+    ``aln.lazy().take_seqs(names).omit_gap_pos()[:300].to_alignment()``
+    """
+
+    def __init__(self, aln):
+        """
+        Parameters
+        ----------
+        aln : ArrayAlignment
+            the source alignment, which is not modified
+        """
+        self._aln = aln
+        self._rows = None  # None means all rows, in order
+        self._cols = range(aln.seq_len)  # a range, or an array of indices
+        self._filters = []
+        self._filter_motif_length = None
+
+    def __repr__(self):
+        name = self.__class__.__name__
+        filters = len(self._filters)
+        filters = f", {filters} pending filter(s)" if filters else ""
+        return f"{name}({self.num_seqs} x {len(self._cols)}{filters})"
+
+    @property
+    def moltype(self):
+        return self._aln.moltype
+
+    @property
+    def alphabet(self):
+        return self._aln.alphabet
+
+    @property
+    def names(self):
+        names = self._aln.names
+        if self._rows is None:
+            return list(names)
+        return [names[i] for i in self._rows]
+
+    @property
+    def num_seqs(self):
+        return self._aln.num_seqs if self._rows is None else len(self._rows)
+
+    @property
+    def seq_len(self):
+        self._apply_filters()
+        return len(self._cols)
+
+    def __len__(self):
+        return self.seq_len
+
+    def _get_col_array(self):
+        cols = self._cols
+        if isinstance(cols, range):
+            cols = arange(cols.start, cols.stop, cols.step)
+        return cols
+
+    def _get_col_slice(self):
+        """returns cols as a slice if they're a range, None otherwise"""
+        cols = self._cols
+        if not isinstance(cols, range):
+            return None
+        stop = None if cols.stop < 0 else cols.stop
+        return slice(cols.start, stop, cols.step)
+
+    def _select(self):
+        """returns the selected rows and columns of the source array"""
+        data = self._aln.array_seqs
+        cols = self._get_col_slice()
+        if cols is None:
+            cols = self._cols
+        elif self._rows is None:
+            # basic indexing, a view
+            return data[:, cols]
+
+        if self._rows is None:
+            return data.take(cols, axis=1)
+        if isinstance(cols, slice):
+            return data.take(self._rows, axis=0)[:, cols]
+        return data[numpy.ix_(self._rows, cols)]
+
+    def _apply_filters(self):
+        """evaluates pending column filters, updating the column indices"""
+        if not self._filters:
+            return
+
+        motif_length = self._filter_motif_length
+        filters = self._filters
+        self._filters = []
+        self._filter_motif_length = None
+
+        data = self._select()
+        num_motifs = data.shape[1] // motif_length
+        shaped = data[:, : num_motifs * motif_length].reshape(
+            (data.shape[0], num_motifs, motif_length)
+        )
+        keep = ones(num_motifs, dtype=bool)
+        for func in filters:
+            keep &= func(shaped)
+
+        selected = arange(num_motifs * motif_length).reshape((num_motifs, motif_length))
+        selected = selected[keep].flatten()
+        self._cols = self._get_col_array()[selected]
+
+    def _add_filter(self, func, motif_length):
+        if self._filters and motif_length != self._filter_motif_length:
+            self._apply_filters()
+        self._filters.append(func)
+        self._filter_motif_length = motif_length
+        return self
+
+    def take_seqs(self, seqs, negate=False):
+        """selects the named sequences
+
+        Parameters
+        ----------
+        seqs
+            a sequence name, or series of names
+        negate : bool
+            if True, selects all except the named sequences
+
+        Raises
+        ------
+        KeyError if a name is not present
+        """
+        # column filters depend on the selected rows
+        self._apply_filters()
+        if type(seqs) == str:
+            seqs = [seqs]
+
+        names = self.names
+        rows = range(len(names)) if self._rows is None else self._rows
+        index = dict(zip(names, rows))
+        if negate:
+            exclude = set(seqs)
+            selected = [index[n] for n in names if n not in exclude]
+        else:
+            selected = [index[n] for n in seqs]
+        self._rows = array(selected, dtype=int)
+        return self
+
+    def take_positions(self, cols, negate=False):
+        """selects the alignment positions (relative to the current selection)
+
+        Parameters
+        ----------
+        cols
+            series of position indices
+        negate : bool
+            if True, selects all except cols
+        """
+        self._apply_filters()
+        cols = array(cols, dtype=int)
+        if negate:
+            keep = ones(len(self._cols), dtype=bool)
+            keep[cols] = False
+            cols = keep.nonzero()[0]
+        self._cols = self._get_col_array()[cols]
+        return self
+
+    def __getitem__(self, item):
+        self._apply_filters()
+        if isinstance(item, slice):
+            cols = self._cols[item]
+            self._cols = cols
+            return self
+
+        if isinstance(item, (int, numpy.integer)):
+            return self.take_positions([range(len(self._cols))[item]])
+
+        return self.take_positions(item)
+
+    def omit_gap_pos(self, allowed_gap_frac=1 - eps, motif_length=1):
+        """excludes positions (motifs) with > allowed_gap_frac gaps
+
+        Parameters
+        ----------
+        allowed_gap_frac
+            specifies proportion of gaps allowed in each column
+        motif_length
+            sets the "column" width, e.g. 3 corresponds to codons
+
+        Notes
+        -----
+        Same conditions as AlignmentI.omit_gap_pos, evaluation is deferred.
+        """
+        alpha = self.alphabet
+        gaps = [alpha.index(g) for g in self.moltype.gaps if g in alpha]
+        keep = _gap_frac_keep(gaps, allowed_gap_frac)
+        return self._add_filter(keep, motif_length)
+
+    def no_degenerates(self, motif_length=1, allow_gap=False):
+        """excludes positions (motifs) with degenerate characters
+
+        Parameters
+        ----------
+        motif_length
+            sequences are segmented into units of this size
+        allow_gap
+            whether gaps are to be treated as a degenerate character
+
+        Notes
+        -----
+        Same conditions as AlignmentI.no_degenerates, evaluation is deferred.
+        """
+        try:
+            chars = list(self.moltype.alphabet.non_degen)
+        except AttributeError:
+            msg = (
+                "Invalid MolType (no degenerate characters), "
+                "create the alignment using DNA, RNA or PROTEIN"
+            )
+            raise ValueError(msg)
+
+        if allow_gap:
+            chars.append(self.moltype.gap)
+
+        alpha = self.alphabet
+        chars = [alpha.index(c) for c in chars if c in alpha]
+        return self._add_filter(_allowed_chars_keep(chars), motif_length)
+
+    @property
+    def array_seqs(self):
+        """the selected data as a new seqs x positions array"""
+        self._apply_filters()
+        data = self._select()
+        if self._rows is None and self._get_col_slice() is not None:
+            data = data.copy()
+        return data
+
+    def to_alignment(self):
+        """returns the selected ArrayAlignment, or None if no positions
+        remain"""
+        self._apply_filters()
+        aln = self._aln
+        if not len(self._cols):
+            return None
+
+        if self._rows is None and self._get_col_slice() is not None:
+            # a zero-copy view
+            return aln[self._get_col_slice()]
+
+        result = aln.__class__(
+            self._select().T,
+            self.names,
+            aln.alphabet,
+            conversion_f=_aln_from_array_view,
+            info=aln.info,
+        )
+        result._repr_policy.update(aln._repr_policy)
+        return result
+
+
 class CodonArrayAlignment(ArrayAlignment):
     """Stores alignment of gapped codons, no degenerate symbols."""
 
@@ -4432,9 +4986,17 @@ class Alignment(_Annotatable, AlignmentI, SequenceCollection):
 
     def _seq_to_aligned(self, seq, key):
         """Converts seq to Aligned object -- override in subclasses"""
-        (map, seq) = self.moltype.make_seq(
-            seq, key, preserve_case=True
-        ).parse_out_gaps()
+        seq = self.moltype.make_seq(seq, key, preserve_case=True)
+        try:
+            if seq.is_annotated():
+                raise ValueError
+            (map, ungapped) = IndelMap.from_gapped_seq(str(seq))
+        except (ValueError, UnicodeEncodeError):
+            (map, seq) = seq.parse_out_gaps()
+        else:
+            seq = seq.__class__(
+                ungapped, name=seq.get_name(), info=seq._info, preserve_case=True
+            )
         return Aligned(map, seq)
 
     def __repr__(self):
@@ -4543,28 +5105,23 @@ class Alignment(_Annotatable, AlignmentI, SequenceCollection):
             raise ValueError(
                 "aligned length not divisible by " "motif_length=%d" % motif_length
             )
-        gv = []
-        kept = False
         seqs = [
             self.get_gapped_seq(n).get_in_motif_size(motif_length, **kwargs)
             for n in self.names
         ]
+        keep = [predicate(column) for column in zip(*seqs)]
+        return self._take_motifs(array(keep, dtype=bool), motif_length)
 
-        positions = list(zip(*seqs))
-        for (position, column) in enumerate(positions):
-            keep = predicate(column)
-            if kept != keep:
-                gv.append(position * motif_length)
-                kept = keep
-
-        if kept:
-            gv.append(len(positions) * motif_length)
-
-        if not gv:
+    def _take_motifs(self, keep, motif_length):
+        """returns alignment of motifs where keep is True, None if none are"""
+        if not keep.any():
             return None
 
-        locations = [(gv[i], gv[i + 1]) for i in range(0, len(gv), 2)]
-
+        # boundaries of runs of kept motifs
+        runs = numpy.diff(numpy.concatenate(([0], keep.astype(int), [0])))
+        starts = (runs == 1).nonzero()[0] * motif_length
+        ends = (runs == -1).nonzero()[0] * motif_length
+        locations = list(zip(starts.tolist(), ends.tolist()))
         keep = Map(locations, parent_length=len(self))
         return self.gapped_by_map(keep, info=self.info)
 
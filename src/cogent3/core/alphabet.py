@@ -21,6 +21,7 @@ import json
 import re
 import string
 
+from functools import lru_cache
 from itertools import product
 
 import numpy
@@ -30,6 +31,7 @@ from numpy import (
     array,
     asarray,
     frombuffer,
+    int32,
     newaxis,
     ravel,
     remainder,
@@ -117,6 +119,65 @@ def _make_translation_tables(a):
     return str.maketrans(indices, chars), str.maketrans(chars, indices)
 
 
+def get_char_index_table(alphabet, invalid=255, upper=False, ignore_case=False):
+    """returns array mapping byte values to alphabet indices
+
+    Parameters
+    ----------
+    alphabet
+        an alphabet of single characters
+    invalid : int or None
+        value for bytes not in alphabet, if None these bytes are unchanged
+    upper : bool
+        bytes are converted to upper case before lookup
+    ignore_case : bool
+        bytes not in alphabet are looked up in upper case
+
+    Returns
+    -------
+    Read-only array of length 256, uint8 if invalid fits in a byte, int32
+    otherwise. Results are cached so tables are constructed only once per
+    moltype, alphabet and policy.
+    """
+    moltype = getattr(alphabet, "moltype", None)
+    return _get_char_index_table(moltype, alphabet, invalid, upper, ignore_case)
+
+
+@lru_cache(maxsize=128)
+def _get_char_index_table(moltype, alphabet, invalid, upper, ignore_case):
+    if invalid is None:
+        table = numpy.arange(256, dtype=uint8)
+    else:
+        dtype = uint8 if 0 <= invalid < 256 and len(alphabet) <= 256 else int32
+        table = numpy.full(256, invalid, dtype=dtype)
+    indices = {c: i for i, c in enumerate(alphabet) if len(c) == 1}
+    for byte in range(256):
+        char = chr(byte)
+        if upper or (ignore_case and char not in indices):
+            char = char.upper()
+        if char in indices:
+            table[byte] = indices[char]
+    table.flags.writeable = False
+    return table
+
+
+def bytes_to_indices(data, table):
+    """returns array of indices for data
+
+    Parameters
+    ----------
+    data
+        str, bytes or a uint8 array. A str must be encodable as latin-1.
+    table
+        a byte lookup table, as from get_char_index_table
+    """
+    if isinstance(data, str):
+        data = data.encode("latin-1")
+    if not isinstance(data, numpy.ndarray):
+        data = frombuffer(data, dtype=uint8)
+    return table.take(data)
+
+
 def _make_complement_array(a, complements):
     """Makes translation array between item indices and their complements."""
     comps = [complements.get(i, i) for i in a]
@@ -764,14 +825,38 @@ class CharAlphabet(Alphabet):
         data = data or []
         super(CharAlphabet, self).__init__(data, gap, moltype=moltype)
         self._indices_to_chars, self._chars_to_indices = _make_translation_tables(data)
-        self._char_nums_to_indices = array(range(256), uint8)
-        for c, i in self._chars_to_indices.items():
-            self._char_nums_to_indices[c] = i
 
         chars = bytearray(range(256))
         for i, c in self._indices_to_chars.items():
             chars[i] = c
         self._indices_nums_to_chars = array(list(chars), "B").view("c")
+        self._ascii = all(ord(c) < 128 for c in self)
+
+    def to_index_array(self, data):
+        """Returns uint8 array of indices from a string of elements.
+
+        Raises KeyError if some of the elements were not found.
+        """
+        if len(self) < 256:
+            try:
+                indices = bytes_to_indices(data, get_char_index_table(self))
+            except UnicodeEncodeError:
+                indices = None
+            if indices is not None and not (indices == 255).any():
+                return indices
+
+        return array(super(CharAlphabet, self).to_indices(data), uint8)
+
+    def to_indices(self, data):
+        """Returns sequence of indices from sequence of elements.
+
+        Raises KeyError if some of the elements were not found.
+
+        Strings are converted using a cached byte lookup table.
+        """
+        if isinstance(data, str):
+            return self.to_index_array(data).tolist()
+        return super(CharAlphabet, self).to_indices(data)
 
     def from_string(self, data):
         """Returns array of indices from string containing elements.
@@ -784,10 +869,43 @@ class CharAlphabet(Alphabet):
         This is on the Alphabet, not the Sequence, because lots of objects
         (e.g. Profile, Alignment) also need to use it.
         """
+        if self._ascii:
+            # equivalent to translating, since non-ascii characters encode
+            # to bytes >= 128 that are unchanged by the table
+            table = get_char_index_table(self, invalid=None)
+            return table.take(frombuffer(data.encode(), uint8))
         vals = str.translate(data, self._chars_to_indices)
         vals = frombuffer(memoryview(vals.encode("utf8")), dtype=uint8)
         return vals
 
+    def get_matched_array(self, motifs, dtype=Float):
+        """Returns an array in which rows are motifs, columns are items in self.
+
+        Characters in self are located using the cached byte lookup table,
+        ambiguity codes are resolved once each. See
+        Alphabet.get_matched_array.
+        """
+        if self.moltype is None or not all(
+            isinstance(m, str) and len(m) == 1 for m in motifs
+        ):
+            return super(CharAlphabet, self).get_matched_array(motifs, dtype=dtype)
+
+        try:
+            codes = frombuffer("".join(motifs).encode("latin-1"), uint8)
+        except UnicodeEncodeError:
+            return super(CharAlphabet, self).get_matched_array(motifs, dtype=dtype)
+
+        num = len(self)
+        indices = bytes_to_indices(codes, get_char_index_table(self, invalid=num))
+        result = zeros([len(codes), num], dtype)
+        in_alphabet = indices < num
+        result[in_alphabet.nonzero()[0], indices[in_alphabet]] = 1
+        for code in numpy.unique(codes[~in_alphabet]).tolist():
+            # raises an AlphabetError for an invalid character
+            row = super(CharAlphabet, self).get_matched_array([chr(code)], dtype)
+            result[codes == code] = row[0]
+        return result
+
     def is_valid(self, seq):
         """Returns True if seq contains only items in self."""
         try:
@@ -805,7 +923,7 @@ class CharAlphabet(Alphabet):
         characters that's been converted into a numpy array. See
         from_string docstring for general behavior.
         """
-        return take(self._char_nums_to_indices, data.view("B"))
+        return take(get_char_index_table(self, invalid=None), data.view("B"))
 
     def to_chars(self, data):
         """Converts array of indices into array of elements.
@@ -1,5 +1,6 @@
 import copy
 import json
+import operator
 
 from collections import defaultdict
 from fnmatch import fnmatch
@@ -21,13 +22,131 @@ __email__ = "gavin.huttley@anu.edu.au"
 __status__ = "Production"
 
 
+class _AnnotationIndex:
+    """index of annotations by type and by the interval on their parent
+
+    Intervals are grouped by length (in powers of 2) and sorted by start
+    within each group, so region queries are O(log n + k) for k overlapping
+    annotations.
+    """
+
+    def __init__(self, annotations):
+        self._source = annotations
+        self._annotations = list(annotations)
+
+        by_type = defaultdict(list)
+        useful, starts, ends = [], [], []
+        for i, annot in enumerate(self._annotations):
+            by_type[annot.type].append(i)
+            if annot.map.useful:
+                useful.append(i)
+                starts.append(annot.map.start)
+                ends.append(annot.map.end)
+
+        self._by_type = {t: numpy.array(v, dtype=int) for t, v in by_type.items()}
+        useful = numpy.array(useful, dtype=int)
+        starts = numpy.array(starts, dtype=int)
+        ends = numpy.array(ends, dtype=int)
+        groups = numpy.ceil(numpy.log2(ends - starts + 1)).astype(int)
+        self._groups = []
+        for group in numpy.unique(groups):
+            selected = groups == group
+            order = numpy.argsort(starts[selected], kind="stable")
+            self._groups.append(
+                (
+                    2 ** int(group),
+                    starts[selected][order],
+                    ends[selected][order],
+                    useful[selected][order],
+                )
+            )
+
+    def is_current(self, annotations):
+        """whether the index reflects annotations, the same list holding the
+        same annotation instances in the same order"""
+        return (
+            annotations is self._source
+            and len(annotations) == len(self._annotations)
+            and all(map(operator.is_, annotations, self._annotations))
+        )
+
+    def in_region(self, start, end):
+        """returns sorted indices of annotations overlapping [start, end)"""
+        result = []
+        for max_length, starts, ends, indices in self._groups:
+            # only intervals starting within max_length of start can overlap
+            lo = numpy.searchsorted(starts, start - max_length, "right")
+            hi = numpy.searchsorted(starts, end, "left")
+            selected = ends[lo:hi] > start
+            result.append(indices[lo:hi][selected])
+        if not result:
+            return numpy.array([], dtype=int)
+        return numpy.sort(numpy.concatenate(result))
+
+    def of_type(self, annotation_type):
+        """returns sorted indices of annotations whose type matches, which
+        can include wild-cards"""
+        matched = [v for t, v in self._by_type.items() if fnmatch(t, annotation_type)]
+        if not matched:
+            return numpy.array([], dtype=int)
+        return numpy.sort(numpy.concatenate(matched))
+
+    def query(self, annotation_type="*", name=None, start=None, end=None):
+        """returns annotations matching type, name and overlapping the region
+
+        Parameters
+        ----------
+        annotation_type : str
+            annotation type, wild-cards allowed
+        name : str or None
+            annotation name, wild-cards allowed
+        start, end : int or None
+            region of the parent, annotations that overlap it are returned.
+            If only one is specified, the other is the corresponding end of
+            the parent.
+        """
+        indices = None
+        if start is not None or end is not None:
+            start = -numpy.inf if start is None else start
+            end = numpy.inf if end is None else end
+            indices = self.in_region(start, end)
+
+        if annotation_type != "*":
+            of_type = self.of_type(annotation_type)
+            indices = (
+                of_type
+                if indices is None
+                else numpy.intersect1d(indices, of_type, assume_unique=True)
+            )
+
+        if indices is None:
+            result = self._annotations[:]
+        else:
+            result = [self._annotations[i] for i in indices.tolist()]
+
+        if name is not None:
+            result = [a for a in result if fnmatch(a.name, name)]
+        return result
+
+
 class _Annotatable:
+    __slots__ = ()
+
     # default
     annotations = ()
+    _annotation_index = None
 
     # Subclasses should provide __init__, getOwnTracks, and a _mapped for use by
     # __getitem__
 
+    def _get_annotation_index(self):
+        """returns the index of self.annotations, rebuilt if they've changed"""
+        index = self._annotation_index
+        if index is None or not index.is_current(self.annotations):
+            index = _AnnotationIndex(self.annotations)
+            self._annotation_index = index
+        return index
+
     def _sliced_annotations(self, new, slice):
         result = []
         if self.annotations:
@@ -38,16 +157,11 @@ class _Annotatable:
             #    print "Annotations dropped because %s" % detail
             #    return []
             if slicemap.useful:
-                for annot in self.annotations:
-                    if not annot.map.useful:
-                        continue
-                    if (
-                        annot.map.start < slicemap.end
-                        and annot.map.end > slicemap.start
-                    ):
-                        annot = annot.remapped_to(new, newmap)
-                        if annot.map.useful:
-                            result.append(annot)
+                index = self._get_annotation_index()
+                for annot in index.query(start=slicemap.start, end=slicemap.end):
+                    annot = annot.remapped_to(new, newmap)
+                    if annot.map.useful:
+                        result.append(annot)
         return result
 
     def _shifted_annotations(self, new, shift):
@@ -90,8 +204,9 @@ class _Annotatable:
         new = self._mapped(map)
         sliced_annots = self._sliced_annotations(new, map)
         new.attach_annotations(sliced_annots)
-        if hasattr(self, "_repr_policy"):
-            new._repr_policy.update(self._repr_policy)
+        if hasattr(self, "_repr_policy") and new._repr_policy is not self._repr_policy:
+            # copied, as the policy may be shared between instances
+            new._repr_policy = {**new._repr_policy, **self._repr_policy}
         return new
 
     def _mapped(self, map):
@@ -111,6 +226,7 @@ class _Annotatable:
 
     def clear_annotations(self):
         self.annotations = []
+        self._annotation_index = None
 
     def get_drawable(self, width=600, vertical=False):
         """returns Drawable instance"""
@@ -157,9 +273,11 @@ class _Annotatable:
                 raise ValueError("doesn't belong here")
             if annot.attached:
                 raise ValueError("already attached")
-        if self.annotations is self.__class__.annotations:
+        if not isinstance(self.annotations, list):
+            # the shared default
             self.annotations = []
         self.annotations.extend(annots)
+        self._annotation_index = None
         for annot in annots:
             annot.attached = True
 
@@ -171,11 +289,14 @@ class _Annotatable:
             if annot.attached:
                 self.annotations.remove(annot)
                 annot.attached = False
+        self._annotation_index = None
 
     def add_feature(self, type, name, spans):
         return self.add_annotation(Feature, type, name, spans)
 
-    def get_annotations_matching(self, annotation_type, name=None, extend_query=False):
+    def get_annotations_matching(
+        self, annotation_type, name=None, extend_query=False, start=None, end=None
+    ):
         """
 
         Parameters
@@ -186,6 +307,9 @@ class _Annotatable:
             name of the instance. Wild-cards allowed.
         extend_query : boolean
             queries sub-annotations if True
+        start, end : int or None
+            only annotations overlapping this region of self are returned.
+            Does not apply to sub-annotations.
         Returns
         -------
         list of AnnotatableFeatures
@@ -193,17 +317,22 @@ class _Annotatable:
         result = []
         if len(self.annotations) == 0:
             return result
+
+        index = self._get_annotation_index()
+        if not extend_query:
+            return index.query(annotation_type, name=name, start=start, end=end)
+
+        matched = set(
+            map(id, index.query(annotation_type, name=name, start=start, end=end))
+        )
         for annotation in self.annotations:
-            if fnmatch(annotation.type, annotation_type) and (
-                name is None or fnmatch(annotation.name, name)
-            ):
+            if id(annotation) in matched:
                 result.append(annotation)
-            if extend_query:
-                result.extend(
-                    annotation.get_annotations_matching(
-                        annotation_type, name, extend_query=extend_query
-                    )
+            result.extend(
+                annotation.get_annotations_matching(
+                    annotation_type, name, extend_query=extend_query
                 )
+            )
         return result
 
     def get_region_covering_all(
@@ -5,10 +5,11 @@ NOTE: * is used to denote termination (as per NCBI standard).
 NOTE: Although the genetic code objects convert DNA to RNA and vice
 versa, lists of codons that they produce will be provided in DNA format.
 """
-import re
-
+from functools import lru_cache
 from itertools import product
 
+import numpy
+
 from cogent3.util.table import Table
 
 
@@ -38,6 +39,61 @@ class InvalidCodonError(KeyError, GeneticCodeError):
 
 _dna_trans = maketrans("TCAG", "AGTC")
 
+# maps bytes to nucleotide index in TCAG order, -1 for all other characters
+_nt_indices = numpy.full(256, -1, dtype=numpy.int8)
+for _i, _nts in enumerate(("Tt", "Cc", "Aa", "Gg")):
+    _nt_indices[[ord(c) for c in _nts]] = _i
+_nt_indices[[ord("U"), ord("u")]] = 0
+
+
+def _seq_to_nt_indices(seq):
+    """returns nucleotide indices (T, C, A, G -> 0, 1, 2, 3) for seq,
+    -1 for any other character"""
+    seq = str(seq).encode("latin-1", errors="replace")
+    return _nt_indices.take(numpy.frombuffer(seq, dtype=numpy.uint8))
+
+
+@lru_cache(maxsize=32)
+def _alphabet_to_nt_indices(alphabet):
+    """returns array mapping alphabet indices to nucleotide indices"""
+    indices = [
+        _nt_indices[ord(c)] if len(c) == 1 and ord(c) < 256 else -1 for c in alphabet
+    ]
+    return numpy.array(indices, dtype=numpy.int8)
+
+
+def to_codon_indices(seqs, alphabet=None):
+    """returns codon indices for nucleotide sequences
+
+    Parameters
+    ----------
+    seqs
+        a string, or an array of nucleotide indices. If 2D, each row is a
+        sequence.
+    alphabet
+        the alphabet seqs indices correspond to. If not provided, an array
+        is assumed to have indices in T, C, A, G order (0, 1, 2, 3) with any
+        other value being invalid.
+
+    Returns
+    -------
+    int array with last dimension the number of complete codons. Codon
+    indices are 16 * i + 4 * j + k for nucleotide indices i, j, k in the
+    order of GeneticCode.code_sequence. Codons including any character other
+    than a canonical nucleotide are 64.
+    """
+    if not isinstance(seqs, numpy.ndarray):
+        seqs = _seq_to_nt_indices(seqs)
+    elif alphabet is not None:
+        seqs = _alphabet_to_nt_indices(alphabet).take(seqs)
+
+    seqs = seqs.astype(int)
+    num_codons = seqs.shape[-1] // 3
+    codons = seqs[..., : num_codons * 3].reshape(seqs.shape[:-1] + (num_codons, 3))
+    result = codons.dot([16, 4, 1])
+    result[((codons < 0) | (codons > 3)).any(axis=-1)] = 64
+    return result
+
 
 def _simple_rc(seq):
     """simple reverse-complement: works only on unambiguous uppercase DNA"""
@@ -126,6 +182,17 @@ class GeneticCode:
         for aa, codons in list(self.synonyms.items()):
             ac[aa] = list(map(_simple_rc, codons))
         self.anticodons = ac
+        # amino acid for codon index (16 * i + 4 * j + k), index 64 is unknown
+        self._codon_to_aa = numpy.frombuffer(
+            (code_sequence + "X").encode("ascii"), dtype=numpy.uint8
+        )
+        self.stop_mask = self._codon_to_aa == ord("*")
+        # quartets of synonymous codons sharing the first two positions
+        quartets = numpy.array(
+            [len(set(code_sequence[i : i + 4])) == 1 for i in range(0, 64, 4)]
+        )
+        self.fourfold_degenerate_mask = numpy.append(quartets.repeat(4), False)
+        self._aa_indices = None
 
     def _analyze_quartet(self, codons, aa):
         """Analyzes a quartet of codons and amino acids: returns list of lists.
@@ -274,24 +341,114 @@ class GeneticCode:
             return ""
         if start + 1 > len(dna):
             raise ValueError("Translation starts after end of RNA")
-        return "".join([self[dna[i : i + 3]] for i in range(start, len(dna) - 2, 3)])
+        return self._translate_nt_indices(_seq_to_nt_indices(dna)[start:])
+
+    def _translate_nt_indices(self, indices):
+        """translates nucleotide indices (as from _seq_to_nt_indices),
+        codons including other characters are 'X'"""
+        codon_indices = to_codon_indices(indices)
+        return self._codon_to_aa.take(codon_indices).tobytes().decode("ascii")
+
+    @property
+    def aa_indices(self):
+        """array mapping codon index to amino acid index
+
+        Amino acid indices are for PROTEIN_WITH_STOP.alphabets.degen_gapped,
+        codon index 64 (a codon with non-canonical nucleotides) is 'X'.
+        """
+        if self._aa_indices is None:
+            from .moltype import PROTEIN_WITH_STOP
+
+            alphabet = PROTEIN_WITH_STOP.alphabets.degen_gapped
+            self._aa_indices = numpy.array(
+                [alphabet.index(aa) for aa in self.code_sequence + "X"],
+                dtype=numpy.uint8,
+            )
+        return self._aa_indices
+
+    def translate_codon_indices(self, codons):
+        """returns amino acid indices for an array of codon indices
+
+        Parameters
+        ----------
+        codons
+            array of codon indices, as produced by to_codon_indices, of
+            any shape
+
+        Returns
+        -------
+        uint8 array of same shape as codons with indices for
+        PROTEIN_WITH_STOP.alphabets.degen_gapped
+        """
+        return self.aa_indices.take(codons)
+
+    def get_stop_mask(self, codons):
+        """returns bool array, True where codons are stop codons
+
+        Parameters
+        ----------
+        codons
+            array of codon indices, as produced by to_codon_indices, of
+            any shape
+        """
+        return self.stop_mask.take(codons)
+
+    def get_longest_orfs(self, codons):
+        """returns the longest open reading frame for each sequence
+
+        Parameters
+        ----------
+        codons
+            1D or 2D array of codon indices, as produced by to_codon_indices.
+            If 2D, each row is a sequence.
+
+        Returns
+        -------
+        int array of [start, end) codon coordinates of the longest stretch
+        of codons without a stop. If 2D, one row per sequence. Ties are
+        resolved in favour of the 5'-most frame.
+        """
+        codons = numpy.asarray(codons)
+        single = codons.ndim == 1
+        codons = numpy.atleast_2d(codons)
+        num_seqs, num_codons = codons.shape
+        if num_codons == 0:
+            result = numpy.zeros((num_seqs, 2), dtype=int)
+            return result[0] if single else result
+
+        stops = self.stop_mask.take(codons)
+        positions = numpy.arange(1, num_codons + 1)
+        # start of the stop-free run ending at each position
+        starts = numpy.maximum.accumulate(numpy.where(stops, positions, 0), axis=1)
+        lengths = numpy.where(stops, -1, positions - starts)
+        ends = lengths.argmax(axis=1)
+        rows = numpy.arange(num_seqs)
+        result = numpy.column_stack([starts[rows, ends], ends + 1])
+        # sequences that are all stops
+        result[lengths[rows, ends] < 0] = 0
+        return result[0] if single else result
 
     def get_stop_indices(self, dna, start=0):
-        """returns indexes for stop codons in the specified frame"""
-        stops = self["*"]
-        stop_pattern = "(%s)" % "|".join(stops)
-        stop_pattern = re.compile(stop_pattern)
-        seq = str(dna)
-        found = [hit.start() for hit in stop_pattern.finditer(seq)]
-        found = [index for index in found if index % 3 == start]
-        return found
+        """returns indexes for stop codons in the specified frame
+
+        Matching is case insensitive and U is treated as T."""
+        codons = to_codon_indices(_seq_to_nt_indices(dna)[start:])
+        return [start + 3 * i for i in self.stop_mask.take(codons).nonzero()[0]]
 
     def sixframes(self, dna):
         """Returns six-frame translation as dict containing {frame:translation}"""
-        reverse = dna.rc()
-        return [self.translate(dna, start) for start in range(3)] + [
-            self.translate(reverse, start) for start in range(3)
-        ]
+        indices = _seq_to_nt_indices(dna)
+        if not len(indices):
+            return [""] * 6
+        # complement of T, C, A, G is 2, 3, 0, 1
+        reverse = numpy.where(indices < 0, indices, (indices + 2) % 4)[::-1]
+        result = []
+        for strand in (indices, reverse):
+            for start in range(3):
+                if start + 1 > len(strand):
+                    raise ValueError("Translation starts after end of RNA")
+                result.append(self._translate_nt_indices(strand[start:]))
+        return result
 
     def is_start(self, codon):
         """Returns True if codon is a start codon, False otherwise."""
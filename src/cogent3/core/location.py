@@ -43,6 +43,8 @@ from bisect import bisect_left, bisect_right
 from functools import total_ordering
 from itertools import chain
 
+import numpy
+
 from cogent3.util.misc import (
     ClassChecker,
     ConstrainedList,
@@ -830,6 +832,346 @@ class Map(object):
         return zeroed
 
 
+class IndelMap(object):
+    """An array-backed map between alignment and sequence coordinates.
+
+    Equivalent to a Map of forward spans covering a contiguous segment,
+    parent[start:end], of the parent sequence with gaps (lost spans)
+    interspersed. The gaps are stored as parallel integer arrays of their
+    positions (in sequence coordinates relative to start) and lengths, so
+    construction, slicing and coordinate conversion are numpy operations
+    that do not create Span objects.
+
+    Notes
+    -----
+    A Map instance is only created if requested via to_map().
+    """
+
+    __slots__ = (
+        "gap_pos",
+        "gap_lengths",
+        "cum_gap_lengths",
+        "start",
+        "end",
+        "parent_length",
+        "length",
+        "_map",
+        "_inverse",
+    )
+
+    def __init__(self, gap_pos, gap_lengths, start=0, end=None, parent_length=None):
+        """
+        Parameters
+        ----------
+        gap_pos
+            sorted, unique, positions in the sequence segment at which gaps
+            are inserted
+        gap_lengths
+            the length of each gap
+        start, end
+            the segment of the parent sequence covered. end defaults to
+            parent_length.
+        parent_length
+            length of the ungapped parent sequence
+        """
+        assert parent_length is not None
+        end = parent_length if end is None else end
+        start, end, parent_length = int(start), int(end), int(parent_length)
+        gap_pos = numpy.array(gap_pos, dtype=int).flatten()
+        gap_lengths = numpy.array(gap_lengths, dtype=int).flatten()
+        if gap_pos.shape != gap_lengths.shape:
+            raise ValueError("gap_pos and gap_lengths must have the same length")
+        if not 0 <= start <= end <= parent_length:
+            raise ValueError(f"invalid segment {start}:{end} of {parent_length}")
+        if len(gap_pos) and (
+            gap_pos[0] < 0
+            or gap_pos[-1] > end - start
+            or (numpy.diff(gap_pos) <= 0).any()
+            or (gap_lengths <= 0).any()
+        ):
+            raise ValueError("gap positions must be sorted, unique and in range")
+
+        self.gap_pos = gap_pos
+        self.gap_lengths = gap_lengths
+        self.cum_gap_lengths = gap_lengths.cumsum()
+        self.start = start
+        self.end = end
+        self.parent_length = parent_length
+        num_gaps = self.cum_gap_lengths[-1] if len(gap_lengths) else 0
+        self.length = int(end - start + num_gaps)
+        self._map = None
+        self._inverse = None
+
+    @classmethod
+    def from_gapped_seq(cls, seq, gap="-"):
+        """returns IndelMap and the ungapped sequence
+
+        Parameters
+        ----------
+        seq : str or bytes
+            gapped sequence
+        gap : str
+            gap character
+        """
+        raw = seq.encode("latin-1") if isinstance(seq, str) else seq
+        data = numpy.frombuffer(raw, dtype=numpy.uint8)
+        indel_map = cls.from_gapped_array(data, ord(gap))
+        if not len(indel_map.gap_pos):
+            return indel_map, seq
+        return indel_map, seq.replace(gap, "" if isinstance(seq, str) else b"")
+
+    @classmethod
+    def from_gapped_array(cls, data, gap_index):
+        """returns IndelMap for a 1D array of gapped sequence indices"""
+        is_gap = numpy.asarray(data) == gap_index
+        delta = numpy.diff(is_gap.astype(numpy.int8), prepend=0, append=0)
+        run_starts = numpy.flatnonzero(delta == 1)
+        run_lengths = numpy.flatnonzero(delta == -1) - run_starts
+        # the alignment position of a gap less the gaps that precede it
+        gap_pos = run_starts - (run_lengths.cumsum() - run_lengths)
+        seq_length = len(is_gap) - run_lengths.sum()
+        return cls(gap_pos, run_lengths, parent_length=seq_length)
+
+    @classmethod
+    def from_map(cls, map):
+        """returns an IndelMap equivalent to a Map
+
+        Raises
+        ------
+        ValueError if the Map has reversed, overlapping or discontinuous spans,
+        terminal padding, tidy ends or values.
+        """
+        gap_pos = []
+        gap_lengths = []
+        start = end = None
+        for span in map.spans:
+            if span.lost:
+                if span.terminal or span.value is not None:
+                    raise ValueError(f"cannot represent {map!r} as an IndelMap")
+                if not span.length:
+                    continue
+                pos = 0 if start is None else end - start
+                if gap_lengths and gap_pos[-1] == pos:
+                    gap_lengths[-1] += span.length
+                else:
+                    gap_pos.append(pos)
+                    gap_lengths.append(span.length)
+                continue
+
+            if (
+                span.reverse
+                or span.tidy_start
+                or span.tidy_end
+                or span.value is not None
+            ):
+                raise ValueError(f"cannot represent {map!r} as an IndelMap")
+
+            if start is None:
+                start = span.start
+            elif span.start != end:
+                raise ValueError(f"cannot represent {map!r} as an IndelMap")
+            end = span.end
+
+        if start is None:
+            start = end = 0
+        return cls(gap_pos, gap_lengths, start, end, map.parent_length)
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        gaps = ", ".join(
+            f"{p}:{l}" for p, l in zip(self.gap_pos.tolist(), self.gap_lengths.tolist())
+        )
+        span = f"{self.start}:{self.end}/{self.parent_length}"
+        return f"{self.__class__.__name__}([{gaps}], {span})"
+
+    def __eq__(self, other):
+        if not isinstance(other, IndelMap):
+            return False
+        return (
+            (self.start, self.end, self.parent_length)
+            == (other.start, other.end, other.parent_length)
+            and numpy.array_equal(self.gap_pos, other.gap_pos)
+            and numpy.array_equal(self.gap_lengths, other.gap_lengths)
+        )
+
+    def __getstate__(self):
+        return (
+            self.gap_pos,
+            self.gap_lengths,
+            self.start,
+            self.end,
+            self.parent_length,
+        )
+
+    def __setstate__(self, args):
+        self.__init__(*args)
+
+    @property
+    def useful(self):
+        return self.end > self.start
+
+    @property
+    def complete(self):
+        return len(self.gap_pos) == 0
+
+    @property
+    def num_gaps(self):
+        """total number of gap positions"""
+        return self.length - (self.end - self.start)
+
+    @property
+    def gap_align_starts(self):
+        """alignment positions at which each gap begins"""
+        return self.gap_pos + self.cum_gap_lengths - self.gap_lengths
+
+    def get_align_index(self, seq_index):
+        """returns alignment indices for sequence indices (relative to start)
+
+        seq_index can be an int or array of ints
+        """
+        seq_index = numpy.asarray(seq_index)
+        num_gaps = numpy.concatenate(([0], self.cum_gap_lengths))
+        index = numpy.searchsorted(self.gap_pos, seq_index, "right")
+        return seq_index + num_gaps[index]
+
+    def get_seq_index(self, align_index):
+        """returns sequence indices (relative to start) for alignment indices
+
+        A gap position maps to the index of the next sequence position.
+        """
+        align_index = numpy.asarray(align_index)
+        if not len(self.gap_pos):
+            return align_index
+
+        gap_starts = self.gap_align_starts
+        # k is the number of gaps that begin before align_index
+        k = numpy.searchsorted(gap_starts, align_index, "left")
+        last = numpy.maximum(k - 1, 0)
+        prev = self.cum_gap_lengths[last] - self.gap_lengths[last]
+        partial = numpy.minimum(align_index - gap_starts[last], self.gap_lengths[last])
+        before = numpy.where(k > 0, prev + partial, 0)
+        return align_index - before
+
+    def __getitem__(self, index):
+        """returns IndelMap for alignment positions selected by index, an int
+        or a slice. If the slice step is not 1, the selected positions are not
+        a contiguous segment of the parent so a Map is returned."""
+        lo, hi, step = _norm_slice(index, self.length)
+        if (step or 1) != 1:
+            return self._stepped(index)
+
+        hi = max(lo, hi)
+        seq_lo, seq_hi = self.get_seq_index([lo, hi]).tolist()
+        gap_starts = self.gap_align_starts
+        gap_ends = gap_starts + self.gap_lengths
+        lengths = numpy.minimum(gap_ends, hi) - numpy.maximum(gap_starts, lo)
+        keep = lengths > 0
+        return self.__class__(
+            self.gap_pos[keep] - seq_lo,
+            lengths[keep],
+            self.start + seq_lo,
+            self.start + seq_hi,
+            self.parent_length,
+        )
+
+    def __add__(self, other):
+        """concatenates adjacent segments of the same parent, otherwise
+        returns the equivalent Map"""
+        if other.parent_length != self.parent_length:
+            raise ValueError("Those maps belong to different sequences")
+
+        if not isinstance(other, IndelMap):
+            return Map(
+                spans=self._spans() + other.spans, parent_length=self.parent_length
+            )
+
+        if other.start != self.end:
+            spans = self._spans() + other._spans()
+            return Map(spans=spans, parent_length=self.parent_length)
+
+        seq_length = self.end - self.start
+        gap_pos = numpy.concatenate((self.gap_pos, other.gap_pos + seq_length))
+        gap_lengths = numpy.concatenate((self.gap_lengths, other.gap_lengths))
+        # merge a trailing gap with a leading gap
+        merged = numpy.flatnonzero(numpy.diff(gap_pos) == 0)
+        if len(merged):
+            gap_lengths[merged] += gap_lengths[merged + 1]
+            gap_pos = numpy.delete(gap_pos, merged + 1)
+            gap_lengths = numpy.delete(gap_lengths, merged + 1)
+        return self.__class__(
+            gap_pos, gap_lengths, self.start, other.end, self.parent_length
+        )
+
+    def zeroed(self):
+        """returns a new instance on the segment alone, i.e. with start 0"""
+        return self.__class__(
+            self.gap_pos,
+            self.gap_lengths,
+            0,
+            self.end - self.start,
+            self.end - self.start,
+        )
+
+    def _spans(self):
+        """returns the spans of the equivalent Map"""
+        spans = []
+        last = 0
+        for pos, length in zip(self.gap_pos.tolist(), self.gap_lengths.tolist()):
+            if pos > last:
+                spans.append(Span(self.start + last, self.start + pos))
+            spans.append(LostSpan(length))
+            last = pos
+        if self.end > self.start + last:
+            spans.append(Span(self.start + last, self.end))
+        return spans
+
+    def _stepped(self, index):
+        """returns Map of the alignment positions selected by a slice with a
+        step other than 1, one span per position"""
+        align_index = numpy.arange(self.length)[index]
+        seq_index = self.get_seq_index(align_index)
+        is_gap = self.get_align_index(seq_index) != align_index
+        seq_index = seq_index + self.start
+        spans = [
+            LostSpan(1) if gap else Span(i, i + 1)
+            for i, gap in zip(seq_index.tolist(), is_gap.tolist())
+        ]
+        return Map(spans=spans, parent_length=self.parent_length)
+
+    def to_map(self):
+        """returns the equivalent Map"""
+        if self._map is None:
+            self._map = Map(spans=self._spans(), parent_length=self.parent_length)
+        return self._map
+
+    def get_coordinates(self):
+        """returns the (start, end) of the covered parent sequence segment"""
+        return [(self.start, self.end)] if self.useful else []
+
+    def inverse(self):
+        """returns Map from parent sequence to alignment coordinates"""
+        if self._inverse is not None:
+            return self._inverse
+
+        # the ungapped blocks of the segment, in sequence coordinates
+        bounds = numpy.unique(
+            numpy.concatenate(([0], self.gap_pos, [self.end - self.start]))
+        )
+        starts = bounds[:-1]
+        align_starts = self.get_align_index(starts)
+        lengths = numpy.diff(bounds)
+        spans = [LostSpan(self.start)] if self.start else []
+        spans.extend(
+            Span(a, a + l) for a, l in zip(align_starts.tolist(), lengths.tolist())
+        )
+        if self.parent_length > self.end:
+            spans.append(LostSpan(self.parent_length - self.end))
+        self._inverse = Map(spans=spans, parent_length=self.length)
+        return self._inverse
+
+
 class SpansOnly(ConstrainedList):
     """List that converts elements to Spans on addition."""
 
@@ -915,12 +915,12 @@ class MolType(object):
 
         Always returns same type as input.
         """
+        if isinstance(item, str):
+            return item.__class__(self.complement(item)[::-1])
+
         comp = list(self.complement(item))
         comp.reverse()
-        if isinstance(item, str):
-            return item.__class__("".join(comp))
-        else:
-            return item.__class__(comp)
+        return item.__class__(comp)
 
     def strand_symmetric_motifs(self, motif_length=1):
         """returns ordered pairs of strand complementary motifs"""
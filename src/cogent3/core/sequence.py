@@ -18,19 +18,23 @@ import re
 import warnings
 
 from functools import total_ordering
+from itertools import product
 from operator import eq, ne
 from random import shuffle
+from types import MappingProxyType
 
 from numpy import (
     arange,
     array,
     compress,
+    int16,
     logical_not,
     logical_or,
     nonzero,
     put,
     ravel,
     take,
+    uint8,
     zeros,
 )
 from numpy.random import permutation
@@ -56,7 +60,8 @@ from cogent3.util.transform import (
     per_shortest,
 )
 
-from .annotation import Map, _Annotatable
+from .annotation import Feature, Map, _Annotatable
+from .location import IndelMap
 
 
 __author__ = "Rob Knight, Gavin Huttley, and Peter Maxwell"
@@ -81,6 +86,172 @@ frac_same = for_seq(f=eq, aggregator=sum, normalizer=per_shortest)
 frac_diff = for_seq(f=ne, aggregator=sum, normalizer=per_shortest)
 
 
+def _rows_from_gff_dicts(records):
+    """yields (ID, Parents, Type, Start, End) from gff_parser dicts, all
+    having the same SeqID"""
+    first_seqname = None
+    for gff_dict in records:
+        if first_seqname is None:
+            first_seqname = gff_dict["SeqID"]
+        else:
+            assert gff_dict["SeqID"] == first_seqname, (
+                gff_dict["SeqID"],
+                first_seqname,
+            )
+        attrs = gff_dict["Attributes"]
+        yield (
+            attrs["ID"],
+            attrs.get("Parent", []),
+            gff_dict["Type"],
+            gff_dict["Start"],
+            gff_dict["End"],
+        )
+
+
+def _parents_first(parents):
+    """returns a list of feature id's with parents before children
+
+    Parameters
+    ----------
+    parents : dict
+        {id: [parent id, ...], ...}. Parents not in parents are ignored.
+    """
+    ordered = []
+    done = set()
+    for first in parents:
+        while first not in done:
+            # walk up to the first ancestor whose parents are all done
+            key, seen = first, {first}
+            while True:
+                parent = next(
+                    (p for p in parents[key] if p in parents and p not in done), None
+                )
+                if parent is None:
+                    break
+                if parent in seen:
+                    raise ValueError(f"cyclic Parent relationship involving {parent!r}")
+                key = parent
+                seen.add(key)
+            ordered.append(key)
+            done.add(key)
+    return ordered
+
+
+def _translate_codon(codon, gc, codon_alphabet, protein, incomplete_ok, name):
+    """returns amino acid for a codon, which may include ambiguity codes
+
+    Parameters
+    ----------
+    codon : str
+        the codon
+    gc
+        genetic code instance
+    codon_alphabet
+        codon alphabet, including the gap motif
+    protein
+        protein moltype
+    incomplete_ok : bool
+        codons that are mixes of nucleotide and gaps converted to '?'.
+        raises a ValueError if False
+    name : str
+        sequence name, used in error messages
+    """
+    try:
+        resolved = codon_alphabet.resolve_ambiguity(codon)
+    except AlphabetError:
+        if not incomplete_ok or "-" not in codon:
+            raise
+        resolved = (codon,)
+    trans = []
+    for resolved_codon in resolved:
+        if resolved_codon == "---":
+            aa = "-"
+        elif "-" in resolved_codon:
+            aa = "?"
+            if not incomplete_ok:
+                raise AlphabetError(f"incomplete codon {resolved_codon} in {name}")
+        else:
+            aa = gc[resolved_codon]
+            if aa == "*":
+                continue
+        trans.append(aa)
+    if not trans:
+        raise ValueError(codon)
+    return protein.what_ambiguity(trans)
+
+
+_translation_tables = {}
+
+
+def _get_translation_table(gc, moltype, incomplete_ok):
+    """returns array mapping codon indices to amino acid indices
+
+    A codon index is (i * n + j) * n + k, where n is the length of
+    moltype.alphabets.degen_gapped and i, j, k are the nucleotide indices.
+    Values are indices in PROTEIN.alphabets.degen_gapped, -1 for codons that
+    cannot be translated.
+    """
+    key = (gc.code_sequence, moltype.label, incomplete_ok)
+    if key in _translation_tables:
+        return _translation_tables[key]
+
+    nt_alphabet = moltype.alphabets.degen_gapped
+    protein = NucleicAcidSequence.protein
+    codon_alphabet = moltype.make_seq("").codon_alphabet(gc).with_gap_motif()
+    aa_index = protein.alphabets.degen_gapped.index
+    table = []
+    for codon in product(nt_alphabet, repeat=3):
+        codon = "".join(codon)
+        try:
+            aa = _translate_codon(codon, gc, codon_alphabet, protein, incomplete_ok, "")
+            table.append(aa_index(aa))
+        except (AlphabetError, ValueError, KeyError):
+            table.append(-1)
+    table = array(table, dtype=int16)
+    _translation_tables[key] = table
+    return table
+
+
+def _translate_indices(indices, gc, moltype, incomplete_ok, names):
+    """returns amino acid indices for array of nucleotide indices
+
+    Parameters
+    ----------
+    indices : numpy.ndarray
+        2D array of indices in moltype.alphabets.degen_gapped, one row per
+        sequence. A terminal incomplete codon is ignored.
+    names
+        sequence names, used in error messages
+
+    Raises
+    ------
+    AlphabetError or ValueError identifying the first codon that cannot be
+    translated
+    """
+    nt_alphabet = moltype.alphabets.degen_gapped
+    size = len(nt_alphabet)
+    table = _get_translation_table(gc, moltype, incomplete_ok)
+    num_codons = indices.shape[1] // 3
+    codons = indices[:, : num_codons * 3].reshape(len(indices), num_codons, 3)
+    result = table.take(codons.astype(int).dot([size * size, size, 1]))
+    invalid = result < 0
+    if invalid.any():
+        row, col = divmod(int(invalid.argmax()), num_codons)
+        codon = nt_alphabet.to_string(codons[row, col].astype(uint8))
+        codon_alphabet = moltype.make_seq("").codon_alphabet(gc).with_gap_motif()
+        protein = NucleicAcidSequence.protein
+        _translate_codon(codon, gc, codon_alphabet, protein, incomplete_ok, names[row])
+        raise ValueError(codon)
+    return result.astype(uint8)
+
+
+def _get_info(seq):
+    """returns the info of seq, None if absent or not yet created"""
+    if isinstance(seq, (Sequence, ArraySequenceBase)):
+        return seq._info
+    return getattr(seq, "info", None)
+
+
 @total_ordering
 class SequenceI(object):
     """Abstract class containing Sequence interface.
@@ -89,6 +260,8 @@ class SequenceI(object):
     detecting gaps.
     """
 
+    __slots__ = ()
+
     # String methods delegated to self._seq -- remember to override if self._seq
     # isn't a string in your base class, but it's probably better to make
     # self._seq a property that contains the string.
@@ -121,7 +294,7 @@ class SequenceI(object):
 
     def to_rich_dict(self):
         """returns {'name': name, 'seq': sequence, 'moltype': moltype.label}"""
-        info = {} if self.info is None else self.info
+        info = {} if self._info is None else self._info
         if not info.get("Refs", None) is None and "Refs" in info:
             info.pop("Refs")
 
@@ -280,6 +453,30 @@ class SequenceI(object):
         """Removes any symbols not in the alphabet, and any gaps."""
         return self.__class__(self.moltype.strip_bad_and_gaps(self), info=self.info)
 
+    def sliding_windows(self, window, step, start=None, end=None):
+        """Generator function that yield new sequence objects
+        of a given length at a given interval.
+
+        Parameters
+        ----------
+        window
+            The length of the returned sequence
+        step
+            The interval between the start of the returned
+            sequence objects
+        start
+            first window start position
+        end
+            last window start position
+
+        """
+        start = [start, 0][start is None]
+        end = [end, len(self) - window + 1][end is None]
+        end = min(len(self) - window + 1, end)
+        if start < end and len(self) - end >= window - 1:
+            for pos in range(start, end, step):
+                yield self[pos : pos + window]
+
     def rc(self):
         """Returns reverse complement of self w/ data from MolType.
 
@@ -760,9 +957,28 @@ class SequenceI(object):
 
 @total_ordering
 class Sequence(_Annotatable, SequenceI):
-    """Holds the standard Sequence object. Immutable."""
+    """Holds the standard Sequence object. Immutable.
+
+    Notes
+    -----
+    Attributes are stored in slots, the info object is created on first
+    access and the repr policy is shared, so the per-instance overhead is
+    small relative to the sequence string.
+    """
+
+    # an instance __dict__ is only created if other attributes are assigned
+    __slots__ = (
+        "name",
+        "_seq",
+        "_info",
+        "annotations",
+        "_annotation_index",
+        "__dict__",
+    )
 
     moltype = None  # connected to ACSII when moltype is imported
+    # shared by all instances, so read-only; replaced, not updated, on change
+    _repr_policy = MappingProxyType(dict(num_pos=60))
 
     def __init__(
         self,
@@ -808,23 +1024,37 @@ class Sequence(_Annotatable, SequenceI):
         if check:
             self.moltype.verify_sequence(self._seq, gaps_allowed, wildcards_allowed)
 
-        if not isinstance(info, InfoClass):
-            try:
-                info = InfoClass(info)
-            except TypeError:
-                info = InfoClass()
-        if hasattr(orig_seq, "info"):
-            try:
-                info.update(orig_seq.info)
-            except:
-                pass
-        self.info = info
-
+        orig_info = _get_info(orig_seq)
+        if info is not None or orig_info is not None:
+            if not isinstance(info, InfoClass):
+                try:
+                    info = InfoClass(info)
+                except TypeError:
+                    info = InfoClass()
+            if orig_info is not None:
+                try:
+                    info.update(orig_info)
+                except:
+                    pass
+        # otherwise, created on first access
+        self._info = info
+
+        self.annotations = ()
+        self._annotation_index = None
         if isinstance(orig_seq, _Annotatable):
             for ann in orig_seq.annotations:
                 ann.copy_annotations_to(self)
 
-        self._repr_policy = dict(num_pos=60)
+    @property
+    def info(self):
+        """Info object for the sequence"""
+        if self._info is None:
+            self._info = InfoClass()
+        return self._info
+
+    @info.setter
+    def info(self, info):
+        self._info = info
 
     def to_moltype(self, moltype):
         """returns copy of self with moltype seq
@@ -863,78 +1093,81 @@ class Sequence(_Annotatable, SequenceI):
         return new
 
     def annotate_from_gff(self, f, pre_parsed=False):
-        """annotates a Sequence from a gff file where each entry has the same SeqID"""
-        first_seqname = None
+        """annotates a Sequence from a gff file where each entry has the same SeqID
+
+        Parameters
+        ----------
+        f
+            path, file-like object, a gff.GffRecords instance or, if
+            pre_parsed, a series of dicts as produced by gff.gff_parser
+        pre_parsed : bool
+            f is a series of parsed records
+        """
+        if isinstance(f, gff.GffRecords):
+            records = f
+        elif not pre_parsed:
+            records = gff.gff_records(f)
+        else:
+            records = None
+
+        if records is not None:
+            seqids = set(records["SeqID"])
+            assert len(seqids) <= 1, seqids
+            rows = zip(
+                records.ids,
+                records.parents,
+                records["Type"],
+                records["Start"].tolist(),
+                records["End"].tolist(),
+            )
+        else:
+            rows = _rows_from_gff_dicts(f)
+
         # only features with parent features included in the 'features' dict
         features = dict()
+        top_level = []
         fake_id = 0
-        if pre_parsed:
-            gff_contents = f
-        else:
-            gff_contents = gff.gff_parser(f)
-        for gff_dict in gff_contents:
-            if first_seqname is None:
-                first_seqname = gff_dict["SeqID"]
-            else:
-                assert gff_dict["SeqID"] == first_seqname, (
-                    gff_dict["SeqID"],
-                    first_seqname,
-                )
+        for id_, parents, type_, start, end in rows:
             # ensure the ID is unique
-            id_ = gff_dict["Attributes"]["ID"]
-            if id_ in features.keys():
-                id_ = f"{id_}:{gff_dict['Type']}:{gff_dict['Start']}-{gff_dict['End']}:{fake_id}"
+            orig_id = id_
+            if id_ in features:
+                id_ = f"{id_}:{type_}:{start}-{end}:{fake_id}"
                 fake_id = fake_id + 1
-            if "Parent" not in gff_dict["Attributes"].keys():
-                self.add_feature(
-                    gff_dict["Type"], id_, [(gff_dict["Start"], gff_dict["End"])]
-                )
+            if not parents:
+                top_level.append(Feature(self, type_, id_, [(start, end)]))
                 continue
-            features[id_] = gff_dict
-        if features:
-            parents = {}
-            for id_ in features.keys():
-                parents[id_] = features[id_]["Attributes"]["Parent"]
-            sorted_features = self._sort_parents(
-                parents, [], next(iter(features.keys()))
-            )
-            for id_ in sorted_features:
-                matches = []
-                for parent in features[id_]["Attributes"]["Parent"]:
-                    # If a feature has multiple parents, a separate instance is added to each parent
-                    matches.extend(
-                        self.get_annotations_matching(
-                            "*", name=parent, extend_query=True
-                        )
-                    )
-                for parent in matches:
-                    # Start and end are relative to the parent's absolute starting position
-                    if parent.name not in features.keys():
-                        parent_min = 0
-                    else:
-                        parent_min = min(
-                            features[parent.name]["Start"], features[parent.name]["End"]
-                        )
-                    start = features[id_]["Start"] - parent_min
-                    end = features[id_]["End"] - parent_min
-                    parent.add_feature(
-                        features[id_]["Type"],
-                        features[id_]["Attributes"]["ID"],
-                        [(start, end)],
-                    )
-
-    def _sort_parents(self, parents, ordered, key):
-        """returns a list of feature id's with parents before children"""
-        keys = parents.keys()
-        if key in keys:
-            for parent in parents[key]:
-                if parent in keys:
-                    return self._sort_parents(parents, ordered, parent)
-        ordered.append(key)
-        parents.pop(key)
-        if not parents:
-            return ordered
-        return self._sort_parents(parents, ordered, next(iter(keys)))
+            features[id_] = (orig_id, parents, type_, start, end)
+
+        if top_level:
+            self.attach_annotations(top_level)
+
+        if not features:
+            return
+
+        # all annotations, by name, that children may be attached to
+        by_name = {}
+        stack = list(reversed(self.annotations))
+        while stack:
+            annot = stack.pop()
+            by_name.setdefault(annot.name, []).append(annot)
+            stack.extend(reversed(annot.annotations))
+
+        for id_ in _parents_first({k: v[1] for k, v in features.items()}):
+            orig_id, parents, type_, start, end = features[id_]
+            # If a feature has multiple parents, a separate instance is added
+            # to each parent
+            matches = [m for parent in parents for m in by_name.get(parent, [])]
+            for parent in matches:
+                # Start and end are relative to the parent's absolute starting
+                # position
+                if parent.name not in features:
+                    parent_min = 0
+                else:
+                    parent_min = min(features[parent.name][3:])
+                child = parent.add_feature(
+                    type_, orig_id, [(start - parent_min, end - parent_min)]
+                )
+                by_name.setdefault(orig_id, []).append(child)
 
     def with_masked_annotations(
         self, annot_types, mask_char=None, shadow=False, extend_query=False
@@ -1008,7 +1241,31 @@ class Sequence(_Annotatable, SequenceI):
             for motif in segment:
                 yield motif
 
+    def _gapped_by_indel_map(self, indel_map, recode_gaps=False):
+        """returns gapped string for an IndelMap"""
+        seq = self._seq[indel_map.start : indel_map.end]
+        gap = "-?"[recode_gaps]
+        segments = []
+        last = 0
+        for pos, length in zip(
+            indel_map.gap_pos.tolist(), indel_map.gap_lengths.tolist()
+        ):
+            segments.extend([seq[last:pos], gap * length])
+            last = pos
+        segments.append(seq[last:])
+        return "".join(segments)
+
     def gapped_by_map(self, map, recode_gaps=False):
+        if isinstance(map, IndelMap):
+            if not self.annotations:
+                return self.__class__(
+                    self._gapped_by_indel_map(map, recode_gaps),
+                    name=self.name,
+                    check=False,
+                    info=self.info,
+                )
+            map = map.to_map()
+
         segments = self.gapped_by_map_segment_iter(map, True, recode_gaps)
         new = self.__class__(
             "".join(segments), name=self.name, check=False, info=self.info
@@ -1081,30 +1338,6 @@ class Sequence(_Annotatable, SequenceI):
         ambigs = self.moltype.resolve_ambiguity
         return [ambigs(motif) for motif in self._seq]
 
-    def sliding_windows(self, window, step, start=None, end=None):
-        """Generator function that yield new sequence objects
-        of a given length at a given interval.
-
-        Parameters
-        ----------
-        window
-            The length of the returned sequence
-        step
-            The interval between the start of the returned
-            sequence objects
-        start
-            first window start position
-        end
-            last window start position
-
-        """
-        start = [start, 0][start is None]
-        end = [end, len(self) - window + 1][end is None]
-        end = min(len(self) - window + 1, end)
-        if start < end and len(self) - end >= window - 1:
-            for pos in range(start, end, step):
-                yield self[pos : pos + window]
-
     def get_in_motif_size(self, motif_length=1, log_warnings=True):
         """returns sequence as list of non-overlapping motifs
 
@@ -1199,18 +1432,20 @@ class Sequence(_Annotatable, SequenceI):
 class ProteinSequence(Sequence):
     """Holds the standard Protein sequence."""
 
-    pass
+    __slots__ = ()
 
 
 class ProteinWithStopSequence(Sequence):
     """Holds the standard Protein sequence, allows for stop codon."""
 
-    pass
+    __slots__ = ()
 
 
 class NucleicAcidSequence(Sequence):
     """Abstract base class for DNA and RNA sequences."""
 
+    __slots__ = ()
+
     PROTEIN = None  # will set in moltype
     codon_alphabet = None  # will set in moltype
 
@@ -1221,7 +1456,7 @@ class NucleicAcidSequence(Sequence):
 
     def rc(self):
         """Converts a nucleic acid sequence to its reverse complement."""
-        complement = self.moltype.rc(self)
+        complement = self.moltype.rc(self._seq)
         rc = self.__class__(complement, name=self.name, info=self.info)
         self._annotations_nucleic_reversed_on(rc)
         return rc
@@ -1290,35 +1525,29 @@ class NucleicAcidSequence(Sequence):
         sequence of PROTEIN moltype
         """
         gc = get_code(gc)
-        codon_alphabet = self.codon_alphabet(gc).with_gap_motif()
-        # translate the codons
-        translation = []
-        for posn in range(0, len(self._seq) - 2, 3):
-            orig_codon = self._seq[posn : posn + 3]
-            try:
-                resolved = codon_alphabet.resolve_ambiguity(orig_codon)
-            except AlphabetError:
-                if not incomplete_ok or "-" not in orig_codon:
-                    raise
-                resolved = (orig_codon,)
-            trans = []
-            for codon in resolved:
-                if codon == "---":
-                    aa = "-"
-                elif "-" in codon:
-                    aa = "?"
-                    if not incomplete_ok:
-                        raise AlphabetError(f"incomplete codon {codon} in {self.name}")
-                else:
-                    aa = gc[codon]
-                    if aa == "*":
-                        continue
-                trans.append(aa)
-            if not trans:
-                raise ValueError(orig_codon)
-            aa = self.protein.what_ambiguity(trans)
-            translation.append(aa)
-
+        alphabet = self.moltype.alphabets.degen_gapped
+        indices = alphabet.from_string(self._seq)
+        if len(indices) == len(self._seq) and (
+            not len(indices) or indices.max() < len(alphabet)
+        ):
+            translated = _translate_indices(
+                indices.reshape(1, -1), gc, self.moltype, incomplete_ok, [self.name]
+            )
+            translation = self.protein.alphabets.degen_gapped.to_string(translated[0])
+        else:
+            # characters not in the alphabet, done codon by codon
+            codon_alphabet = self.codon_alphabet(gc).with_gap_motif()
+            translation = [
+                _translate_codon(
+                    self._seq[posn : posn + 3],
+                    gc,
+                    codon_alphabet,
+                    self.protein,
+                    incomplete_ok,
+                    self.name,
+                )
+                for posn in range(0, len(self._seq) - 2, 3)
+            ]
         translation = self.protein.make_seq(seq="".join(translation), name=self.name)
 
         return translation
@@ -1375,6 +1604,8 @@ class NucleicAcidSequence(Sequence):
 class DnaSequence(NucleicAcidSequence):
     """Holds the standard DNA sequence."""
 
+    __slots__ = ()
+
     def _seq_filter(self, seq):
         """Converts U to T."""
         return seq.replace("u", "t").replace("U", "T")
@@ -1383,6 +1614,8 @@ class DnaSequence(NucleicAcidSequence):
 class RnaSequence(NucleicAcidSequence):
     """Holds the standard RNA sequence."""
 
+    __slots__ = ()
+
     def _seq_filter(self, seq):
         """Converts T to U."""
         return seq.replace("t", "u").replace("T", "U")
@@ -1391,12 +1624,14 @@ class RnaSequence(NucleicAcidSequence):
 class ABSequence(Sequence):
     """Holds a two-state sequence, with characters of 'a', 'b'"""
 
-    pass
+    __slots__ = ()
 
 
 class ByteSequence(Sequence):
     """Used for storing arbitrary bytes."""
 
+    __slots__ = ()
+
     def __init__(self, seq="", name=None, info=None, check=False, preserve_case=True):
         super(ByteSequence, self).__init__(
             seq, name=name, info=info, check=check, preserve_case=preserve_case
@@ -1444,8 +1679,8 @@ class ArraySequenceBase(object):
         """
         if name is None and hasattr(data, "name"):
             name = data.name
-        if info is None and hasattr(data, "info"):
-            info = data.info
+        if info is None:
+            info = _get_info(data)
         # set the label
         self.name = name
         # override the class alphabet if supplied
@@ -1466,15 +1701,30 @@ class ArraySequenceBase(object):
                 self._from_sequence(data)
 
         self.moltype = self.alphabet.moltype
-        self.info = info
+        self._info = info
         self._repr_policy = dict(num_pos=60)
 
+    @property
+    def info(self):
+        return self._info
+
+    @info.setter
+    def info(self, info):
+        self._info = info
+
     def __getitem__(self, *args):
-        """__getitem__ returns char or slice, as same class."""
+        """__getitem__ returns char or slice, as same class.
+
+        Slices share data with self as a read-only view, assigning into
+        it raises a ValueError. Use copy() to obtain an independent sequence
+        with writeable data.
+        """
         if len(args) == 1 and not isinstance(args[0], slice):
             result = array([self._data[args[0]]])
         else:
             result = self._data.__getitem__(*args)
+            if result.base is not None:
+                result.flags.writeable = False
         return self.__class__(result)
 
     def __lt__(self, other):
@@ -1488,7 +1738,10 @@ class ArraySequenceBase(object):
     def _from_sequence(self, data):
         """Fills self using the values in data, via the alphabet."""
         if self.alphabet:
-            indices = self.alphabet.to_indices(data)
+            if isinstance(data, str) and hasattr(self.alphabet, "to_index_array"):
+                indices = self.alphabet.to_index_array(data)
+            else:
+                indices = self.alphabet.to_indices(data)
             self._data = array(indices, self.alphabet.array_type)
         else:
             self._data = array(data)
@@ -30,13 +30,40 @@ import re
 
 from copy import deepcopy
 from functools import reduce
-from itertools import combinations
+from itertools import combinations, permutations
 from operator import or_
 from random import choice, shuffle
 
-from numpy import argsort, ceil, log, zeros
+import numpy
+
+from numpy import (
+    arange,
+    argsort,
+    array,
+    asarray,
+    bincount,
+    ceil,
+    concatenate,
+    diff,
+    empty,
+    fill_diagonal,
+    frexp,
+    full,
+    isnan,
+    ix_,
+    lexsort,
+    log,
+    maximum,
+    minimum,
+    nan,
+    searchsorted,
+    where,
+    zeros,
+)
 
 from cogent3.maths.stats.test import correlation
+from cogent3.parse.newick import parse_string as newick_parse_string
+from cogent3.util.dict_array import DictArrayTemplate
 from cogent3.util.misc import (
     atomic_write,
     get_format_suffixes,
@@ -89,7 +116,8 @@ class TreeNode(object):
         name_loaded: ?
     """
 
-    _exclude_from_copy = dict.fromkeys(["_parent", "children"])
+    _exclude_from_copy = dict.fromkeys(["_parent", "children", "_lca_index"])
+    _lca_index = None
 
     def __init__(
         self,
@@ -173,8 +201,10 @@ class TreeNode(object):
         if isinstance(i, c):
             if i._parent not in (None, self):
                 i._parent.children.remove(i)
+            i._clear_lca_index()
         else:
             i = c(i)
+        self._clear_lca_index()
         i._parent = self
         return i
 
@@ -194,6 +224,7 @@ class TreeNode(object):
         """Returns and deletes child of self at index (default: -1)"""
         result = self.children.pop(index)
         result._parent = None
+        self._clear_lca_index()
         return result
 
     def remove(self, target):
@@ -217,6 +248,7 @@ class TreeNode(object):
     def __setitem__(self, i, val):
         """Node[i] = x sets the corresponding item in children."""
         curr = self.children[i]
+        self._clear_lca_index()
         if isinstance(i, slice):
             for c in curr:
                 c._parent = None
@@ -230,6 +262,7 @@ class TreeNode(object):
     def __delitem__(self, i):
         """del node[i] deletes index or slice from self.children."""
         curr = self.children[i]
+        self._clear_lca_index()
         if isinstance(i, slice):
             for c in curr:
                 c._parent = None
@@ -322,8 +355,10 @@ class TreeNode(object):
         """Mutator for parent: cleans up refs in old parent."""
         if self._parent is not None:
             self._parent.remove_node(self)
+        self._clear_lca_index()
         self._parent = parent
         if (parent is not None) and (self not in parent.children):
+            parent._clear_lca_index()
             parent.children.append(self)
 
     parent = property(_get_parent, _set_parent)
@@ -609,58 +644,52 @@ class TreeNode(object):
         result.append(curr)
         return result
 
+    def _get_lca_index(self):
+        """the _LCAIndex of the tree containing self, built if absent or
+        out of date"""
+        index = self._lca_index
+        if index is None or index.stale:
+            index = _LCAIndex(self.root())
+        return index
+
+    def _clear_lca_index(self):
+        """marks the _LCAIndex of the tree containing self, if any, as out
+        of date"""
+        if self._lca_index is not None:
+            self._lca_index.stale = True
+
     def last_common_ancestor(self, other):
         """Finds last common ancestor of self and other, or None.
 
         Always tests by identity.
+
+        Notes
+        -----
+        Queries are answered in constant time from an index of the tree
+        built on first use, which is discarded when the tree is modified.
         """
-        my_lineage = set([id(node) for node in [self] + self.ancestors()])
-        curr = other
-        while curr is not None:
-            if id(curr) in my_lineage:
-                return curr
-            curr = curr._parent
-        return None
+        index = self._get_lca_index()
+        return index.get_lca(self, other)
 
     def lowest_common_ancestor(self, tipnames):
         """Lowest common ancestor for a list of tipnames
 
-        This should be around O(H sqrt(n)), where H is height and n is the
-        number of tips passed in.
+        Tips that are not descendants of self are ignored, returns None if
+        none match. The search for the tips is linear in the number of tips,
+        the lowest common ancestor of the tips is then found in constant time.
         """
         if len(tipnames) == 1:
             return self.get_node_matching_name(tipnames[0])
 
         tipnames = set(tipnames)
-        tips = [tip for tip in self.tips() if tip.name in tipnames]
+        tips = [tip for tip in self.iter_tips() if tip.name in tipnames]
 
         if len(tips) == 0:
             return None
 
-        # scrub tree
-        if hasattr(self, "black"):
-            for n in self.traverse(include_self=True):
-                if hasattr(n, "black"):
-                    delattr(n, "black")
-
-        for t in tips:
-            prev = t
-            curr = t.parent
-
-            while curr and not hasattr(curr, "black"):
-                setattr(curr, "black", [prev])
-                prev = curr
-                curr = curr.parent
-
-            # increase black count, multiple children lead to here
-            if curr:
-                curr.black.append(prev)
-
-        curr = self
-        while len(curr.black) == 1:
-            curr = curr.black[0]
-
-        return curr
+        index = self._get_lca_index()
+        positions = [index.positions[id(tip)] for tip in tips]
+        return index.nodes[index.array_tree._lca(min(positions), max(positions))]
 
     lca = last_common_ancestor  # for convenience
 
@@ -1069,61 +1098,43 @@ class TreeNode(object):
             if c is not None and c is not parent
         ]
 
-    def _get_distances(self, endpoints=None):
-        """Iteratively calcluates all of the root-to-tip and tip-to-tip
-        distances, resulting in a tuple of:
-            - A list of (name, path length) pairs.
-            - A dictionary of (tip1,tip2):distance pairs
+    def _tip_distance_array(self, endpoints=None, default_length=1):
+        """returns the matrix of tip-to-tip distances and the tip nodes
+
+        Parameters
+        ----------
+        endpoints
+            series of tip names or nodes, defaults to all tips
+        default_length
+            used for branches with no length
+
+        Notes
+        -----
+        The tree is converted to an ArrayTree so distances are computed
+        for blocks of tips, rather than for each pair.
         """
-        # linearize the tips in postorder.
-        # .__start, .__stop compose the slice in tip_order.
+        nodes = list(self.preorder())
+        index = {id(node): i for i, node in enumerate(nodes)}
+        parents = [-1] + [index[id(node._parent)] for node in nodes[1:]]
+        lengths = [getattr(node, "length", None) for node in nodes]
+        tree = ArrayTree(range(len(nodes)), parents, lengths)
         if endpoints is None:
-            tip_order = list(self.tips())
+            tips = tree.tip_indices
         else:
-            tip_order = []
-            for i, name in enumerate(endpoints):
-                node = self.get_node_matching_name(name)
-                tip_order.append(node)
-        for i, node in enumerate(tip_order):
-            node.__start, node.__stop = i, i + 1
-
-        num_tips = len(tip_order)
-        result = {}
-        # distances from tip to curr node
-        tipdistances = zeros((num_tips), float)
-
-        def update_result():
-            # set tip_tip distance between tips of different child
-            for child1, child2 in combinations(node.children, 2):
-                for tip1 in range(child1.__start, child1.__stop):
-                    for tip2 in range(child2.__start, child2.__stop):
-                        name1 = tip_order[tip1].name
-                        name2 = tip_order[tip2].name
-                        result[(name1, name2)] = tipdistances[tip1] + tipdistances[tip2]
-                        result[(name2, name1)] = tipdistances[tip1] + tipdistances[tip2]
-
-        for node in self.traverse(self_before=False, self_after=True):
-            if not node.children:
-                continue
-            # subtree with solved child wedges
-            starts, stops = [], []  # to calc ._start and ._stop for curr node
-            for child in node.children:
-                if hasattr(child, "length") and child.length is not None:
-                    child_len = child.length
-                else:
-                    child_len = 1  # default length
-                tipdistances[child.__start : child.__stop] += child_len
-                starts.append(child.__start)
-                stops.append(child.__stop)
-            node.__start, node.__stop = min(starts), max(stops)
-            # update result if nessessary
-            if len(node.children) > 1:  # not single child
-                update_result()
-
-        from_root = []
-        for i, n in enumerate(tip_order):
-            from_root.append((n.name, tipdistances[i]))
-        return from_root, result
+            # the first node with a name, consistent with get_node_matching_name
+            by_name = {}
+            for node in nodes:
+                by_name.setdefault(node.name, node)
+            tips = []
+            for node in endpoints:
+                if not isinstance(node, TreeNode):
+                    if node not in by_name:
+                        raise TreeError("No node named '%s' in %s" % (node, self))
+                    node = by_name[node]
+                tips.append(index[id(node)])
+            tips = array(tips, dtype=int)
+        dists = tree._tip_distances(tips, default_length)
+        return dists, [nodes[i] for i in tips.tolist()]
 
     def get_distances(self, endpoints=None):
         """The distance matrix as a dictionary.
@@ -1132,9 +1143,33 @@ class TreeNode(object):
             Grabs the branch lengths (evolutionary distances) as
             a complete matrix (i.e. a,b and b,a).
         """
+        dists, nodes = self._tip_distance_array(endpoints)
+        names = [node.name for node in nodes]
+        dists = dists.tolist()
+        return {
+            (names[i], names[j]): dists[i][j]
+            for i, j in permutations(range(len(names)), 2)
+        }
 
-        (root_dists, endpoint_dists) = self._get_distances(endpoints)
-        return endpoint_dists
+    def get_distance_matrix(self, endpoints=None, default_length=1):
+        """returns the tip-to-tip distances as a DistanceMatrix
+
+        Parameters
+        ----------
+        endpoints
+            series of tip names, defaults to all tips
+        default_length
+            used for branches with no length
+
+        Notes
+        -----
+        Tip names must be unique.
+        """
+        from cogent3.evolve.fast_distance import DistanceMatrix
+
+        dists, nodes = self._tip_distance_array(endpoints, default_length)
+        names = [node.name for node in nodes]
+        return DistanceMatrix(DictArrayTemplate(names, names).wrap(dists))
 
     def set_max_tip_tip_distance(self):
         """Propagate tip distance information up the tree
@@ -1534,6 +1569,43 @@ class TreeNode(object):
             raise TreeError("No LCA found for %s and %s" % (name1, name2))
         return lca
 
+    def get_connecting_nodes(self, pairs):
+        """Finds the last common ancestor of each pair of named edges.
+
+        Parameters
+        ----------
+        pairs
+            series of (name1, name2)
+
+        Returns
+        -------
+        list of nodes, in the order of pairs
+
+        Notes
+        -----
+        The nodes are found in a single traversal and all the last common
+        ancestors are computed together, making this much faster than
+        repeated calls to get_connecting_node().
+        """
+        pairs = list(pairs)
+        names = {n for pair in pairs for n in pair}
+        nodes = {}
+        for node in self.preorder():
+            if node.name in names and node.name not in nodes:
+                nodes[node.name] = node
+        missing = names - nodes.keys()
+        if missing:
+            raise TreeError(
+                "No node named '%s' in %s" % (missing.pop(), self.get_tip_names())
+            )
+
+        index = self._get_lca_index()
+        positions = {n: index.positions[id(node)] for n, node in nodes.items()}
+        first = array([positions[n1] for n1, _ in pairs], dtype=int)
+        second = array([positions[n2] for _, n2 in pairs], dtype=int)
+        lcas = index.array_tree._lca(minimum(first, second), maximum(first, second))
+        return [index.nodes[i] for i in lcas.tolist()]
+
     def get_connecting_edges(self, name1, name2):
         """returns a list of edges connecting two nodes.
 
@@ -1670,6 +1742,33 @@ class TreeNode(object):
                 i.__leaf_set = leaf_set
         return frozenset(sets)
 
+    def get_clade_bits(self, tip_index):
+        """returns [(node, bits), ...] for self and all descendants, in postorder
+
+        Parameters
+        ----------
+        tip_index : dict
+            {tip name: bit position}, must include all tip names
+
+        Notes
+        -----
+        bits is an integer with the bit for each tip in the clade of node
+        set, so clades can be compared or combined with single integer
+        operations.
+        """
+        result = []
+        clades = {}
+        for node in self.postorder():
+            if node.children:
+                bits = 0
+                for child in node.children:
+                    bits |= clades.pop(id(child))
+            else:
+                bits = 1 << tip_index[node.name]
+            clades[id(node)] = bits
+            result.append((node, bits))
+        return result
+
     def compare_by_subsets(self, other, exclude_absent_taxa=False):
         """Returns fraction of overlapping subsets where self and other differ.
 
@@ -1679,13 +1778,21 @@ class TreeNode(object):
         mismatches: if you don't want this behavior, strip out the non-matching
         tips first.
         """
-        self_sets, other_sets = self.subsets(), other.subsets()
+        self_names = set(self.get_tip_names())
+        other_names = set(other.get_tip_names())
+        tip_index = {n: i for i, n in enumerate(self_names | other_names)}
+
+        def get_subsets(tree, mask):
+            # tree itself is the last clade, and is excluded
+            clades = tree.get_clade_bits(tip_index)[:-1]
+            masked = (bits & mask for _, bits in clades)
+            return frozenset(b for b in masked if bin(b).count("1") > 1)
+
+        mask = -1  # all bits set
         if exclude_absent_taxa:
-            in_both = self.subset() & other.subset()
-            self_sets = [i & in_both for i in self_sets]
-            self_sets = frozenset([i for i in self_sets if len(i) > 1])
-            other_sets = [i & in_both for i in other_sets]
-            other_sets = frozenset([i for i in other_sets if len(i) > 1])
+            mask = sum(1 << tip_index[n] for n in self_names & other_names)
+        self_sets = get_subsets(self, mask)
+        other_sets = get_subsets(other, mask)
         total_subsets = len(self_sets) + len(other_sets)
         intersection_length = len(self_sets & other_sets)
         if not total_subsets:  # no common subsets after filtering, so max dist
@@ -1695,47 +1802,10 @@ class TreeNode(object):
     def tip_to_tip_distances(self, default_length=1):
         """Returns distance matrix between all pairs of tips, and a tip order.
 
-        Warning: .__start and .__stop added to self and its descendants.
-
         tip_order contains the actual node objects, not their names (may be
         confusing in some cases).
         """
-        # linearize the tips in postorder.
-        # .__start, .__stop compose the slice in tip_order.
-        tip_order = list(self.tips())
-        for i, tip in enumerate(tip_order):
-            tip.__start, tip.__stop = i, i + 1
-
-        num_tips = len(tip_order)
-        result = zeros((num_tips, num_tips), float)  # tip by tip matrix
-        # distances from tip to curr node
-        tipdistances = zeros((num_tips), float)
-
-        def update_result():
-            # set tip_tip distance between tips of different child
-            for child1, child2 in combinations(node.children, 2):
-                for tip1 in range(child1.__start, child1.__stop):
-                    for tip2 in range(child2.__start, child2.__stop):
-                        result[tip1, tip2] = tipdistances[tip1] + tipdistances[tip2]
-
-        for node in self.traverse(self_before=False, self_after=True):
-            if not node.children:
-                continue
-            # subtree with solved child wedges
-            starts, stops = [], []  # to calc ._start and ._stop for curr node
-            for child in node.children:
-                if hasattr(child, "length") and child.length is not None:
-                    child_len = child.length
-                else:
-                    child_len = default_length
-                tipdistances[child.__start : child.__stop] += child_len
-                starts.append(child.__start)
-                stops.append(child.__stop)
-            node.__start, node.__stop = min(starts), max(stops)
-            # update result if nessessary
-            if len(node.children) > 1:  # not single child
-                update_result()
-        return result + result.T, tip_order
+        return self._tip_distance_array(default_length=default_length)
 
     def compare_by_tip_distances(self, other, dist_f=distance_from_r):
         """Compares self to other using tip-to-tip distance matrices.
@@ -1753,18 +1823,17 @@ class TreeNode(object):
         match, and because we need to reorder the names in the two trees to
         match up the distance matrices).
         """
-        self_names = [i.name for i in self.tips()]
-        other_names = [i.name for i in other.tips()]
-        common_names = frozenset(self_names) & frozenset(other_names)
+        self_names = {i.name: i for i in self.tips()}
+        other_names = {i.name: i for i in other.tips()}
+        common_names = list(self_names.keys() & other_names.keys())
         if not common_names:
             raise ValueError("No names in common between the two trees." "")
         if len(common_names) <= 2:
             return 1  # the two trees must match by definition in this case
-        # figure out correct order of the two name matrices
-        self_order = [self_names.index(i) for i in common_names]
-        other_order = [other_names.index(i) for i in common_names]
-        self_matrix = self.tip_to_tip_distances()[0][self_order][:, self_order]
-        other_matrix = other.tip_to_tip_distances()[0][other_order][:, other_order]
+        self_nodes = [self_names[k] for k in common_names]
+        other_nodes = [other_names[k] for k in common_names]
+        self_matrix = self._tip_distance_array(endpoints=self_nodes)[0]
+        other_matrix = other._tip_distance_array(endpoints=other_nodes)[0]
         return dist_f(self_matrix, other_matrix)
 
     def get_figure(self, style="square", **kwargs):
@@ -2150,134 +2219,22 @@ class PhyloNode(TreeNode):
             if hasattr(node, "TipDistance"):
                 del node.TipDistance
 
-    def _get_distances(self, endpoints=None):
-        """Iteratively calcluates all of the root-to-tip and tip-to-tip
-        distances, resulting in a tuple of:
-            - A list of (name, path length) pairs.
-            - A dictionary of (tip1,tip2):distance pairs
-        """
-        # linearize the tips in postorder.
-        # .__start, .__stop compose the slice in tip_order.
-        if endpoints is None:
-            tip_order = list(self.tips())
-        else:
-            tip_order = []
-            for i, name in enumerate(endpoints):
-                node = self.get_node_matching_name(name)
-                tip_order.append(node)
-        for i, node in enumerate(tip_order):
-            node.__start, node.__stop = i, i + 1
-
-        num_tips = len(tip_order)
-        result = {}
-        # distances from tip to curr node
-        tipdistances = zeros((num_tips), float)
-
-        def update_result():
-            # set tip_tip distance between tips of different child
-            for child1, child2 in combinations(node.children, 2):
-                for tip1 in range(child1.__start, child1.__stop):
-                    for tip2 in range(child2.__start, child2.__stop):
-                        name1 = tip_order[tip1].name
-                        name2 = tip_order[tip2].name
-                        result[(name1, name2)] = tipdistances[tip1] + tipdistances[tip2]
-                        result[(name2, name1)] = tipdistances[tip1] + tipdistances[tip2]
-
-        for node in self.traverse(self_before=False, self_after=True):
-            if not node.children:
-                continue
-            # subtree with solved child wedges
-            starts, stops = [], []  # to calc ._start and ._stop for curr node
-            for child in node.children:
-                if hasattr(child, "length") and child.length is not None:
-                    child_len = child.length
-                else:
-                    child_len = 1  # default length
-                tipdistances[child.__start : child.__stop] += child_len
-                starts.append(child.__start)
-                stops.append(child.__stop)
-            node.__start, node.__stop = min(starts), max(stops)
-            # update result if nessessary
-            if len(node.children) > 1:  # not single child
-                update_result()
-
-        from_root = []
-        for i, n in enumerate(tip_order):
-            from_root.append((n.name, tipdistances[i]))
-        return from_root, result
-
-    def get_distances(self, endpoints=None):
-        """The distance matrix as a dictionary.
-
-        Usage:
-            Grabs the branch lengths (evolutionary distances) as
-            a complete matrix (i.e. a,b and b,a)."""
-
-        (root_dists, endpoint_dists) = self._get_distances(endpoints)
-        return endpoint_dists
-
     def tip_to_tip_distances(self, endpoints=None, default_length=1):
         """Returns distance matrix between all pairs of tips, and a tip order.
 
-        Warning: .__start and .__stop added to self and its descendants.
+        Parameters
+        ----------
+        endpoints
+            series of tip names or nodes, defaults to all tips
+        default_length
+            used for branches with no length
 
         tip_order contains the actual node objects, not their names (may be
         confusing in some cases).
         """
-        all_tips = self.tips()
-        if endpoints is None:
-            tip_order = list(all_tips)
-        else:
-            if isinstance(endpoints[0], PhyloNode):
-                tip_order = endpoints
-            else:
-                tip_order = [self.get_node_matching_name(n) for n in endpoints]
-
-        # linearize all tips in postorder
-        # .__start, .__stop compose the slice in tip_order.
-        for i, node in enumerate(all_tips):
-            node.__start, node.__stop = i, i + 1
-
-        # the result map provides index in the result matrix
-        result_map = dict([(n.__start, i) for i, n in enumerate(tip_order)])
-        num_all_tips = len(all_tips)  # total number of tips
-        num_tips = len(tip_order)  # total number of tips in result
-        result = zeros((num_tips, num_tips), float)  # tip by tip matrix
-        # dist from tip to curr node
-        tipdistances = zeros((num_all_tips), float)
-
-        def update_result():
-            # set tip_tip distance between tips of different child
-            for child1, child2 in combinations(node.children, 2):
-                for tip1 in range(child1.__start, child1.__stop):
-                    if tip1 not in result_map:
-                        continue
-                    res_tip1 = result_map[tip1]
-                    for tip2 in range(child2.__start, child2.__stop):
-                        if tip2 not in result_map:
-                            continue
-                        result[res_tip1, result_map[tip2]] = (
-                            tipdistances[tip1] + tipdistances[tip2]
-                        )
-
-        for node in self.traverse(self_before=False, self_after=True):
-            if not node.children:
-                continue
-            # subtree with solved child wedges
-            starts, stops = [], []  # to calc ._start and ._stop for curr node
-            for child in node.children:
-                if hasattr(child, "length") and child.length is not None:
-                    child_len = child.length
-                else:
-                    child_len = default_length
-                tipdistances[child.__start : child.__stop] += child_len
-                starts.append(child.__start)
-                stops.append(child.__stop)
-            node.__start, node.__stop = min(starts), max(stops)
-            # update result if nessessary
-            if len(node.children) > 1:  # not single child
-                update_result()
-        return result + result.T, tip_order
+        return self._tip_distance_array(
+            endpoints=endpoints, default_length=default_length
+        )
 
     def compare_by_tip_distances(
         self, other, sample=None, dist_f=distance_from_r, shuffle_f=shuffle
@@ -2322,6 +2279,632 @@ class PhyloNode(TreeNode):
         return dist_f(self_matrix, other_matrix)
 
 
+def _sum_to_root(parents, values):
+    """returns, for each node, the sum of values of it and its ancestors
+
+    Notes
+    -----
+    Uses pointer doubling, so the number of array operations grows with
+    log(tree height).
+    """
+    totals = array(values)
+    ancestors = parents.copy()
+    has_anc = ancestors >= 0
+    while has_anc.any():
+        hops = ancestors[has_anc]
+        totals[has_anc] += totals[hops]
+        ancestors[has_anc] = ancestors[hops]
+        has_anc = ancestors >= 0
+    return totals
+
+
+class ArrayTree:
+    """An immutable tree stored as arrays indexed by node.
+
+    Nodes are numbered in preorder, so the root is 0, each node's index is
+    greater than its parent's and the clade of node i is the nodes from i
+    to i + sizes[i] - 1. Tips are in the same order as TreeNode.tips().
+    Only node names and branch lengths are stored, missing lengths are nan.
+
+    Attributes
+    ----------
+    names
+        node names
+    name_loaded
+        whether each name was provided rather than generated, as per
+        TreeNode.name_loaded
+    parents
+        index of the parent of each node, -1 for the root
+    lengths
+        branch length of each node
+    sizes
+        number of nodes in the clade of each node
+    levels
+        number of edges between each node and the root
+    postorder
+        node indices in postorder
+    """
+
+    def __init__(self, names, parents, lengths=None, name_loaded=None):
+        """
+        Parameters
+        ----------
+        names
+            series of node names
+        parents
+            series with the index of the parent of each node, -1 for the
+            root. Nodes must be in preorder.
+        lengths
+            branch lengths, None or nan if missing
+        name_loaded
+            series of bool, whether each name was provided rather than
+            generated. Defaults to True for all nodes.
+        """
+        parents = array(parents, dtype=int)
+        num_nodes = len(parents)
+        if not num_nodes or parents[0] != -1 or (parents[1:] < 0).any():
+            raise TreeError("the first, and only the first, node is the root")
+        if (parents[1:] >= arange(1, num_nodes)).any():
+            raise TreeError("nodes must be in preorder")
+
+        if lengths is None:
+            lengths = full(num_nodes, nan)
+        else:
+            lengths = array([nan if l is None else l for l in lengths], dtype=float)
+
+        if name_loaded is None:
+            name_loaded = full(num_nodes, True)
+        else:
+            name_loaded = array(name_loaded, dtype=bool)
+
+        names = list(names)
+        if len(names) != num_nodes or len(lengths) != num_nodes:
+            raise ValueError("names, parents and lengths must have equal length")
+        if len(name_loaded) != num_nodes:
+            raise ValueError("names and name_loaded must have equal length")
+
+        self.names = empty(num_nodes, dtype=object)
+        self.names[:] = names
+        self.name_loaded = name_loaded
+        self.parents = parents
+        self.lengths = lengths
+        self.levels = _sum_to_root(parents, (parents >= 0).astype(int))
+
+        # clade sizes, accumulated in reverse preorder
+        sizes = [1] * num_nodes
+        for i, parent in zip(range(num_nodes - 1, 0, -1), parents[:0:-1].tolist()):
+            sizes[parent] += sizes[i]
+        self.sizes = array(sizes, dtype=int)
+
+        # children are contiguous in _children, in their original order
+        self._children = argsort(parents[1:], kind="stable") + 1
+        counts = bincount(parents[1:], minlength=num_nodes)
+        self._child_offsets = concatenate(([0], counts.cumsum()))
+
+        # descendants precede ancestors with the same last descendant
+        self.postorder = lexsort((-self.levels, arange(num_nodes) + self.sizes))
+        for attr in (
+            "names",
+            "name_loaded",
+            "parents",
+            "lengths",
+            "levels",
+            "sizes",
+            "postorder",
+        ):
+            getattr(self, attr).flags.writeable = False
+
+        self._name_index = None
+        self._depths = {}
+        self._lca_table = None
+
+    @classmethod
+    def from_tree(cls, tree):
+        """returns ArrayTree from a TreeNode instance
+
+        Notes
+        -----
+        Only node names, name_loaded and "length" params are retained.
+        """
+        nodes = list(tree.preorder())
+        index = {id(node): i for i, node in enumerate(nodes)}
+        parents = [-1] + [index[id(node._parent)] for node in nodes[1:]]
+        names = [node.name for node in nodes]
+        lengths = [node.params.get("length", None) for node in nodes]
+        name_loaded = [node.name_loaded for node in nodes]
+        return cls(names, parents, lengths, name_loaded)
+
+    @classmethod
+    def from_newick(cls, treestring, underscore_unmunge=False):
+        """returns ArrayTree from a Newick string
+
+        Parameters
+        ----------
+        treestring
+            a newick formatted tree string
+        underscore_unmunge : bool
+            replace underscores with spaces in all names read
+
+        Notes
+        -----
+        No TreeNode instances are created. Node names are as produced by
+        make_tree().
+        """
+        unique_name = TreeBuilder()._unique_name
+
+        def create_edge(children, name, params):
+            length = params.get("length", None)
+            return name, unique_name(name), length, children or ()
+
+        root = newick_parse_string(
+            treestring, create_edge, underscore_unmunge=underscore_unmunge
+        )
+        if root[0] is None:
+            root = (None, "root") + root[2:]
+
+        names, parents, lengths, name_loaded = [], [], [], []
+        stack = [(root, -1)]
+        while stack:
+            (loaded, name, length, children), parent = stack.pop()
+            index = len(names)
+            names.append(name)
+            parents.append(parent)
+            lengths.append(length)
+            name_loaded.append(loaded is not None)
+            stack.extend((child, index) for child in reversed(children))
+        return cls(names, parents, lengths, name_loaded)
+
+    def to_tree(self, constructor=None):
+        """returns the tree as PhyloNode instances
+
+        Parameters
+        ----------
+        constructor
+            callable with the PhyloNode signature, defaults to PhyloNode
+        """
+        constructor = constructor or PhyloNode
+        lengths = self.lengths.tolist()
+        nodes = [None] * len(self)
+        for i in self.postorder.tolist():
+            children = [nodes[c] for c in self._get_children(i).tolist()]
+            length = None if isnan(lengths[i]) else lengths[i]
+            nodes[i] = constructor(
+                name=self.names[i],
+                children=children,
+                params={"length": length},
+                name_loaded=bool(self.name_loaded[i]),
+            )
+        return nodes[0]
+
+    def __len__(self):
+        return len(self.parents)
+
+    def __repr__(self):
+        num_tips = int(self.is_tip.sum())
+        return f"{self.__class__.__name__}({len(self)} nodes, {num_tips} tips)"
+
+    def __str__(self):
+        return self.to_tree().get_newick(with_distances=True)
+
+    def _get_children(self, index):
+        """indices of the children of node index"""
+        return self._children[
+            self._child_offsets[index] : self._child_offsets[index + 1]
+        ]
+
+    @property
+    def num_children(self):
+        return diff(self._child_offsets)
+
+    @property
+    def is_tip(self):
+        return self.sizes == 1
+
+    @property
+    def tip_indices(self):
+        """node indices of the tips, in preorder"""
+        return self.is_tip.nonzero()[0]
+
+    def get_node_index(self, name):
+        """returns index of the node with name
+
+        Raises
+        ------
+        TreeError if name is not present
+        """
+        if self._name_index is None:
+            self._name_index = {n: i for i, n in enumerate(self.names.tolist())}
+        try:
+            return self._name_index[name]
+        except KeyError:
+            raise TreeError("No node named '%s' in %s" % (name, self))
+
+    def get_node_names(self, includeself=True, tipsonly=False):
+        """names of nodes, in preorder
+
+        Parameters
+        ----------
+        includeself : bool
+            excludes the root name from the result
+        tipsonly : bool
+            only tips returned
+        """
+        if tipsonly:
+            return self.names[self.is_tip].tolist()
+        return self.names[int(not includeself) :].tolist()
+
+    def get_tip_names(self):
+        """names of the tips, in preorder"""
+        return self.get_node_names(tipsonly=True)
+
+    def get_depths(self, default_length=1):
+        """distance of each node from the root
+
+        Parameters
+        ----------
+        default_length
+            used for branches with no length, consistent with
+            PhyloNode.get_distances()
+        """
+        if default_length not in self._depths:
+            lengths = self.lengths.copy()
+            lengths[isnan(lengths)] = default_length
+            lengths[0] = 0
+            depths = _sum_to_root(self.parents, lengths)
+            depths.flags.writeable = False
+            self._depths[default_length] = depths
+        return self._depths[default_length]
+
+    def lowest_common_ancestor(self, names):
+        """name of the lowest common ancestor of the named nodes
+
+        Notes
+        -----
+        Names not present are ignored, returns None if none are present.
+        """
+        indices = [self._name_index_get(n) for n in names]
+        indices = [i for i in indices if i is not None]
+        if not indices:
+            return None
+        return self.names[self._lca(min(indices), max(indices))]
+
+    def _name_index_get(self, name):
+        try:
+            return self.get_node_index(name)
+        except TreeError:
+            return None
+
+    def _get_lca_table(self):
+        """sparse table whose row k has the index of the shallowest node in
+        the 2**k nodes (in preorder) starting at each node"""
+        if self._lca_table is None:
+            levels = self.levels
+            num_nodes = len(self)
+            num_rows = max(num_nodes - 1, 1).bit_length()
+            table = empty((num_rows, num_nodes), dtype=int)
+            table[0] = arange(num_nodes)
+            for k in range(1, num_rows):
+                half = 2 ** (k - 1)
+                left, right = table[k - 1, :-half], table[k - 1, half:]
+                table[k, :-half] = where(levels[left] <= levels[right], left, right)
+                table[k, -half:] = table[k - 1, -half:]
+            table.flags.writeable = False
+            self._lca_table = table
+        return self._lca_table
+
+    def _lca(self, first, last):
+        """index of the lowest common ancestor of nodes first and last
+
+        Parameters
+        ----------
+        first, last
+            node indices, or arrays of them, with first <= last
+
+        Notes
+        -----
+        As nodes are in preorder, the lowest common ancestor of distinct
+        nodes is the parent of the shallowest node in the interval
+        (first, last]. This is found in constant time from the minima of two
+        overlapping intervals whose lengths are a power of 2.
+        """
+        table = self._get_lca_table()
+        levels = self.levels
+        if isinstance(first, int) and isinstance(last, int):
+            # avoiding numpy array operations for a single pair
+            if first == last:
+                return first
+            power = (last - first).bit_length() - 1
+            left = table.item(power, first + 1)
+            right = table.item(power, last - 2 ** power + 1)
+            shallowest = left if levels.item(left) <= levels.item(right) else right
+            return self.parents.item(shallowest)
+
+        first, last = asarray(first), asarray(last)
+        start = minimum(first + 1, last)
+        power = frexp(last - start + 1)[1] - 1
+        left = table[power, start]
+        right = table[power, last - 2 ** power + 1]
+        shallowest = where(levels[left] <= levels[right], left, right)
+        return where(first == last, first, self.parents[shallowest])
+
+    def tip_to_tip_distances(self, endpoints=None, default_length=1):
+        """returns the matrix of patristic distances between tips, and the
+        tip names
+
+        Parameters
+        ----------
+        endpoints
+            tip names, defaults to all tips in preorder
+        default_length
+            used for branches with no length
+
+        Notes
+        -----
+        Distances are computed from the root distance of each tip and of the
+        lowest common ancestor of each pair. The latter is assigned to
+        blocks of tips from each pair of sibling clades, so no Python level
+        operations are done per pair.
+        """
+        if endpoints is None:
+            tips = self.tip_indices
+            names = self.names[tips].tolist()
+        else:
+            names = list(endpoints)
+            tips = array([self.get_node_index(n) for n in names], dtype=int)
+        return self._tip_distances(tips, default_length), names
+
+    def _tip_distances(self, tips, default_length):
+        """matrix of distances between the tips with indices tips"""
+        if not self.is_tip[tips].all():
+            raise TreeError("endpoints must be tips")
+
+        sorted_order = (tips[:-1] <= tips[1:]).all()
+        order = argsort(tips, kind="stable")
+        tips = tips[order]
+        depths = self.get_depths(default_length)
+
+        # positions in tips of the first and beyond the last tip of each clade
+        nodes = arange(len(self))
+        starts = searchsorted(tips, nodes)
+        ends = searchsorted(tips, nodes + self.sizes)
+
+        # for each non-first child, the block of its tips against the tips of
+        # its preceding siblings, which all have the parent as LCA
+        children = self._children
+        position = arange(len(children))
+        first = self._child_offsets[self.parents[children]] == position
+        children = children[~first]
+        parents = self.parents[children]
+        row_starts, row_ends = starts[children], ends[children]
+        col_starts = starts[parents]
+        keep = (row_starts < row_ends) & (col_starts < row_starts)
+
+        lca_depths = zeros((len(tips), len(tips)), dtype=float)
+        for r0, r1, c0, parent in zip(
+            row_starts[keep].tolist(),
+            row_ends[keep].tolist(),
+            col_starts[keep].tolist(),
+            parents[keep].tolist(),
+        ):
+            lca_depths[r0:r1, c0:r0] = depths[parent]
+            lca_depths[c0:r0, r0:r1] = depths[parent]
+
+        # by row, to avoid temporaries the size of the matrix, summing the
+        # distances of each tip from the LCA so the result is symmetric
+        tip_depths = depths[tips]
+        dists = lca_depths
+        for row, depth in zip(dists, tip_depths.tolist()):
+            row[:] = (depth - row) + (tip_depths - row)
+        fill_diagonal(dists, 0)
+        if not sorted_order:
+            # back to the original order of tips
+            reorder = empty(len(order), dtype=int)
+            reorder[order] = arange(len(order))
+            dists = dists[ix_(reorder, reorder)]
+        return dists
+
+    def get_distances(self, endpoints=None, default_length=1):
+        """The distance matrix as a dictionary.
+
+        Usage:
+            Grabs the branch lengths (evolutionary distances) as
+            a complete matrix (i.e. a,b and b,a).
+        """
+        dists, names = self.tip_to_tip_distances(
+            endpoints=endpoints, default_length=default_length
+        )
+        dists = dists.tolist()
+        result = {}
+        for i, j in combinations(range(len(names)), 2):
+            result[(names[i], names[j])] = result[(names[j], names[i])] = dists[i][j]
+        return result
+
+    def get_sub_tree(
+        self, name_list, ignore_missing=False, keep_root=False, tipsonly=False
+    ):
+        """A new ArrayTree that contains all the otus that are listed in
+        name_list.
+
+        Parameters
+        ----------
+        ignore_missing
+            if False, get_sub_tree will raise a ValueError if
+            name_list contains names that aren't nodes in the tree
+        keep_root
+            if False, the root of the subtree will be the last common
+            ancestor of all nodes kept in the subtree. Root to tip distance is
+            then (possibly) different from the original tree. If True, the root to
+            tip distance remains constant, but root may only have one child node.
+        tipsonly
+            only tip names matching name_list are allowed
+
+        Notes
+        -----
+        Consistent with TreeNode.get_sub_tree(), nodes left with a single
+        child are merged with it by summing their lengths. As there, the
+        merged length is None (nan) if the running sum is zero at any
+        step from the child upwards, e.g. a chain of zero-length edges.
+        """
+        allowed = set(self.get_node_names(tipsonly=tipsonly))
+        if not ignore_missing:
+            for name in name_list:
+                if name not in allowed:
+                    raise ValueError("edge %s not found in tree" % name)
+
+        selected = [self._name_index_get(n) for n in set(name_list) & allowed]
+        num_nodes = len(self)
+        # nodes in a selected clade are included unchanged
+        in_clade = zeros(num_nodes + 1, dtype=int)
+        if selected:
+            numpy.add.at(in_clade, selected, 1)
+            numpy.add.at(in_clade, array(selected) + self.sizes[selected], -1)
+        in_clade = in_clade.cumsum()[:-1] > 0
+
+        # nodes with an included descendant are kept
+        cumulative = concatenate(([0], in_clade.cumsum()))
+        nodes = arange(num_nodes)
+        kept = cumulative[nodes + self.sizes] - cumulative[nodes] > 0
+        if not kept.any():
+            raise TreeError("no tree created in make sub tree")
+
+        num_kept_children = bincount(self.parents[1:][kept[1:]], minlength=num_nodes)
+        merged = kept & (num_kept_children == 1) & ~in_clade
+        if keep_root:
+            merged[0] = False
+
+        result = self._without(kept, merged)
+        if result.is_tip[0]:
+            raise TreeError("only a tip was returned from selecting sub tree")
+
+        result = result._renamed_root("root")
+        if self.num_children[0] > 2:
+            result = result._unrooted()
+        return result
+
+    def _without(self, kept, merged):
+        """returns ArrayTree of kept nodes, merged nodes are removed with
+        their lengths added to their retained descendant"""
+        # for merged nodes, the nearest unmerged ancestor and the sum of
+        # lengths to it, by pointer doubling
+        ancestors = self.parents.copy()
+        extra = where(merged, self.lengths, 0.0)
+        to_resolve = merged & (ancestors >= 0)
+        to_resolve[to_resolve] &= merged[ancestors[to_resolve]]
+        while to_resolve.any():
+            hops = ancestors[to_resolve]
+            extra[to_resolve] += extra[hops]
+            ancestors[to_resolve] = ancestors[hops]
+            to_resolve = merged & (ancestors >= 0)
+            to_resolve[to_resolve] &= merged[ancestors[to_resolve]]
+
+        retained = kept & ~merged
+        parents = self.parents.copy()
+        lengths = self.lengths.copy()
+        via_merged = retained & (parents >= 0)
+        via_merged[via_merged] &= merged[parents[via_merged]]
+        through = parents[via_merged]
+        # TreeNode.get_sub_tree merges from the retained node upwards, a
+        # zero sum at any step gives None (nan here) for the whole chain
+        if (self.lengths[merged] < 0).any():
+            null = array(
+                [self._merged_is_null(i, merged) for i in via_merged.nonzero()[0]],
+                dtype=bool,
+            )
+        else:
+            # sums of non-negative lengths only stay zero from the first step
+            null = lengths[via_merged] + self.lengths[through] == 0
+        lengths[via_merged] += extra[through]
+        parents[via_merged] = ancestors[through]
+        merged_lengths = lengths[via_merged]
+        merged_lengths[null] = nan
+        lengths[via_merged] = merged_lengths
+        return self._reindexed(retained, parents, lengths)
+
+    def _merged_is_null(self, index, merged):
+        """whether merging index with its merged ancestors gives a zero
+        length at any step"""
+        length = self.lengths[index]
+        node = self.parents[index]
+        while node >= 0 and merged[node]:
+            length += self.lengths[node]
+            if length == 0:
+                return True
+            node = self.parents[node]
+        return False
+
+    def _reindexed(self, retained, parents, lengths):
+        """ArrayTree of retained nodes, parents are old indices"""
+        old_indices = retained.nonzero()[0]
+        # -1, for no parent, remains -1
+        new_index = full(len(self) + 1, -1, dtype=int)
+        new_index[old_indices] = arange(len(old_indices))
+        parents = new_index[parents[old_indices]]
+        return self.__class__(
+            self.names[old_indices],
+            parents,
+            lengths[old_indices],
+            self.name_loaded[old_indices],
+        )
+
+    def _renamed_root(self, name):
+        names = self.names.copy()
+        names[0] = name
+        return self.__class__(names, self.parents, self.lengths, self.name_loaded)
+
+    def _unrooted(self):
+        """ArrayTree with at least 3 children at the root, as per
+        PhyloNode.unrooted()"""
+        children = self._get_children(0)
+        internal = children[~self.is_tip[children]]
+        if len(children) > 2 or not len(internal):
+            return self
+
+        # the first internal child is replaced by its children
+        node = internal[0]
+        grandchildren = self._get_children(node)
+        parents = self.parents.copy()
+        parents[grandchildren] = 0
+        lengths = self.lengths.copy()
+        if not isnan(lengths[node]):
+            lengths[grandchildren] += lengths[node]
+        retained = arange(len(self)) != node
+        return self._reindexed(retained, parents, lengths)
+
+
+class _LCAIndex:
+    """lowest common ancestor queries for the nodes of a TreeNode tree
+
+    Notes
+    -----
+    The index is shared by all the nodes in the tree, and marked stale by
+    any TreeNode method that modifies the tree.
+    """
+
+    def __init__(self, root):
+        self.nodes = list(root.preorder())
+        self.positions = {id(node): i for i, node in enumerate(self.nodes)}
+        parents = [-1] + [self.positions[id(n._parent)] for n in self.nodes[1:]]
+        self.array_tree = ArrayTree(range(len(parents)), parents)
+        self.stale = False
+        for node in self.nodes:
+            node._lca_index = self
+
+    def __getstate__(self):
+        # positions are keyed by id(), so do not apply to unpickled nodes
+        return {"stale": True}
+
+    def get_lca(self, node1, node2):
+        """the lowest common ancestor of node1 and node2, None if they are not
+        in the same tree"""
+        first = self.positions.get(id(node1), None)
+        last = self.positions.get(id(node2), None)
+        if first is None or last is None:
+            return None
+        if first > last:
+            first, last = last, first
+        return self.nodes[self.array_tree._lca(first, last)]
+
+
 class TreeBuilder(object):
     # Some tree code which isn't needed once the tree is finished.
     # Mostly exists to give edges unique names
@@ -2366,11 +2949,23 @@ class TreeBuilder(object):
         """Callback for newick parser"""
         if children is None:
             children = []
-        node = self.TreeNodeClass(
-            children=list(children),
+        cls = self.TreeNodeClass
+        children = list(children)
+        # nodes made by this builder are attached directly, as TreeNode.extend
+        # is a substantial part of the cost of parsing large trees
+        direct = all(
+            type(c) is cls and c._parent is None and c._lca_index is None
+            for c in children
+        )
+        node = cls(
+            children=None if direct else children,
             name=self._unique_name(name),
             name_loaded=name_loaded and (name is not None),
             params=params,
         )
+        if direct:
+            node.children = children
+            for child in children:
+                child._parent = node
         self._known_edges[id(node)] = node
         return node
@@ -197,7 +197,14 @@ class EstimateDistances(object):
         return result
 
     @UI.display_wrap
-    def run(self, dist_opt_args=None, aln_opt_args=None, ui=None, **kwargs):
+    def run(
+        self,
+        dist_opt_args=None,
+        aln_opt_args=None,
+        combinations=None,
+        ui=None,
+        **kwargs,
+    ):
         """Start estimating the distances between sequences. Distance estimation
         is done using the Powell local optimiser. This can be changed using the
         dist_opt_args and aln_opt_args.
@@ -211,6 +218,9 @@ class EstimateDistances(object):
         dist_opt_args, aln_opt_args
             arguments for the optimise method for
             the distance estimation and alignment estimation respectively.
+        combinations
+            series of name pairs (or triples if threeway) to estimate,
+            defaults to all. Estimates are added to any from previous runs.
 
         """
 
@@ -236,6 +246,8 @@ class EstimateDistances(object):
         else:
             combination_aligns = get_name_combinations(self._seq_collection.names, 2)
             desc = "pair "
+        if combinations is not None:
+            combination_aligns = [tuple(sorted(c)) for c in combinations]
         labels = [desc + ",".join(names) for names in combination_aligns]
 
         def _one_alignment(comp):
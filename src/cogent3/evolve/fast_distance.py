@@ -3,10 +3,11 @@ from numbers import Number
 
 import numpy
 
-from numpy import array, diag, dot, eye, float64, int32, log, sqrt, zeros
+from numpy import array, diag, dot, eye, float64, log, sqrt, zeros
 from numpy.linalg import LinAlgError, det, inv, norm
 
 from cogent3 import DNA, RNA, get_moltype
+from cogent3.core.alphabet import bytes_to_indices, get_char_index_table
 from cogent3.util.dict_array import DictArray
 from cogent3.util.misc import get_object_provenance
 from cogent3.util.progress_display import display_wrap
@@ -56,27 +57,12 @@ def get_matrix_diff_coords(indices):
 
 def get_moltype_index_array(moltype, invalid=-9):
     """returns the index array for a molecular type"""
-    canonical_chars = list(moltype)
-    # maximum ordinal for an allowed character, this defines the length of
-    # the required numpy array
-    max_ord = max(list(map(ord, list(moltype.All.keys()))))
-    char_to_index = zeros(max_ord + 1, int32)
-    # all non canonical_chars are ``invalid''
-    char_to_index.fill(invalid)
-
-    for i in range(len(canonical_chars)):
-        c = canonical_chars[i]
-        o = ord(c)
-        char_to_index[o] = i
-
-    return char_to_index
+    return get_char_index_table(moltype.alphabet, invalid=invalid)
 
 
 def seq_to_indices(seq, char_to_index):
     """returns an array with sequence characters replaced by their index"""
-    ords = list(map(ord, seq))
-    indices = char_to_index.take(ords)
-    return indices
+    return bytes_to_indices(seq, char_to_index)
 
 
 def _fill_diversity_matrix(matrix, seq1, seq2):
@@ -832,5 +818,4 @@ class DistanceMatrix(DictArray):
         dists = self.drop_invalid()
         if not dists or dists.shape[0] == 1:
             raise ValueError("Too few distances to build a treenj")
-        dists = dists.to_dict()
         return nj(dists, show_progress=show_progress)
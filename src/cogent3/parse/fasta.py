@@ -1,16 +1,20 @@
 """Parsers for FASTA and related formats.
 """
+import mmap
+import os
 import re
 
 from collections.abc import Callable
 
+import numpy
+
 import cogent3
 
 from cogent3.core.info import Info
 from cogent3.core.moltype import ASCII, BYTES
 from cogent3.parse.record import RecordError
 from cogent3.parse.record_finder import LabeledRecordFinder
-from cogent3.util.misc import open_
+from cogent3.util.misc import atomic_write, open_
 
 
 __author__ = "Rob Knight"
@@ -87,6 +91,440 @@ def MinimalFastaParser(
         infile.close()
 
 
+# bytes treated as whitespace within FASTA sequence lines
+_whitespace = numpy.zeros(256, dtype=bool)
+_whitespace[[ord(c) for c in " \t\n\r\v\f"]] = True
+
+
+def fasta_bytes_parser(data, strict=True, label_to_name=str):
+    """parses FASTA formatted data in a single pass over the raw bytes
+
+    Parameters
+    ----------
+    data
+        FASTA formatted bytes, or a path (compressed files are handled)
+    strict : bool
+        raises RecordError when label or seq missing, otherwise these
+        records are skipped
+    label_to_name
+        callback applied to each label
+
+    Returns
+    -------
+    names, sequence bytes as a single uint8 array with whitespace removed,
+    and the length of each sequence
+    """
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        with open_(data, mode="rb") as infile:
+            data = infile.read()
+
+    buf = numpy.frombuffer(data, dtype=numpy.uint8)
+    num_bytes = len(buf)
+    # universal newlines, a \r\n pair just introduces an empty line
+    newlines = numpy.flatnonzero((buf == ord("\n")) | (buf == ord("\r")))
+    starts = numpy.concatenate(([0], newlines + 1))
+    ends = numpy.concatenate((newlines, [num_bytes]))
+    keep = starts < num_bytes
+    starts, ends = starts[keep], ends[keep]
+
+    first_char = buf[starts]
+    is_label = first_char == ord(">")
+    # label and comment lines are excluded from sequence data
+    excluded = is_label | (first_char == ord("#"))
+    delta = numpy.zeros(num_bytes + 1, dtype=numpy.int8)
+    delta[starts[excluded]] = 1
+    delta[ends[excluded]] -= 1
+    keep = ~(_whitespace[buf] | (numpy.cumsum(delta[:-1], dtype=numpy.int8) > 0))
+
+    label_starts = starts[is_label]
+    label_ends = ends[is_label]
+    if len(label_starts) == 0 or label_starts[0] != 0:
+        edge = label_starts[0] if len(label_starts) else num_bytes
+        if keep[:edge].any():
+            if strict:
+                raise RecordError("Found Fasta record without label line")
+            keep[:edge] = False
+        if not len(label_starts):
+            return [], numpy.zeros(0, dtype=numpy.uint8), numpy.zeros(0, dtype=int)
+
+    lengths = numpy.add.reduceat(keep, label_starts, dtype=int)
+    seqs = buf[keep]
+    names = []
+    selected = []
+    for i, (start, end) in enumerate(zip(label_starts, label_ends)):
+        label = buf[start + 1 : end].tobytes().decode("utf-8").strip()
+        if not lengths[i]:
+            if strict:
+                raise RecordError(f"Found label line without sequences: {label!r}")
+            continue
+        names.append(label_to_name(label))
+        selected.append(i)
+
+    if len(selected) != len(lengths):
+        lengths = lengths[selected]
+
+    return names, seqs, lengths
+
+
+def fasta_to_seqs(
+    data,
+    moltype=None,
+    aligned=True,
+    label_to_name=None,
+    strict=True,
+    upper=False,
+    **kw,
+):
+    """loads sequences from FASTA formatted data
+
+    Parameters
+    ----------
+    data
+        FASTA formatted bytes, or a path (compressed files are handled)
+    moltype
+        molecular type, string or instance
+    aligned : bool
+        if True, sequence bytes are mapped to alphabet indices via a lookup
+        table and returned as an ArrayAlignment, otherwise a
+        SequenceCollection
+    label_to_name
+        callback applied to each label
+    strict : bool
+        raises RecordError when label or seq missing
+    upper : bool
+        converts sequences to upper case, otherwise this is done only for
+        characters absent from the alphabet
+    kw
+        passed to the collection constructor
+
+    Returns
+    -------
+    ArrayAlignment or SequenceCollection
+    """
+    from cogent3.core.alignment import ArrayAlignment, SequenceCollection
+    from cogent3.core.alphabet import (
+        AlphabetError,
+        CharAlphabet,
+        get_char_index_table,
+    )
+    from cogent3.core.moltype import get_moltype
+
+    names, seqs, lengths = fasta_bytes_parser(
+        data, strict=strict, label_to_name=label_to_name or str
+    )
+    moltype = BYTES if moltype is None else get_moltype(moltype)
+    try:
+        alphabet = moltype.alphabets.degen_gapped
+    except AttributeError:
+        alphabet = moltype.alphabet
+
+    if not (aligned and names and isinstance(alphabet, CharAlphabet)):
+        bounds = numpy.concatenate(([0], numpy.cumsum(lengths)))
+        text = seqs.tobytes()
+        if upper:
+            text = text.upper()
+        data = [
+            (n, text[bounds[i] : bounds[i + 1]].decode("latin-1"))
+            for i, n in enumerate(names)
+        ]
+        klass = ArrayAlignment if aligned else SequenceCollection
+        return klass(data=data, moltype=moltype, **kw)
+
+    if len(set(lengths.tolist())) > 1:
+        raise ValueError("not all sequences have same length")
+
+    table = get_char_index_table(alphabet, upper=upper, ignore_case=True)
+    indices = table[seqs]
+    invalid = indices == 255
+    if invalid.any() and len(alphabet) < 256:
+        bad = sorted(set(seqs[invalid].tobytes().decode("latin-1")))
+        raise AlphabetError(f"invalid characters {bad} for {moltype.label!r}")
+
+    indices = indices.reshape(len(names), -1)
+    return ArrayAlignment(
+        data=indices.T, names=names, moltype=moltype, alphabet=alphabet, **kw
+    )
+
+
+def _count_line_ends(buf, start, end, block=2 ** 24):
+    """number of newline and carriage return bytes in buf[start:end]"""
+    total = 0
+    for i in range(start, end, block):
+        chunk = buf[i : min(i + block, end)]
+        total += numpy.count_nonzero((chunk == 10) | (chunk == 13))
+    return total
+
+
+def _index_records(mm, path):
+    """returns faidx records from a memory mapped FASTA file
+
+    No views of mm are retained on return, or if an exception is raised, so
+    mm can then be closed."""
+    buf = numpy.frombuffer(mm, dtype=numpy.uint8)
+    try:
+        records, invalid = _get_index_records(mm, buf)
+    finally:
+        del buf
+
+    if records is None:
+        raise ValueError(f"no FASTA records in {str(path)!r}")
+    if invalid is not None:
+        raise ValueError(f"{invalid!r} in {str(path)!r} has lines of different lengths")
+    names = set()
+    for record in records:
+        if record[0] in names:
+            raise ValueError(f"duplicate sequence name {record[0]!r} in {str(path)!r}")
+        names.add(record[0])
+    return records
+
+
+def _get_index_records(mm, buf):
+    """returns (records, name of first invalid record or None), records is
+    None if there are none"""
+    size = len(buf)
+    label_start = 0 if mm[:1] == b">" else mm.find(b"\n>") + 1
+    if label_start == 0 and mm[:1] != b">":
+        return None, None
+
+    records = []
+    while label_start >= 0:
+        label_end = mm.find(b"\n", label_start)
+        label_end = size if label_end < 0 else label_end
+        name = mm[label_start + 1 : label_end].decode("utf-8").split()[0]
+        offset = min(label_end + 1, size)
+        next_label = mm.find(b"\n>", label_end)
+        record_end = size if next_label < 0 else next_label + 1
+        label_start = next_label + 1 if next_label >= 0 else -1
+        # exclude trailing line ends, e.g. blank lines
+        seq_end = record_end
+        while seq_end > offset and buf[seq_end - 1] in (10, 13):
+            seq_end -= 1
+
+        span = seq_end - offset
+        if span == 0:
+            records.append((name, 0, offset, 0, 0))
+            continue
+
+        line_end = mm.find(b"\n", offset, record_end)
+        line_end = record_end if line_end < 0 else line_end
+        width = line_end + 1 - offset
+        bases = line_end - offset - int(buf[line_end - 1] == 13)
+        full = (span - 1) // width
+        last = span - full * width
+        # line ends must be where expected, and only there
+        ends = buf[offset + bases : offset + full * width : width]
+        valid = (
+            0 < last <= bases
+            and ((ends == 10) | (ends == 13)).all()
+            and _count_line_ends(buf, offset, seq_end) == full * (width - bases)
+        )
+        if not valid:
+            return records, name
+        records.append((name, full * bases + last, offset, bases, width))
+    return records, None
+
+
+def make_fasta_index(path):
+    """returns faidx compatible index records for an uncompressed FASTA file
+
+    Parameters
+    ----------
+    path
+        path to FASTA file, all lines of a sequence, except the last, must
+        have the same length
+
+    Returns
+    -------
+    list of (name, length, offset, line bases, line width) tuples. name is
+    the first white-space delimited word of the label.
+    """
+    with open(path, "rb") as infile:
+        if os.fstat(infile.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _index_records(mm, path)
+
+
+def load_fasta_index(path):
+    """returns index records from a .fai file"""
+    index = []
+    with open(path) as infile:
+        for line in infile:
+            line = line.split("\t")
+            index.append(tuple([line[0]] + [int(v) for v in line[1:5]]))
+    return index
+
+
+def write_fasta_index(index, path):
+    """writes index records to a .fai file"""
+    with atomic_write(path, mode="w") as out:
+        out.writelines("\t".join(map(str, record)) + "\n" for record in index)
+
+
+class IndexedFasta:
+    """Lazy access to sequences in a large uncompressed FASTA file
+
+    Uses a samtools faidx compatible index, stored as <path>.fai. If that
+    file does not exist, or is older than the FASTA file, the index is built
+    and (if possible) written. Only the bytes of requested sequences, or
+    sequence regions, are read from the memory mapped file.
+    """
+
+    def __init__(self, path, moltype=None, index_path=None):
+        """
+        Parameters
+        ----------
+        path
+            path to an uncompressed FASTA file
+        moltype
+            molecular type of returned sequences, string or instance
+        index_path
+            path to the .fai file, defaults to path + '.fai'
+        """
+        from cogent3.core.moltype import get_moltype
+
+        self.path = str(path)
+        self.moltype = ASCII if moltype is None else get_moltype(moltype)
+        self._index_path = index_path or self.path + ".fai"
+        self._index = None
+        self._file = None
+        self._mmap = None
+
+    @property
+    def index(self):
+        """{name: (length, offset, line bases, line width), ...}"""
+        if self._index is None:
+            index_path = self._index_path
+            if os.path.exists(index_path) and os.path.getmtime(
+                index_path
+            ) >= os.path.getmtime(self.path):
+                index = load_fasta_index(index_path)
+            else:
+                index = make_fasta_index(self.path)
+                try:
+                    write_fasta_index(index, index_path)
+                except OSError:
+                    pass  # read only location, keep in memory
+            self._index = {record[0]: record[1:] for record in index}
+        return self._index
+
+    @property
+    def names(self):
+        return list(self.index)
+
+    @property
+    def seq_lengths(self):
+        """{name: length, ...}"""
+        return {name: record[0] for name, record in self.index.items()}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(path={self.path!r}, num_seqs={len(self)})"
+
+    def __getitem__(self, name):
+        return self.get_seq(name)
+
+    def __getstate__(self):
+        return {
+            "path": self.path,
+            "moltype": self.moltype,
+            "index_path": self._index_path,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """closes the underlying file"""
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._file.close()
+        self._mmap = self._file = None
+
+    def _get_mmap(self):
+        if self._mmap is None:
+            self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def get_seq_str(self, name, start=None, end=None):
+        """returns sequence, or sequence region, as a string
+
+        Parameters
+        ----------
+        name : str
+            sequence name
+        start, end : int or None
+            0-based, end exclusive, coordinates of the region. Negative values
+            are relative to the end of the sequence.
+        """
+        length, offset, bases, width = self.index[name]
+        start, end, _ = slice(start, end).indices(length)
+        if end <= start:
+            return ""
+        first = offset + (start // bases) * width + start % bases
+        last = offset + (end // bases) * width + end % bases
+        data = self._get_mmap()[first:last]
+        return data.translate(None, b"\r\n").decode("latin-1")
+
+    def get_seq(self, name, start=None, end=None):
+        """returns a Sequence, reading only the bytes required
+
+        Parameters
+        ----------
+        name : str
+            sequence name
+        start, end : int or None
+            0-based, end exclusive, coordinates of the region
+        """
+        seq = self.get_seq_str(name, start=start, end=end)
+        return self.moltype.make_seq(seq, name=name)
+
+    def take_seqs(self, names, negate=False, **kwargs):
+        """returns SequenceCollection containing just the named sequences
+
+        Parameters
+        ----------
+        names
+            series of sequence names
+        negate : bool
+            select all sequences EXCEPT names
+        kwargs
+            passed to the SequenceCollection constructor
+        """
+        from cogent3.core.alignment import SequenceCollection
+
+        if isinstance(names, str):
+            names = [names]
+        if negate:
+            names = set(names)
+            names = [n for n in self.index if n not in names]
+        data = [(n, self.get_seq_str(n)) for n in names]
+        info = kwargs.pop("info", None) or {"source": self.path}
+        return SequenceCollection(data=data, moltype=self.moltype, info=info, **kwargs)
+
+    def to_dict(self):
+        """returns {name: sequence string, ...} for all sequences"""
+        return {name: self.get_seq_str(name) for name in self.index}
+
+
 GdeFinder = LabeledRecordFinder(is_gde_label, ignore=is_blank)
 
 
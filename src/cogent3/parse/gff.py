@@ -14,8 +14,13 @@ __maintainer__ = "Peter Maxwell"
 __email__ = "pm67nz@gmail.com"
 __status__ = "Production"
 
+import re
+
+from itertools import islice
 from pathlib import Path
 
+import numpy
+
 from cogent3.util.misc import open_
 
 
@@ -102,6 +107,188 @@ def _gff_parser(f):
         yield rtn
 
 
+_columns = (
+    "SeqID",
+    "Source",
+    "Type",
+    "Start",
+    "End",
+    "Score",
+    "Strand",
+    "Phase",
+    "Attributes",
+    "Comments",
+)
+_gff3_id = re.compile(r"(?:^|;)ID=([^;]*)")
+_gff3_parent = re.compile(r"(?:^|;)Parent=([^;]*)")
+
+
+class GffRecords:
+    """GFF/GTF records stored as columns
+
+    String columns are numpy object arrays, Start and End are int arrays
+    with the same conventions as gff_parser (0-based start, reversed for
+    features on the minus strand). Attributes are stored as strings and
+    parsed on demand.
+    """
+
+    def __init__(self, columns, gff3):
+        self._data = columns
+        self.gff3 = gff3
+        self._ids = None
+        self._parents = None
+
+    def __len__(self):
+        return len(self._data["Start"])
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(num_records={len(self)}, gff3={self.gff3})"
+
+    def __getitem__(self, index):
+        """column name returns the column, an int returns the record as a
+        dict (same as from gff_parser), otherwise a subset of records"""
+        if isinstance(index, str):
+            return self._data[index]
+
+        if isinstance(index, (int, numpy.integer)):
+            record = {c: self._data[c][index] for c in _columns}
+            record["Start"] = int(record["Start"])
+            record["End"] = int(record["End"])
+            record["Attributes"] = self.parse_attributes(index)
+            return record
+
+        data = {c: v[index] for c, v in self._data.items()}
+        return self.__class__(data, self.gff3)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def parse_attributes(self, index):
+        """returns the attributes of a record as a dict"""
+        parser = parse_attributes_gff3 if self.gff3 else parse_attributes_gff2
+        start, end = self._data["Start"][index], self._data["End"][index]
+        return parser(self._data["Attributes"][index], (int(start), int(end)))
+
+    @property
+    def ids(self):
+        """the ID of each record, an empty string if not defined"""
+        if self._ids is None:
+            if self.gff3:
+                ids = [_gff3_id.search(a) for a in self._data["Attributes"]]
+                ids = [m.group(1) if m else "" for m in ids]
+            else:
+                ids = [parse_attributes_gff2(a, None)["ID"] for a in self["Attributes"]]
+            self._ids = numpy.array(ids, dtype=object)
+        return self._ids
+
+    @property
+    def parents(self):
+        """list of Parent ID's for each record, an empty list if none"""
+        if self._parents is None:
+            parents = []
+            for attr in self._data["Attributes"]:
+                match = _gff3_parent.search(attr) if self.gff3 else None
+                parents.append(match.group(1).split(",") if match else [])
+            self._parents = parents
+        return self._parents
+
+
+def _lines_to_columns(lines, seqids, types):
+    """returns dict of column lists from gff lines"""
+    columns = [[] for _ in _columns]
+    for line in lines:
+        # comments and blank lines
+        if "#" in line:
+            (line, comments) = line.split("#", 1)
+        else:
+            comments = None
+        line = line.strip()
+        if not line:
+            continue
+
+        cols = line.split("\t")
+        # the final column (attributes) may be empty
+        if len(cols) == 8:
+            cols.append("")
+        assert len(cols) == 9, len(line)
+        if seqids is not None and cols[0] not in seqids:
+            continue
+        if types is not None and cols[2] not in types:
+            continue
+
+        cols.append(comments)
+        for column, value in zip(columns, cols):
+            column.append(value)
+    return columns
+
+
+def _columns_to_arrays(columns):
+    """converts column lists to arrays, with the gff_parser conventions for
+    Start and End"""
+    data = {}
+    for name, values in zip(_columns, columns):
+        if name in ("Start", "End"):
+            continue
+        array = numpy.empty(len(values), dtype=object)
+        array[:] = values
+        data[name] = array
+
+    start = numpy.array(columns[3], dtype=numpy.int64) - 1
+    end = numpy.array(columns[4], dtype=numpy.int64)
+    # features that extend beyond sequence have negative indices
+    negative = (start < 0) | (end < 0)
+    start = numpy.where(negative, numpy.abs(start), start)
+    end = numpy.where(negative, numpy.abs(end), end)
+    swap = negative & (start > end)
+    # reverse indices when the feature is on the opposite strand
+    swap ^= data["Strand"] == "-"
+    data["Start"] = numpy.where(swap, end, start)
+    data["End"] = numpy.where(swap, start, end)
+    return data
+
+
+def gff_records(f, seqids=None, types=None, chunk_size=100000):
+    """parses a gff file into columns
+
+    Parameters
+    -----------
+    f
+        accepts string path or pathlib.Path or file-like object (e.g. StringIO)
+    seqids
+        series of SeqID's. Only records for these are retained.
+    types
+        series of feature types. Only records of these types are retained.
+    chunk_size : int
+        number of lines processed at a time
+
+    Returns
+    -------
+    GffRecords
+    """
+    f = f if not isinstance(f, Path) else str(f)
+    if isinstance(f, str):
+        with open_(f) as infile:
+            return _gff_records(infile, seqids, types, chunk_size)
+    return _gff_records(f, seqids, types, chunk_size)
+
+
+def _gff_records(f, seqids, types, chunk_size):
+    seqids = None if seqids is None else set(seqids)
+    types = None if types is None else set(types)
+    lines = iter(f)
+    first = next(lines, "")
+    gff3 = "gff-version 3" in first
+    chunks = []
+    chunk = [first]
+    while chunk:
+        chunks.append(_columns_to_arrays(_lines_to_columns(chunk, seqids, types)))
+        chunk = list(islice(lines, chunk_size))
+
+    data = {c: numpy.concatenate([chunk[c] for chunk in chunks]) for c in _columns}
+    return GffRecords(data, gff3)
+
+
 def parse_attributes_gff2(attributes, span):
     """Returns a dict with name and info keys"""
     name = attributes[attributes.find('"') + 1 :]
@@ -16,6 +16,8 @@ also:
 
 import re
 
+from itertools import chain
+
 from cogent3.parse.record import FileFormatError
 
 
@@ -136,25 +138,102 @@ class _Tokeniser(object):
                 yield token
 
 
-def parse_string(text, constructor, **kw):
-    """Parses a Newick-format string, using specified constructor for tree.
+_special_chars = re.compile(r"['\"\[\]]")
+_plain_delimiters = re.compile(r"([(),:\n])")
 
-    Calls constructor(children, name, attributes)
 
-    Note: underscore_unmunge, if True, replaces underscores with spaces in
-    the data that's read in. This is part of the Newick format, but it is
-    often useful to suppress this behavior.
+def _is_plain(text, kw):
+    """whether text can be parsed by _parse_plain"""
+    return not kw.get("strict_labels", False) and _special_chars.search(text) is None
+
+
+def _parse_plain(text, constructor, underscore_unmunge=True):
+    """parses a Newick tree that has no quoted labels or comments
+
+    Parameters
+    ----------
+    text
+        Newick string, parsing stops at the first ';'
+    constructor
+        called as constructor(children, name, attributes) for each node
+    underscore_unmunge
+        replaces underscores in labels with spaces
+
+    Returns
+    -------
+    The result of constructor for the root, or None if text is not a valid
+    tree, in which case the caller should use the _Tokeniser for the error.
+
+    Notes
+    -----
+    Splitting text with a single regular expression, with each label
+    followed by a delimiter, avoids the per-character-class overhead of the
+    _Tokeniser. The grammar is identical to that used by parse_string().
     """
-    if "(" not in text and ";" not in text and text.strip():
-        # otherwise "filename" is a valid (if small) tree
-        raise TreeParseError('Not a Newick tree: "%s"' % text[:10])
+    text = text.split(";", 1)[0]
+    pieces = _plain_delimiters.split(text)
+    pieces.append(None)  # EOT
+    stack = []
+    nodes = []
+    children = name = length = None
+    expect_length = False
+    for index in range(0, len(pieces), 2):
+        label = pieces[index].strip()
+        if label:
+            if underscore_unmunge and "_" in label:
+                label = label.replace("_", " ")
+            if expect_length:
+                try:
+                    length = float(label)
+                except ValueError:
+                    return None
+                expect_length = False
+            elif name is not None or length is not None:
+                return None
+            else:
+                name = label
+
+        token = pieces[index + 1]
+        if token == "\n":
+            continue
+        if expect_length:
+            return None
+        if token == "(":
+            if children is not None or name is not None or length is not None:
+                return None
+            stack.append(nodes)
+            nodes = []
+        elif token == ":":
+            if length is not None:
+                return None
+            expect_length = True
+        else:
+            attributes = {} if length is None else {"length": length}
+            nodes.append(constructor(children, name, attributes))
+            children = name = length = None
+            if token == ")":
+                if not stack:
+                    return None
+                children = nodes
+                nodes = stack.pop()
+            elif token == ",":
+                if not stack:
+                    return None
+            elif stack:  # the end of the tree inside a subtree
+                return None
+            else:
+                break
+    return nodes[0]
+
+
+def _parse_tokens(tokens, tokeniser, constructor):
+    """parses a single tree from the tokens generated by tokeniser"""
     sentinals = [";", EOT]
     stack = []
     nodes = []
     children = name = expected_attribute = None
     attributes = {}
-    tokeniser = _Tokeniser(text, **kw)
-    for token in tokeniser.tokens():
+    for token in tokens:
         if expected_attribute is not None:
             (attr_name, attr_cast) = expected_attribute
             try:
@@ -199,3 +278,75 @@ def parse_string(text, constructor, **kw):
     assert not stack, stack
     assert len(nodes) == 1, len(nodes)
     return nodes[0]
+
+
+def parse_string(text, constructor, **kw):
+    """Parses a Newick-format string, using specified constructor for tree.
+
+    Calls constructor(children, name, attributes)
+
+    Note: underscore_unmunge, if True, replaces underscores with spaces in
+    the data that's read in. This is part of the Newick format, but it is
+    often useful to suppress this behavior.
+    """
+    if "(" not in text and ";" not in text and text.strip():
+        # otherwise "filename" is a valid (if small) tree
+        raise TreeParseError('Not a Newick tree: "%s"' % text[:10])
+    if _is_plain(text, kw):
+        tree = _parse_plain(
+            text, constructor, underscore_unmunge=kw.get("underscore_unmunge", True)
+        )
+        if tree is not None:
+            return tree
+    # otherwise the tokeniser handles all features, and reports errors
+    tokeniser = _Tokeniser(text, **kw)
+    return _parse_tokens(tokeniser.tokens(), tokeniser, constructor)
+
+
+def parse_strings(text, get_constructor, **kw):
+    """Generates each tree in a string of ';' terminated Newick trees.
+
+    Parameters
+    ----------
+    text
+        Newick trees, e.g. the contents of a bootstrap or MCMC sample file
+    get_constructor
+        called with no arguments for each tree, returns the constructor
+        used for that tree (see parse_string)
+    kw
+        passed to the _Tokeniser
+
+    Notes
+    -----
+    Trees may be separated by white space or new lines.
+    """
+    num_done = 0
+    if _is_plain(text, kw):
+        unmunge = kw.get("underscore_unmunge", True)
+        for tree_text in text.split(";"):
+            if not tree_text.strip():
+                continue
+            tree = _parse_plain(
+                tree_text, get_constructor(), underscore_unmunge=unmunge
+            )
+            if tree is None:
+                break
+            num_done += 1
+            yield tree
+        else:
+            return
+
+    # the tokeniser handles all features and raises the error, if any, for
+    # the first tree not already generated
+    tokeniser = _Tokeniser(text, **kw)
+    tokens = tokeniser.tokens()
+    for token in tokens:
+        if token is EOT:
+            break
+        if token == ";":
+            continue
+        tree = _parse_tokens(chain([token], tokens), tokeniser, get_constructor())
+        if num_done:
+            num_done -= 1
+            continue
+        yield tree
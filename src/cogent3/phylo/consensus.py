@@ -3,12 +3,15 @@
 import warnings
 
 from collections import defaultdict
-from itertools import product
+
+import numpy
 
 from cogent3 import make_tree
 from cogent3.core.tree import TreeBuilder
 from cogent3.util.misc import extend_docstring_from
 
+from .split_distance_numba import fill_split_distance_matrix
+
 
 __author__ = "Matthew Wakefield"
 __copyright__ = "Copyright 2007-2015, The Cogent Project"
@@ -90,23 +93,23 @@ def weighted_rooted_majority_rule(weighted_trees, strict=False, attr="support"):
     cladecounts = {}
     edgelengths = {}
     total = 0
+    tip_index = {}
     for (weight, tree) in weighted_trees:
         total += weight
-        edges = tree.get_edge_vector()
-        for edge in edges:
-            tips = edge.get_tip_names(includeself=True)
-            tips = frozenset(tips)
-            if tips not in cladecounts:
-                cladecounts[tips] = 0
-            cladecounts[tips] += weight
+        for name in tree.get_tip_names():
+            tip_index.setdefault(name, len(tip_index))
+        for edge, clade in tree.get_clade_bits(tip_index):
+            if clade not in cladecounts:
+                cladecounts[clade] = 0
+            cladecounts[clade] += weight
             length = edge.length and edge.length * weight
-            if edgelengths.get(tips, None):
-                edgelengths[tips] += length
+            if edgelengths.get(clade, None):
+                edgelengths[clade] += length
             else:
-                edgelengths[tips] = length
-    cladecounts = [(count, clade) for (clade, count) in list(cladecounts.items())]
-    cladecounts.sort()
-    cladecounts.reverse()
+                edgelengths[clade] = length
+    # ties are in the order clades were first encountered
+    cladecounts = [(count, clade) for (clade, count) in cladecounts.items()]
+    cladecounts.sort(key=lambda x: x[0], reverse=True)
 
     if strict:
         # Remove any with support < 50%
@@ -116,53 +119,42 @@ def weighted_rooted_majority_rule(weighted_trees, strict=False, attr="support"):
                 break
 
     # Remove conflicts
-    accepted_clades = set()
+    accepted_clades = []
     counts = {}
-    for (count, clade) in cladecounts:
-        for accepted_clade in accepted_clades:
-            if clade.intersection(accepted_clade) and not (
-                clade.issubset(accepted_clade) or clade.issuperset(accepted_clade)
-            ):
-                break
-        else:
-            accepted_clades.add(clade)
-            counts[clade] = count
-            weighted_length = edgelengths[clade]
-            edgelengths[clade] = weighted_length and weighted_length / count
-
+    for index in _get_compatible([clade for count, clade in cladecounts]):
+        (count, clade) = cladecounts[index]
+        accepted_clades.append(clade)
+        counts[clade] = count
+        weighted_length = edgelengths[clade]
+        edgelengths[clade] = weighted_length and weighted_length / count
+
+    # smaller clades are built first, the node at the top of the clade
+    # containing each tip is tracked by tip position
+    tip_names = list(tip_index)
     nodes = {}
-    queue = []
     tree_build = TreeBuilder().create_edge
+    accepted_clades.sort(key=_num_bits)
     for clade in accepted_clades:
-        if len(clade) == 1:
-            tip_name = next(iter(clade))
+        positions = _bit_positions(clade)
+        if len(positions) == 1:
+            tip_name = tip_names[positions[0]]
             params = {"length": edgelengths[clade], attr: counts[clade]}
-            nodes[tip_name] = tree_build([], tip_name, params)
+            node = tree_build([], tip_name, params)
         else:
-            queue.append(((len(clade), clade)))
-
-    while queue:
-        queue.sort()
-        (size, clade) = queue.pop(0)
-        new_queue = []
-        for (size2, ancestor) in queue:
-            if clade.issubset(ancestor):
-                new_ancestor = (ancestor - clade) | frozenset([clade])
-                counts[new_ancestor] = counts.pop(ancestor)
-                edgelengths[new_ancestor] = edgelengths.pop(ancestor)
-                ancestor = new_ancestor
-            new_queue.append((len(ancestor), ancestor))
-        children = [nodes.pop(c) for c in clade]
-        assert len([children])
-        nodes[clade] = tree_build(
-            children, None, {attr: counts[clade], "length": edgelengths[clade]}
-        )
-        queue = new_queue
-
-    for root in list(nodes.values()):
+            children = {id(nodes[p]): nodes[p] for p in positions if p in nodes}
+            node = tree_build(
+                children.values(),
+                None,
+                {attr: counts[clade], "length": edgelengths[clade]},
+            )
+        for position in positions:
+            nodes[position] = node
+
+    roots = list({id(node): node for node in nodes.values()}.values())
+    for root in roots:
         root.name = "root"  # Yuk
 
-    return [root for root in list(nodes.values())]
+    return roots
 
 
 @extend_docstring_from(weighted_majority_rule)
@@ -172,42 +164,132 @@ def weighted_unrooted_majority_rule(weighted_trees, strict=False, attr="support"
     split_lengths = defaultdict(float)
     tips = None
     for (weight, tree) in weighted_trees:
-        for split, params in list(get_splits(tree).items()):
-            split_weights[split] += weight
-            if params["length"] is None:
-                split_lengths[split] = None
-            else:
-                split_lengths[split] += weight * params["length"]
         # Check that all trees have the same taxa
         if tips is None:
-            tips = frozenset.union(*split)
-        elif tips != frozenset.union(*split):
+            tip_names = tree.get_tip_names()
+            tips = frozenset(tip_names)
+            tip_index = {n: i for i, n in enumerate(tip_names)}
+        elif tips != frozenset(tree.get_tip_names()):
             raise NotImplementedError("all trees must have the same taxa")
 
+        for split, length in get_split_bits(tree, tip_index).items():
+            split_weights[split] += weight
+            if length is None:
+                split_lengths[split] = None
+            else:
+                split_lengths[split] += weight * length
+
     # Normalise split lengths by split weight and split weights by total weight
     for split in split_lengths:
         if not split_lengths[split] is None:
             split_lengths[split] /= split_weights[split]
     total_weight = sum(w for w, t in weighted_trees[::-1])
-    weighted_splits = [(w / total_weight, s) for s, w in list(split_weights.items())]
-    weighted_splits.sort(reverse=True)
+    weighted_splits = [(w / total_weight, s) for s, w in split_weights.items()]
+    # ties are in the order splits were first encountered
+    weighted_splits.sort(key=lambda x: x[0], reverse=True)
 
     # Remove conflicts and any with support < 50% if strict
+    if strict:
+        weighted_splits = [(w, s) for w, s in weighted_splits if w > 0.5]
     accepted_splits = {}
-    for weight, split in weighted_splits:
-        if strict and weight <= 0.5:
+    for index in _get_compatible([split for weight, split in weighted_splits]):
+        weight, split = weighted_splits[index]
+        accepted_splits[split] = {attr: weight, "length": split_lengths[split]}
+
+    return [_get_tree_from_bits(accepted_splits, tip_names)]
+
+
+def _num_bits(bits):
+    """number of bits set"""
+    return bin(bits).count("1")
+
+
+def _bit_positions(bits):
+    """positions of the bits set, in increasing order"""
+    return [i for i, bit in enumerate(reversed(bin(bits)[2:])) if bit == "1"]
+
+
+def _get_names(bits, tip_names):
+    """frozenset of the tip_names at the positions of bits set"""
+    return frozenset(tip_names[i] for i in _bit_positions(bits))
+
+
+def _get_compatible(clades):
+    """returns the indices of clades, or splits, accepted in order if
+    compatible with all those previously accepted
+
+    Notes
+    -----
+    Splits must be encoded by the side excluding the same tip, as done by
+    get_split_bits(). Then a pair is compatible if the sides are disjoint or
+    one contains the other. The clades are packed into words of uint64, so
+    each accepted clade is compared with all later clades in a few array
+    operations per word.
+    """
+    if not clades:
+        return []
+    num_words = max(clades).bit_length() // 64 + 1
+    data = b"".join(c.to_bytes(num_words * 8, "little") for c in clades)
+    words = numpy.frombuffer(data, dtype="<u8").reshape(len(clades), num_words)
+    words = numpy.ascontiguousarray(words.T)
+    compatible = numpy.ones(len(clades), dtype=bool)
+    accepted = []
+    index = 0
+    while True:
+        remaining = compatible[index:].nonzero()[0]
+        if not len(remaining):
             break
+        index += remaining[0]
+        accepted.append(index)
+        # non-zero if later clades intersect, or have tips not in, or lack
+        # tips of, the accepted clade
+        both, later_only, accepted_only = 0, 0, 0
+        for word in words:
+            clade = word[index]
+            later = word[index + 1 :]
+            both = both | (later & clade)
+            later_only = later_only | (later & ~clade)
+            accepted_only = accepted_only | (clade & ~later)
+        conflicts = (both != 0) & (later_only != 0) & (accepted_only != 0)
+        compatible[index + 1 :] &= ~conflicts
+        index += 1
+    return accepted
+
+
+def get_split_bits(tree, tip_index):
+    """Return a dict keyed by the splits equivalent to the tree, each encoded
+    as an integer. Values are edge.length for the corresponding edge.
 
-        for accepted_split in accepted_splits:
-            for s, a in product(split, accepted_split):
-                if s.isdisjoint(a):
-                    break
-            else:
-                break
+    Parameters
+    ----------
+    tree
+        a PhyloNode, treated as unrooted
+    tip_index : dict
+        {tip name: bit position}, must include all tip names
+
+    Notes
+    -----
+    A split is encoded by the side excluding the tree tip with the lowest
+    bit position, with the bit for each of its tips set. As a result, the
+    splits of trees with the same tip_index can be compared directly.
+    """
+    clades = tree.get_clade_bits(tip_index)
+    all_tips = clades[-1][1]
+    excluded = all_tips & -all_tips  # the lowest bit set
+    # the clade of a single child node has the child length added
+    lengths = {}
+    for node, clade in clades[:-1]:
+        if not node.children or node.length is None:
+            lengths[clade] = node.length
         else:
-            accepted_splits[split] = {attr: weight, "length": split_lengths[split]}
+            lengths[clade] = node.length + lengths.get(clade, 0.0)
 
-    return [get_tree(accepted_splits)]
+    splits = {}
+    for clade, length in lengths.items():
+        split = all_tips ^ clade if clade & excluded else clade
+        if split:  # not the clade of all tips, below a single child root
+            splits[split] = length
+    return splits
 
 
 def get_splits(tree):
@@ -217,27 +299,124 @@ def get_splits(tree):
     if len(tree.children) < 3:
         warnings.warn("tree is rooted - will return splits for unrooted tree")
 
-    def getTipsAndSplits(tree):
-        if tree.is_tip():
-            return ({frozenset([tree.name]): {"length": tree.length}}, [tree.name])
-
-        splits = defaultdict(lambda: {"length": 0.0})
-        tips = []
-        for child in tree.children:
-            s, t = getTipsAndSplits(child)
-            splits.update(s)
-            tips.extend(t)
-        if not tree.is_root():
-            split = frozenset([t for s in splits for t in s])
-            if tree.length is None:
-                splits[split] = {"length": None}
-            else:
-                splits[split] = {"length": tree.length + splits[split]["length"]}
-        return splits, tips
+    tip_names = tree.get_tip_names()
+    all_tips = (1 << len(tip_names)) - 1
+    tip_index = {n: i for i, n in enumerate(tip_names)}
+    return {
+        frozenset(
+            [_get_names(split, tip_names), _get_names(all_tips ^ split, tip_names)]
+        ): {"length": length}
+        for split, length in get_split_bits(tree, tip_index).items()
+    }
 
-    splits, tips = getTipsAndSplits(tree)
-    tips = frozenset(tips)
-    return {frozenset([tips - s, s]): params for s, params in list(splits.items())}
+
+def get_split_support(tree, trees):
+    """Return the proportion of trees in which each edge of tree is present.
+
+    Parameters
+    ----------
+    tree
+        a PhyloNode
+    trees
+        series of PhyloNode instances with the same tips as tree
+
+    Returns
+    -------
+    {edge name: support} for each edge excluding tips and the root. Trees
+    are treated as unrooted.
+    """
+    tip_names = tree.get_tip_names()
+    tip_index = {n: i for i, n in enumerate(tip_names)}
+    counts = defaultdict(int)
+    num_trees = 0
+    for other in trees:
+        if sorted(other.get_tip_names()) != sorted(tip_names):
+            raise ValueError("all trees must have the same tips as tree")
+        num_trees += 1
+        for split in get_split_bits(other, tip_index):
+            counts[split] += 1
+
+    all_tips = (1 << len(tip_names)) - 1
+    support = {}
+    for node, clade in tree.get_clade_bits(tip_index)[:-1]:
+        if node.children:
+            split = all_tips ^ clade if clade & 1 else clade
+            support[node.name] = counts[split] / num_trees
+    return support
+
+
+def robinson_foulds(tree1, tree2, weighted=False):
+    """Robinson-Foulds distance between two trees, treated as unrooted.
+
+    Parameters
+    ----------
+    tree1, tree2
+        PhyloNode instances with the same tips
+    weighted : bool
+        if True, the sum over all splits of the absolute difference in their
+        branch lengths, a missing split or length counting as 0. Otherwise,
+        the number of splits present in only one of the trees.
+    """
+    tip_names = tree1.get_tip_names()
+    if sorted(tip_names) != sorted(tree2.get_tip_names()):
+        raise ValueError("trees must have the same tips")
+    tip_index = {n: i for i, n in enumerate(tip_names)}
+    splits1 = get_split_bits(tree1, tip_index)
+    splits2 = get_split_bits(tree2, tip_index)
+    if not weighted:
+        return len(splits1.keys() ^ splits2.keys())
+
+    dist = 0.0
+    for split in splits1.keys() | splits2.keys():
+        dist += abs((splits1.get(split) or 0.0) - (splits2.get(split) or 0.0))
+    return dist
+
+
+def robinson_foulds_matrix(trees, weighted=False):
+    """Robinson-Foulds distances between all pairs of trees, treated as
+    unrooted.
+
+    Parameters
+    ----------
+    trees
+        series of PhyloNode instances with the same tips
+    weighted : bool
+        as for robinson_foulds()
+
+    Returns
+    -------
+    numpy array of shape (len(trees), len(trees))
+
+    Notes
+    -----
+    The splits of each tree are computed once and each distinct split is
+    assigned an integer id. The distances are then computed from the sorted
+    ids of each tree in compiled code, with pairs of trees in parallel.
+    """
+    trees = list(trees)
+    tip_names = sorted(trees[0].get_tip_names()) if trees else []
+    tip_index = {n: i for i, n in enumerate(tip_names)}
+    split_ids = {}
+    split_data = []
+    offsets = [0]
+    for tree in trees:
+        if sorted(tree.get_tip_names()) != tip_names:
+            raise ValueError("trees must have the same tips")
+        splits = get_split_bits(tree, tip_index)
+        splits = sorted(
+            (split_ids.setdefault(split, len(split_ids)), length or 0.0)
+            for split, length in splits.items()
+        )
+        split_data.extend(splits)
+        offsets.append(len(split_data))
+
+    ids = numpy.array([i for i, l in split_data], dtype=numpy.int64)
+    lengths = numpy.array([l for i, l in split_data], dtype=float)
+    matrix = numpy.zeros((len(trees), len(trees)), dtype=float)
+    fill_split_distance_matrix(
+        matrix, ids, lengths, numpy.array(offsets, dtype=numpy.int64), weighted
+    )
+    return matrix
 
 
 def get_tree(splits):
@@ -245,47 +424,55 @@ def get_tree(splits):
     The dict values should be dicts appropriate for the params input to
     TreeBuilder.create_edge.
     """
+    tip_names = {}
+    for split in splits:
+        for half in split:
+            tip_names.update(dict.fromkeys(half))
+    tip_names = list(tip_names)
+    tip_index = {n: i for i, n in enumerate(tip_names)}
+    all_tips = (1 << len(tip_names)) - 1
+    split_bits = {}
+    for split, params in splits.items():
+        bits = sum(1 << tip_index[n] for n in next(iter(split)))
+        split_bits[all_tips ^ bits if bits & 1 else bits] = params
+    return _get_tree_from_bits(split_bits, tip_names)
+
+
+def _get_tree_from_bits(splits, tip_names):
+    """Convert a dict keyed by splits, as produced by get_split_bits(), into
+    the equivalent tree.
+    """
     Edge = TreeBuilder().create_edge
+    all_tips = (1 << len(tip_names)) - 1
 
-    # Create a star from the tips
-    tips = []
-    the_rest = []
-    for split, params in list(splits.items()):
-        small, big = sorted(split, key=len)
-        if len(small) == 1:
-            for name in small:
-                tip = Edge(None, name, params)
-            tip.Split = small
-            tips.append(tip)
+    # rooted at the first tip, the splits are clades, which are built
+    # from the smallest and tracked by the position of their tips
+    nodes = {}
+    first_params = {}
+    for split in sorted(splits, key=_num_bits):
+        params = splits[split]
+        if split == all_tips ^ 1:
+            first_params = params
+            continue
+        positions = _bit_positions(split)
+        if len(positions) == 1:
+            node = Edge(None, tip_names[positions[0]], params)
         else:
-            the_rest.append((split, params))
-    tree = Edge(tips, "root", {})
-
-    # Add the rest of the splits, one by one
-    def addHalfSplit(edge, half, params):
-        included = []
-        test_half = frozenset([])
-        for child in edge.children:
-            if child.Split > half:  # This is not the droid you are looking for
-                return addHalfSplit(child, half, params)
-            if child.Split <= half:
-                included.append(child)
-                test_half = test_half.union(child.Split)
-
-        if test_half == half:  # Found it
-            split = Edge(included, None, params)
-            split.Split = half
-            for moved in included:
-                edge.remove_node(moved)
-            edge.append(split)
-            return True
-
-        return False
-
-    for split, params in the_rest:
-        for half in split:
-            if addHalfSplit(tree, half, params):
-                break
+            children = {}
+            for position in positions:
+                if position not in nodes:
+                    nodes[position] = Edge(None, tip_names[position], {})
+                children[id(nodes[position])] = nodes[position]
+            node = Edge(children.values(), None, params)
+        for position in positions:
+            nodes[position] = node
+
+    children = [Edge(None, tip_names[0], first_params)]
+    for position in range(1, len(tip_names)):
+        if position not in nodes:
+            nodes[position] = Edge(None, tip_names[position], {})
+    children.extend({id(node): node for node in nodes.values()}.values())
+    tree = Edge(children, "root", {})
 
     # Balance the tree for the sake of reproducibility
     tree = tree.balanced()
@@ -4,11 +4,7 @@ import numpy
 from numpy.linalg import solve as solve_linear_equations
 
 from .tree_space import TreeEvaluator, ancestry2tree
-from .util import (
-    distance_dict_and_names_to_1D,
-    distance_dict_to_1D,
-    triangular_order,
-)
+from .util import distance_dict_and_names_to_1D, distance_dict_to_1D
 
 
 __author__ = "Peter Maxwell"
@@ -20,25 +16,45 @@ __maintainer__ = "Peter Maxwell"
 __email__ = "pm67nz@gmail.com"
 __status__ = "Production"
 
-# This is a fairly slow implementation and NOT suitable for large trees.
-
 # Trees are represented as "ancestry" matricies in which A[i,j] iff j is an
 # ancestor of i.  For the LS calculations the ancestry matrix is converted
-# to a "paths" matrix or "split metric" in which S[p,j] iff the path between
-# the pth pair of tips passes through edge j.
-
-
-def _ancestry2paths(A):
-    """Convert edge x edge ancestry matrix to tip-to-tip path x edge
-    split metric matrix.  The paths will be in the same triangular matrix order
-    as produced by distance_dict_and_names_to_1D, provided that the tips appear in
-    the correct order in A"""
-    tips = [i for i in range(A.shape[0]) if sum(A[:, i]) == 1]
-    paths = []
-    for (tip1, tip2) in triangular_order(tips):
-        path = A[tip1] ^ A[tip2]
-        paths.append(path)
-    return numpy.array(paths)
+# to a "tips" matrix in which T[i,j] iff the ith tip is below edge j.  The
+# path between tips i and j passes through edge e iff exactly one of them is
+# below it, so the normal equations of the "paths" matrix, or "split metric",
+# S[p,e] are computed from T without forming S, which has a row for every
+# pair of tips.
+
+
+def _ancestry2tips(A):
+    """Convert edge x edge ancestry matrix to tip x edge matrix in which
+    T[i, e] iff tip i is below edge e. The tips are in the order they
+    appear in A"""
+    tips = A.sum(axis=0) == 1
+    return A[tips].astype(float)
+
+
+def _normal_equations(A, T, weights, weighted_dists):
+    """X, y for the weighted least squares solution of the edge lengths,
+    X = S'WS and y = S'Wd where S is the tip-to-tip path x edge split metric
+    and W the diagonal matrix of weights.
+
+    'weights' and 'weighted_dists' are square tip x tip matrices with zero
+    diagonals. Only products of the tip x edge matrix are needed because the
+    tips below two edges are those below one of them, or none, so the
+    number of operations is cubic, not quartic, in the number of tips."""
+    WT = numpy.dot(weights, T)
+    TWT = numpy.dot(T.T, WT)
+    # pairs below both edges
+    below = numpy.diag(TWT)
+    both = A * below[:, None] + A.T * below[None, :]
+    both[numpy.diag_indices_from(both)] = below
+    # one member of the pair below each edge
+    one = numpy.dot(T.T * weights.sum(axis=1), T)
+    one_and_both = numpy.dot(T.T, T * WT)
+    X = one + TWT - 2 * (one_and_both + one_and_both.T) + 2 * both
+    y = numpy.dot(T.T, weighted_dists.sum(axis=1))
+    y -= (T * numpy.dot(weighted_dists, T)).sum(axis=0)
+    return (X, y)
 
 
 class WLS(TreeEvaluator):
@@ -61,32 +77,30 @@ class WLS(TreeEvaluator):
         (self.names, dists) = distance_dict_to_1D(self.dists)
 
     def make_tree_scorer(self, names):
-        dists = distance_dict_and_names_to_1D(self.dists, names)
-        weights = distance_dict_and_names_to_1D(self.weights, names)
-        # dists and weights are 1D forms of triangular tip x tip matrices
-        # The order of the tip-to-tip paths is the same for dists, weights and
-        # A
+        # dists and weights are square tip x tip matrices, in the same tip
+        # order as the tips of the ancestry matrices
+        lower = numpy.tril_indices(len(names), -1)
+        dists = numpy.zeros((len(names), len(names)), float)
+        dists[lower] = distance_dict_and_names_to_1D(self.dists, names)
+        dists += dists.T
+        weights = numpy.zeros((len(names), len(names)), float)
+        weights[lower] = distance_dict_and_names_to_1D(self.weights, names)
+        weights += weights.T
         weights_dists = weights * dists
 
-        def evaluate(
-            ancestry,
-            lengths=None,
-            sum=sum,
-            _ancestry2paths=_ancestry2paths,
-            dot=numpy.dot,
-            maximum=numpy.maximum,
-            transpose=numpy.transpose,
-            solve=solve_linear_equations,
-        ):
-            A = _ancestry2paths(ancestry)
+        def evaluate(ancestry, lengths=None):
+            T = _ancestry2tips(ancestry)
             if lengths is None:
-                At = transpose(A)
-                X = dot(weights * At, A)
-                y = dot(At, weights_dists)
-                lengths = solve(X, y)
-                lengths = maximum(lengths, 0.0)
-            diffs = dot(A, lengths) - dists
-            err = sum(diffs ** 2)
+                (X, y) = _normal_equations(ancestry, T, weights, weights_dists)
+                lengths = solve_linear_equations(X, y)
+                lengths = numpy.maximum(lengths, 0.0)
+            lengths = numpy.asarray(lengths, float)
+            # tip-to-tip path lengths are the sum of tip depths less twice
+            # the depth of their common ancestor
+            depths = numpy.dot(T, lengths)
+            shared = numpy.dot(T * lengths, T.T)
+            diffs = depths[:, None] + depths[None, :] - 2 * shared - dists
+            err = (diffs[lower] ** 2).sum()
             return (err, lengths)
 
         return evaluate
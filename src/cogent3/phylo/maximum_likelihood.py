@@ -1,10 +1,17 @@
 #!/usr/bin/env python'
 from math import exp
 
+from cogent3.util import progress_display as UI
+
 from .least_squares import WLS
 from .tree_collection import make_trees  # only for back compat.
 from .tree_collection import LogLikelihoodScoredTreeCollection
-from .tree_space import TreeEvaluator, ancestry2tree
+from .tree_space import (
+    TreeEvaluator,
+    ancestry2tree,
+    nni_rearrangements,
+    spr_rearrangements,
+)
 
 
 __author__ = "Peter Maxwell"
@@ -17,6 +24,64 @@ __email__ = "pm67nz@gmail.com"
 __status__ = "Production"
 
 
+def _fake_wls(ancestry):
+    return (None, None)
+
+
+def _make_fake_wls_scorer(names):
+    return _fake_wls
+
+
+def _rules_for_tree(tree, rules, free_edges=None):
+    """param rules for a likelihood function of 'tree' from those of another,
+    with the lengths taken from 'tree'. If 'free_edges' is provided, all
+    parameters other than the lengths of those edges are held constant."""
+    edge_names = set(tree.get_node_names(includeself=False))
+    result = []
+    for rule in rules:
+        if rule["par_name"] == "length":
+            continue
+        if "edge" in rule and rule["edge"] not in edge_names:
+            continue
+        rule = dict(rule)
+        if "edges" in rule:
+            rule["edges"] = [e for e in rule["edges"] if e in edge_names]
+            if not rule["edges"]:
+                continue
+        if free_edges is not None and "init" in rule:
+            for bound in ("lower", "upper"):
+                rule.pop(bound, None)
+            rule.update(is_constant=True, value=rule.pop("init"))
+        result.append(rule)
+
+    for edge in tree.get_edge_vector(include_root=False):
+        if edge.length is None:
+            continue
+        if free_edges is None or edge.name in free_edges:
+            rule = dict(par_name="length", edge=edge.name, init=edge.length)
+        else:
+            rule = dict(
+                par_name="length", edge=edge.name, is_constant=True, value=edge.length
+            )
+        result.append(rule)
+    return result
+
+
+class _RearrangementScorer(object):
+    """Scores a rearranged tree, optimising only the lengths of the edges
+    changed by the rearrangement. Instances can be pickled for evaluation by
+    worker processes."""
+
+    def __init__(self, evaluator, rules):
+        self.evaluator = evaluator
+        self.rules = rules
+
+    def __call__(self, rearrangement):
+        (tree, edge_names) = rearrangement
+        lf = self.evaluator._fitted_lf(tree, self.rules, free_edges=edge_names)
+        return (-1.0 * lf.get_log_likelihood(), lf.get_annotated_tree())
+
+
 class ML(TreeEvaluator):
     """(err, best_tree) = ML(model, alignment, [dists]).trex()
 
@@ -29,15 +94,16 @@ class ML(TreeEvaluator):
         self.opt_args = opt_args
         self.names = alignment.names
         self.alignment = alignment
+        # bound methods and module level functions, so that instances can be
+        # pickled for parallel evaluation
         if hasattr(model, "make_likelihood_function"):
-            self.lf_factory = lambda tree: model.make_likelihood_function(tree)
+            self.lf_factory = model.make_likelihood_function
         else:
             self.lf_factory = model
         if dists:
             self.wlsMakeTreeScorer = WLS(dists).make_tree_scorer
         else:
-            fake_wls = lambda a: (None, None)
-            self.wlsMakeTreeScorer = lambda n: fake_wls
+            self.wlsMakeTreeScorer = _make_fake_wls_scorer
 
     def evaluate_tree(self, tree):
         names = tree.get_tip_names()
@@ -67,6 +133,98 @@ class ML(TreeEvaluator):
 
         return evaluate
 
+    def _fitted_lf(self, tree, rules=(), free_edges=None):
+        """optimised likelihood function for 'tree', initialised from the
+        param 'rules' and the tree lengths. If 'free_edges' is provided, only
+        the lengths of those edges are optimised."""
+        lf = self.lf_factory(tree)
+        lf.set_alignment(self.alignment.take_seqs(tree.get_tip_names()))
+        lf.apply_param_rules(_rules_for_tree(tree, rules, free_edges))
+        lf.optimise(show_progress=False, **self.opt_args)
+        return lf
+
+    @UI.display_wrap
+    def tree_search(
+        self,
+        tree,
+        moves="nni",
+        radius=3,
+        max_rounds=None,
+        min_improvement=1e-6,
+        parallel=False,
+        par_kw=None,
+        show_progress=False,
+        ui=None,
+    ):
+        """(lnL, tree) from hill climbing by tree rearrangements.
+
+        Parameters
+        ----------
+        tree
+            the starting tree, with tips matching the alignment names
+        moves : str
+            'nni' for nearest neighbour interchanges or 'spr' for subtree
+            prune and regraft
+        radius : int
+            for 'spr', the maximum number of nodes between the pruned
+            subtree and the edge it is moved to
+        max_rounds : int or None
+            maximum number of rearrangements accepted, unlimited if None
+        min_improvement : float
+            the smallest increase in lnL for a rearrangement to be accepted
+        parallel : bool
+            score candidate rearrangements in worker processes
+        par_kw : dict
+            arguments passed to cogent3.util.parallel.imap
+
+        Notes
+        -----
+        In each round, every rearrangement of the current tree is scored by
+        optimising the lengths of only the edges it changed, with all other
+        parameters held constant at their current values. As the partial
+        likelihoods of subtrees with constant lengths are not recalculated
+        during optimisation, this is much faster than a full fit. The best
+        rearrangement, if it improves lnL, is then fully optimised and
+        becomes the current tree.
+        """
+        if moves == "nni":
+            rearrangements = nni_rearrangements
+        elif moves == "spr":
+            rearrangements = lambda t: spr_rearrangements(t, radius=radius)
+        else:
+            raise ValueError("moves must be 'nni' or 'spr', not %r" % moves)
+
+        assert set(tree.get_tip_names()) == set(self.names)
+        if len(tree.children) < 3:
+            tree = tree.unrooted()
+        lf = self._fitted_lf(tree)
+        lnL = lf.get_log_likelihood()
+        tree = lf.get_annotated_tree()
+        rounds = 0
+        while max_rounds is None or rounds < max_rounds:
+            candidates = list(rearrangements(tree))
+            if not candidates:
+                break
+            scorer = _RearrangementScorer(self, lf.get_param_rules())
+            scored = ui.imap(
+                scorer,
+                candidates,
+                noun="round %d rearrangement" % (rounds + 1),
+                parallel=parallel,
+                par_kw=par_kw,
+            )
+            (err, best) = min(scored, key=lambda result: result[0])
+            if -err < lnL + min_improvement:
+                break
+            lf = self._fitted_lf(best, lf.get_param_rules())
+            if lf.get_log_likelihood() < lnL + min_improvement:
+                break
+            lnL = lf.get_log_likelihood()
+            tree = lf.get_annotated_tree()
+            rounds += 1
+
+        return self.result2output(-1.0 * lnL, None, tree, self.names)
+
     def result2output(self, err, ancestry, annotated_tree, names):
         return (-1.0 * err, annotated_tree)
 
@@ -15,10 +15,13 @@ from collections import deque
 import numpy
 
 from cogent3.core.tree import TreeBuilder
+from cogent3.evolve.fast_distance import DistanceMatrix
 from cogent3.phylo.tree_collection import ScoredTreeCollection
 from cogent3.phylo.util import distance_dict_to_2D
 from cogent3.util import progress_display as UI
 
+from .nj_numba import nj_joins
+
 
 __author__ = "Peter Maxwell"
 __copyright__ = "Copyright 2007-2020, The Cogent Project"
@@ -171,17 +174,68 @@ def uniq_neighbour_joins(trees, encode_partition):
         topologies.add(topology)
 
 
+def _get_names_and_array(dists):
+    """names and a square array of distances"""
+    if isinstance(dists, DistanceMatrix):
+        row_names, col_names = dists.template.names
+        d = numpy.array(dists.array, dtype=float)
+        numpy.fill_diagonal(d, 0.0)
+        # missing or asymmetric values are resolved (or rejected) as for
+        # dicts
+        if list(row_names) == list(col_names) and not (
+            numpy.isnan(d).any() or (d != d.T).any()
+        ):
+            return list(row_names), d
+
+    try:
+        dists = dists.to_dict()
+    except AttributeError:
+        pass
+
+    return distance_dict_to_2D(dists)
+
+
+def _nj(dists):
+    """(tree length, tree) from canonical neighbour joining"""
+    (names, d) = _get_names_and_array(dists)
+    if len(names) < 3:
+        raise ValueError("neighbour joining requires at least 3 sequences")
+
+    joins, lengths, last, last_lengths, score = nj_joins(d)
+    # built in the order of joining, as large trees may be too deep for
+    # LightweightTreeNode.convert()
+    constructor = TreeBuilder().create_edge
+    nodes = [constructor([], str(name), {}) for name in names]
+    for pair, pair_lengths in zip(joins.tolist(), lengths.tolist()):
+        children = [nodes[i] for i in pair]
+        for child, length in zip(children, pair_lengths):
+            child.length = max(0.0, length)
+        nodes.append(constructor(children, None, {}))
+
+    children = [nodes[i] for i in last.tolist()]
+    for child, length in zip(children, last_lengths.tolist()):
+        child.length = max(0.0, length)
+    tree = constructor(children, "root", {})
+    return (score, tree)
+
+
 @UI.display_wrap
 def gnj(dists, keep=None, dkeep=0, ui=None):
     """Arguments:
-        - dists: dict of (name1, name2): distance
+        - dists: dict of (name1, name2): distance, or a DistanceMatrix
         - keep: number of best partial trees to keep at each iteration,
           and therefore to return.  Same as Q parameter in original GNJ paper.
         - dkeep: number of diverse partial trees to keep at each iteration,
           and therefore to return.  Same as D parameter in original GNJ paper.
     Result:
         - a sorted list of (tree length, tree) tuples
+
+    If keep is 1 and dkeep is 0, this is canonical neighbour joining, which
+    is done in compiled code.
     """
+    if keep == 1 and not dkeep:
+        return ScoredTreeCollection([_nj(dists)])
+
     try:
         dists = dists.to_dict()
     except AttributeError:
@@ -285,7 +339,7 @@ def gnj(dists, keep=None, dkeep=0, ui=None):
 
 def nj(dists, show_progress=True):
     """Arguments:
-    - dists: dict of (name1, name2): distance
+    - dists: dict of (name1, name2): distance, or a DistanceMatrix
     """
     (result,) = gnj(dists, keep=1, show_progress=show_progress)
     (score, tree) = result
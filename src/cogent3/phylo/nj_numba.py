@@ -0,0 +1,210 @@
+import numpy
+
+from numba import njit
+
+
+__author__ = "Gavin Huttley"
+__copyright__ = "Copyright 2007-2020, The Cogent Project"
+__credits__ = ["Gavin Huttley"]
+__license__ = "BSD-3"
+__version__ = "2020.7.2a"
+__maintainer__ = "Gavin Huttley"
+__email__ = "gavin.huttley@anu.edu.au"
+__status__ = "Alpha"
+
+
+# sorts the live nodes nearest to the node in slot by their distance
+@njit(cache=True)
+def _sort_row(dists, order, nearest, slot, live, num_live, slot_node):
+    """writes the nodes nearest to the node in slot to order[slot], and their
+    distances to nearest[slot], in order of distance.
+
+    Returns the number written and a lower bound on the distance of those not
+    written, inf if all were written."""
+    others = numpy.empty(num_live - 1, dtype=numpy.int64)
+    k = 0
+    for index in range(num_live):
+        if live[index] != slot:
+            others[k] = live[index]
+            k += 1
+    row = numpy.empty(num_live - 1, dtype=numpy.float64)
+    for k in range(num_live - 1):
+        row[k] = dists[slot, others[k]]
+
+    width = order.shape[1]
+    threshold = numpy.inf
+    if width < num_live - 1:
+        # selecting the nearest is linear, so only they are sorted
+        threshold = numpy.partition(row, width - 1)[width - 1]
+        selected = numpy.empty(width, dtype=numpy.int64)
+        k = 0
+        for index in range(num_live - 1):
+            if row[index] < threshold:
+                selected[k] = index
+                k += 1
+        for index in range(num_live - 1):
+            if k == width:
+                break
+            if row[index] == threshold:
+                selected[k] = index
+                k += 1
+        others = others[selected]
+        row = row[selected]
+
+    sort_order = numpy.argsort(row, kind="mergesort")
+    for k in range(len(sort_order)):
+        order[slot, k] = slot_node[others[sort_order[k]]]
+        nearest[slot, k] = row[sort_order[k]]
+    return len(sort_order), threshold
+
+
+# canonical neighbour joining of a square distance matrix
+@njit(cache=True)
+def nj_joins(dists, width=256):
+    """joins nodes until 3 remain, modifying dists in place.
+
+    Tips are nodes 0 to n - 1, the node created by join k is n + k. Returns
+    the pairs of nodes joined, their branch lengths, the final 3 nodes, their
+    branch lengths and the total tree length.
+
+    For each node, the width nearest nodes are kept sorted by distance. As the
+    join criterion of a pair is bounded below using the largest row sum,
+    these are visited until no later node can improve on the best pair found
+    (Simonsen et al, 2008, RapidNJ). Only if all are visited without reaching
+    the bound is the full row of dists examined."""
+
+    num_tips = len(dists)
+    num_joins = num_tips - 3
+    joins = numpy.empty((num_joins, 2), dtype=numpy.int64)
+    lengths = numpy.empty((num_joins, 2), dtype=numpy.float64)
+
+    # nodes occupying each slot of dists, and the slot of each node
+    slot_node = numpy.arange(num_tips)
+    node_slot = numpy.full(num_tips + num_joins, -1, dtype=numpy.int64)
+    node_slot[:num_tips] = numpy.arange(num_tips)
+    live = numpy.arange(num_tips)
+    num_live = num_tips
+
+    row_sums = numpy.zeros(num_tips, dtype=numpy.float64)
+    for i in range(num_tips):
+        for j in range(num_tips):
+            if i != j:
+                row_sums[i] += dists[i, j]
+
+    # the nearest nodes to the node in each slot are
+    # order[slot, start[slot]:end[slot]], all others are at least
+    # thresholds[slot] away
+    width = min(width, num_tips - 1)
+    order = numpy.empty((num_tips, width), dtype=numpy.int64)
+    nearest = numpy.empty((num_tips, width), dtype=numpy.float64)
+    start = numpy.zeros(num_tips, dtype=numpy.int64)
+    end = numpy.zeros(num_tips, dtype=numpy.int64)
+    thresholds = numpy.empty(num_tips, dtype=numpy.float64)
+    for slot in range(num_tips):
+        end[slot], thresholds[slot] = _sort_row(
+            dists, order, nearest, slot, live, num_live, slot_node
+        )
+
+    score = 0.0
+    for step in range(num_joins):
+        scale = num_live - 2.0
+        max_sum = -numpy.inf
+        for index in range(num_live):
+            max_sum = max(max_sum, row_sums[live[index]])
+
+        best = numpy.inf
+        best_i = best_j = -1
+        for index in range(num_live):
+            slot = live[index]
+            row_sum = row_sums[slot]
+            first = start[slot]
+            while first < end[slot] and node_slot[order[slot, first]] < 0:
+                first += 1
+            start[slot] = first
+            exhausted = True
+            for k in range(first, end[slot]):
+                other = node_slot[order[slot, k]]
+                if other < 0:
+                    continue
+                dist = scale * nearest[slot, k] - row_sum
+                if dist - max_sum > best:
+                    exhausted = False
+                    break
+                dist -= row_sums[other]
+                if dist < best:
+                    best = dist
+                    best_i = slot
+                    best_j = other
+
+            threshold = thresholds[slot]
+            if not exhausted or threshold == numpy.inf:
+                continue
+            if scale * threshold - row_sum - max_sum > best:
+                continue
+            # nodes beyond the nearest may be better
+            for other_index in range(num_live):
+                other = live[other_index]
+                if other == slot:
+                    continue
+                dist = scale * dists[slot, other] - row_sum
+                dist -= row_sums[other]
+                if dist < best:
+                    best = dist
+                    best_i = slot
+                    best_j = other
+            start[slot] = 0
+            end[slot], thresholds[slot] = _sort_row(
+                dists, order, nearest, slot, live, num_live, slot_node
+            )
+
+        i, j = best_i, best_j
+        dist_ij = dists[i, j]
+        diff = (row_sums[i] - row_sums[j]) / scale
+        joins[step, 0] = slot_node[i]
+        joins[step, 1] = slot_node[j]
+        lengths[step, 0] = 0.5 * (dist_ij + diff)
+        lengths[step, 1] = 0.5 * (dist_ij - diff)
+        score += dist_ij
+
+        # the new node takes slot i, slot j is no longer used
+        for index in range(num_live):
+            if live[index] == j:
+                live[index] = live[num_live - 1]
+                num_live -= 1
+                break
+        new_sum = 0.0
+        for index in range(num_live):
+            other = live[index]
+            if other == i:
+                continue
+            dist = 0.5 * (dists[i, other] + dists[j, other] - dist_ij)
+            row_sums[other] += dist - dists[i, other] - dists[j, other]
+            dists[i, other] = dist
+            dists[other, i] = dist
+            new_sum += dist
+        row_sums[i] = new_sum
+
+        node_slot[slot_node[i]] = -1
+        node_slot[slot_node[j]] = -1
+        new_node = num_tips + step
+        slot_node[i] = new_node
+        node_slot[new_node] = i
+        start[i] = 0
+        end[i], thresholds[i] = _sort_row(
+            dists, order, nearest, i, live, num_live, slot_node
+        )
+
+    last = numpy.empty(3, dtype=numpy.int64)
+    last_lengths = numpy.zeros(3, dtype=numpy.float64)
+    total = 0.0
+    for index in range(3):
+        last[index] = slot_node[live[index]]
+        for other in range(3):
+            if other != index:
+                last_lengths[index] += dists[live[index], live[other]]
+        total += last_lengths[index]
+    for index in range(3):
+        last_lengths[index] -= total / 4
+        score += last_lengths[index]
+
+    return joins, lengths, last, last_lengths, score
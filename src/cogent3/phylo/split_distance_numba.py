@@ -0,0 +1,47 @@
+from numba import njit, prange
+
+
+__author__ = "Gavin Huttley"
+__copyright__ = "Copyright 2007-2020, The Cogent Project"
+__credits__ = ["Gavin Huttley"]
+__license__ = "BSD-3"
+__version__ = "2020.7.2a"
+__maintainer__ = "Gavin Huttley"
+__email__ = "gavin.huttley@anu.edu.au"
+__status__ = "Alpha"
+
+
+# fills in a matrix of Robinson-Foulds distances between trees
+@njit(parallel=True, cache=True)
+def fill_split_distance_matrix(matrix, split_ids, lengths, offsets, weighted):
+    """fills matrix with the distances between all pairs of trees.
+
+    The splits of tree i are split_ids[offsets[i]:offsets[i + 1]], sorted in
+    increasing order, with their branch lengths in lengths. If weighted, the
+    distance is the sum of the absolute differences in length over all
+    splits, otherwise the number of splits present in only one tree."""
+
+    num_trees = len(offsets) - 1
+    for i in prange(num_trees):
+        for j in range(i + 1, num_trees):
+            first, first_end = offsets[i], offsets[i + 1]
+            second, second_end = offsets[j], offsets[j + 1]
+            dist = 0.0
+            while first < first_end and second < second_end:
+                if split_ids[first] == split_ids[second]:
+                    diff = lengths[first] - lengths[second]
+                    dist += abs(diff) if weighted else 0.0
+                    first += 1
+                    second += 1
+                elif split_ids[first] < split_ids[second]:
+                    dist += abs(lengths[first]) if weighted else 1.0
+                    first += 1
+                else:
+                    dist += abs(lengths[second]) if weighted else 1.0
+                    second += 1
+            for k in range(first, first_end):
+                dist += abs(lengths[k]) if weighted else 1.0
+            for k in range(second, second_end):
+                dist += abs(lengths[k]) if weighted else 1.0
+            matrix[i, j] = dist
+            matrix[j, i] = dist
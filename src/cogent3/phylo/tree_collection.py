@@ -1,5 +1,8 @@
 from numpy import exp, log
 
+from cogent3.evolve.fast_distance import DistanceMatrix
+from cogent3.util.dict_array import DictArrayTemplate
+
 from . import consensus
 
 
@@ -46,6 +49,23 @@ class ScoredTreeCollection(_UserList):
             strict = True
         return consensus.weighted_majority_rule(self, strict, method=method)
 
+    def get_robinson_foulds(self, weighted=False):
+        """returns DistanceMatrix of Robinson-Foulds distances between all
+        pairs of trees, keyed by their index in the collection
+
+        Parameters
+        ----------
+        weighted : bool
+            if True, the sum of absolute differences in branch lengths
+            over all splits. Otherwise, the number of splits present in only
+            one of the trees.
+        """
+        dists = consensus.robinson_foulds_matrix(
+            [tree for _, tree in self], weighted=weighted
+        )
+        names = list(range(len(self)))
+        return DistanceMatrix(DictArrayTemplate(names, names).wrap(dists))
+
 
 class UsefullyScoredTreeCollection(ScoredTreeCollection):
     def scored_tree_format(self, tree, score):
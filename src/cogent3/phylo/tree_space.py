@@ -5,6 +5,7 @@ import itertools
 import numpy
 
 from cogent3.core.tree import TreeBuilder
+from cogent3.phylo.consensus import get_split_bits
 from cogent3.phylo.tree_collection import ScoredTreeCollection
 from cogent3.util import checkpointing
 from cogent3.util import progress_display as UI
@@ -125,9 +126,173 @@ def grown(B, split_edge):
     return A
 
 
+def ancestry2splits(A, names):
+    """hashable representation of the unrooted topology of ancestry matrix
+    'A', whose tips are in the same order as 'names'. Each edge is
+    represented by the tips on the side of it not containing the first tip."""
+    tips = numpy.flatnonzero(A.sum(axis=0) == 1)
+    below = A[tips].astype(bool)
+    below ^= below[0]
+    splits = numpy.packbits(below.T, axis=1)
+    return (tuple(names), frozenset(split.tobytes() for split in splits))
+
+
+class _GrownTreeScorer(object):
+    """Scores an ancestry matrix grown by one leaf. Instances can be pickled
+    for evaluation by worker processes, which create their own tree scorer."""
+
+    def __init__(self, evaluator, names):
+        self.evaluator = evaluator
+        self.names = names
+        self._evaluate = None
+
+    def __getstate__(self):
+        # the tree scorer is a closure, so is not pickled
+        return {"evaluator": self.evaluator, "names": self.names, "_evaluate": None}
+
+    def __call__(self, spec):
+        (tree_ordinal, old_ancestry, split_edge) = spec
+        if self._evaluate is None:
+            self._evaluate = self.evaluator.make_tree_scorer(self.names)
+        ancestry = grown(old_ancestry, split_edge)
+        (err, lengths) = self._evaluate(ancestry)
+        return (err, tree_ordinal, split_edge, lengths, ancestry)
+
+
+def _unused_edge_name(tree):
+    names = set(tree.get_node_names())
+    index = len(names)
+    while "edge.%d" % index in names:
+        index += 1
+    return "edge.%d" % index
+
+
+def regrafted(tree, prune_name, graft_name):
+    """(tree, edge_names) with the subtree 'prune_name' of the unrooted 'tree'
+    moved to the edge above 'graft_name'. 'edge_names' are the names of the
+    edges whose length or neighbours were changed by the move.
+
+    If left with a single child, the node the subtree was pruned from is
+    reused for the node joining it to the graft edge, otherwise a new node is
+    named. Lengths are copied, with the edges joined by pruning summed and
+    the graft edge divided in two."""
+    tree = tree.deepcopy()
+    subtree = tree.get_node_matching_name(prune_name)
+    target = tree.get_node_matching_name(graft_name)
+    edge_names = {prune_name, graft_name}
+    new_name = _unused_edge_name(tree)
+    parent = subtree.parent
+    parent.remove_node(subtree)
+    if len(parent.children) == 1 and not parent.is_root():
+        child = parent.children[0]
+        grandparent = parent.parent
+        grandparent.remove_node(parent)
+        parent.remove_node(child)
+        if child.length is not None and parent.length is not None:
+            child.length += parent.length
+        grandparent.append(child)
+        joint = parent
+        edge_names.add(child.name)
+    else:
+        joint = parent.__class__(name=new_name, name_loaded=False)
+        edge_names.update(c.name for c in parent.children)
+        if not parent.is_root():
+            edge_names.add(parent.name)
+
+    above = target.parent
+    above.remove_node(target)
+    if target.length is not None:
+        target.length /= 2
+    joint.length = target.length
+    joint.extend([target, subtree])
+    above.append(joint)
+    edge_names.add(joint.name)
+    edge_names.update(c.name for c in above.children)
+    if not above.is_root():
+        edge_names.add(above.name)
+
+    if len(tree.children) < 3:
+        tree = tree.unrooted()
+        edge_names.update(c.name for c in tree.children)
+    edge_names &= set(tree.get_node_names(includeself=False))
+    return (tree, edge_names)
+
+
+def nni_rearrangements(tree):
+    """the (tree, edge_names) for each nearest neighbour interchange of the
+    unrooted 'tree', as returned by regrafted"""
+    for node in tree.postorder(include_self=False):
+        if not node.children:
+            continue
+        sibling = [c for c in node.parent.children if c is not node][0]
+        for child in node.children:
+            yield regrafted(tree, child.name, sibling.name)
+
+
+def spr_rearrangements(tree, radius=3):
+    """the (tree, edge_names) for each subtree prune and regraft of the
+    unrooted 'tree', as returned by regrafted, in which the graft edge is
+    within 'radius' nodes of the pruned subtree. Duplicate topologies, and
+    those the same as 'tree', are excluded."""
+    tip_index = dict((n, i) for (i, n) in enumerate(tree.get_tip_names()))
+    seen = {frozenset(get_split_bits(tree, tip_index))}
+    for subtree in tree.preorder(include_self=False):
+        excluded = set(id(n) for n in subtree.preorder())
+        excluded.add(id(subtree.parent))
+        # nodes within radius of the node the subtree is pruned from
+        visited = {id(subtree.parent)}
+        level = [subtree.parent]
+        targets = []
+        for step in range(radius):
+            next_level = []
+            for node in level:
+                neighbours = list(node.children)
+                if node.parent is not None:
+                    neighbours.append(node.parent)
+                for neighbour in neighbours:
+                    if id(neighbour) in visited:
+                        continue
+                    visited.add(id(neighbour))
+                    next_level.append(neighbour)
+                    if id(neighbour) not in excluded and not neighbour.is_root():
+                        targets.append(neighbour)
+            level = next_level
+
+        for target in targets:
+            (result, edge_names) = regrafted(tree, subtree.name, target.name)
+            key = frozenset(get_split_bits(result, tip_index))
+            if key not in seen:
+                seen.add(key)
+                yield (result, edge_names)
+
+
+def _with_cached(specs, keys, scored, cache):
+    """results for specs, taken from cache where keys are present in it and
+    otherwise from the scored series, which are added to cache"""
+    scored = iter(scored)
+    for ((tree_ordinal, old_ancestry, split_edge), key) in zip(specs, keys):
+        if cache is None or key not in cache:
+            result = next(scored)
+            if cache is not None:
+                (err, tree_ordinal, split_edge, lengths, ancestry) = result
+                cache[key] = (err, lengths, ancestry)
+        else:
+            (err, lengths, ancestry) = cache[key]
+            result = (err, tree_ordinal, split_edge, lengths, ancestry)
+        yield result
+
+
 class TreeEvaluator(object):
     """Subclass must provide make_tree_scorer and result2output"""
 
+    _score_cache = None
+
+    def __getstate__(self):
+        # scored trees are not needed by worker processes
+        state = self.__dict__.copy()
+        state.pop("_score_cache", None)
+        return state
+
     def results2output(self, results):
         return ScoredTreeCollection(results)
 
@@ -171,6 +336,9 @@ class TreeEvaluator(object):
         return_all=False,
         filename=None,
         interval=None,
+        parallel=False,
+        par_kw=None,
+        cache=False,
         show_progress=False,
         ui=None,
     ):
@@ -180,6 +348,13 @@ class TreeEvaluator(object):
         'start' is an optional list of initial trees.  Each of the trees must
         contain the same tips.
         'filename' and 'interval' control checkpointing.
+        If 'parallel', candidate trees are scored by worker processes, with
+        'par_kw' passed to cogent3.util.parallel.imap. The evaluator must be
+        picklable.
+        If 'cache', scored trees are kept by this evaluator, keyed by their
+        tip names and splits, and not scored again in later calls. This
+        avoids repeating work when, for instance, a search is repeated with
+        a larger 'k'. Memory use grows with the number of trees scored.
 
         Advanced step-wise addition algorithm
         M. J. Wolf, S. Easteal, M. Kahn, B. D. McKay, and L. S. Jermiin.
@@ -241,30 +416,48 @@ class TreeEvaluator(object):
             tree_count = min(k, evals)
             work_done.append(total_work)
 
+        if cache:
+            if self._score_cache is None:
+                self._score_cache = {}
+            score_cache = self._score_cache
+        else:
+            score_cache = None
+
         # For each tree size, grow at each edge of each tree. Keep best k.
         for n in range(init_tree_size + 1, tree_size + 1):
-            evaluate = self.make_tree_scorer(names[:n])
-
-            def grown_tree(spec):
-                (tree_ordinal, tree, split_edge) = spec
-                (old_err, old_lengths, old_ancestry) = tree
-                ancestry = grown(old_ancestry, split_edge)
-                (err, lengths) = evaluate(ancestry)
-                return (err, tree_ordinal, split_edge, lengths, ancestry)
-
+            scorer = _GrownTreeScorer(self, names[:n])
             specs = [
-                (i, tree, edge)
-                for (i, tree) in enumerate(trees)
+                (i, ancestry, edge)
+                for (i, (err, lengths, ancestry)) in enumerate(trees)
                 for edge in range(n * 2 - 5)
             ]
 
-            candidates = ui.imap(
-                grown_tree,
-                specs,
+            if cache:
+                keys = [
+                    ancestry2splits(grown(ancestry, edge), names[:n])
+                    for (i, ancestry, edge) in specs
+                ]
+                # only the first occurrence of a topology not yet cached
+                seen = set()
+                todo = []
+                for (spec, key) in zip(specs, keys):
+                    if key not in seen and key not in score_cache:
+                        seen.add(key)
+                        todo.append(spec)
+            else:
+                keys = [None] * len(specs)
+                todo = specs
+
+            scored = ui.imap(
+                scorer,
+                todo,
                 noun=("%s leaf tree" % n),
                 start=work_done[n - 1] / total_work,
                 end=work_done[n] / total_work,
+                parallel=parallel and len(todo) > 0,
+                par_kw=par_kw,
             )
+            candidates = _with_cached(specs, keys, scored, score_cache)
 
             best = ismallest(candidates, k)
 
@@ -140,19 +140,20 @@ def open_zip(filename, mode="r", **kwargs):
     ----
     If mode="r". The function raises ValueError if zip has > 1 record.
     The returned object is wrapped by TextIOWrapper with latin encoding
-    (so it's not a bytes string).
+    (so it's not a bytes string), unless mode="rb".
 
     If mode="w", returns an atomic_write() instance.
     """
     if mode.startswith("w"):
         return atomic_write(filename, mode=mode, in_zip=True)
 
-    mode = mode.strip("t")
+    binary = "b" in mode
+    mode = mode.strip("tb")
     with ZipFile(filename) as zf:
         if len(zf.namelist()) != 1:
             raise ValueError("Archive is supposed to have only one record.")
         opened = zf.open(zf.namelist()[0], mode=mode, **kwargs)
-        return TextIOWrapper(opened, encoding="latin-1")
+        return opened if binary else TextIOWrapper(opened, encoding="latin-1")
 
 
 def open_(filename, mode="rt", **kwargs):
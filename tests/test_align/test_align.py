@@ -1,5 +1,7 @@
 #!/usr/bin/env python
 
+import gc
+import multiprocessing
 import unittest
 
 import cogent3.align.progressive
@@ -9,10 +11,12 @@ from cogent3 import DNA, make_unaligned_seqs
 from cogent3.align.align import (
     classic_align_pairwise,
     global_pairwise,
+    global_pairwise_to_ref,
     local_pairwise,
     make_dna_scoring_dict,
     make_generic_scoring_dict,
 )
+from cogent3.align.progressive import PogCache
 from cogent3.evolve.models import HKY85, get_model
 
 
@@ -100,6 +104,39 @@ class AlignmentTestCase(unittest.TestCase):
         aln, score = global_pairwise(seq1, seq2, S, 10, 2, return_score=True)
         self.assertTrue(score > 100)
 
+    def test_global_pairwise_to_ref(self):
+        """aligning many seqs to one ref matches individual pairwise results"""
+        S = make_dna_scoring_dict(10, -1, -8)
+        ref = DNA.make_seq("tacagtaccgt", name="ref")
+        queries = [
+            DNA.make_seq("tacgtaccgt", name="a"),
+            DNA.make_seq("tacaggtaccgt", name="b"),
+            DNA.make_seq("tacagtaccgt", name="ref"),
+        ]
+        got = global_pairwise_to_ref(ref, queries, S, 10, 2)
+        expect = {"ref": "TACAGTACCGT", "a": "TAC-GTACCGT", "b": "TACAGTACCGT"}
+        self.assertEqual(got, expect)
+        # scores are not returned, so requesting them is an error
+        with self.assertRaises(TypeError):
+            global_pairwise_to_ref(ref, queries, S, 10, 2, return_score=True)
+
+    @unittest.skipIf(multiprocessing.cpu_count() < 2, "requires multiple CPUs")
+    def test_global_pairwise_to_ref_parallel(self):
+        """aligning to one ref in parallel matches serial, par_kw unmodified"""
+        S = make_dna_scoring_dict(10, -1, -8)
+        ref = DNA.make_seq("tacagtaccgt", name="ref")
+        queries = [
+            DNA.make_seq("tacgtaccgt", name="a"),
+            DNA.make_seq("tacaggtaccgt", name="b"),
+        ]
+        expect = global_pairwise_to_ref(ref, queries, S, 10, 2)
+        par_kw = dict(max_workers=1)
+        got = global_pairwise_to_ref(
+            ref, queries, S, 10, 2, parallel=True, par_kw=par_kw
+        )
+        self.assertEqual(got, expect)
+        self.assertEqual(par_kw, dict(max_workers=1))
+
     def test_codon(self):
         s1 = DNA.make_seq("tacgccgta", name="A")
         s2 = DNA.make_seq("tacgta", name="B")
@@ -218,6 +255,138 @@ class MultipleAlignmentTestCase(unittest.TestCase):
             param_vals=[("kappa", 2.0)],
         )
 
+    def test_progressive_pog_cache(self):
+        """sub-alignments in pog_cache are reused"""
+        orig = {"A": "tacagta", "B": "tacgtc", "C": "tata", "D": "tacgtc"}
+        expect = self._make_aln(orig).to_dict()
+        cache = PogCache()
+        got = self._make_aln(orig, pog_cache=cache).to_dict()
+        self.assertEqual(got, expect)
+        # internal nodes, excluding the root
+        self.assertEqual(len(cache.pogs), 2)
+        # cached sub-alignments are used as tips
+        pogs = list(cache.pogs.values())
+        got = self._make_aln(orig, pog_cache=cache).to_dict()
+        self.assertEqual(got, expect)
+        self.assertEqual(list(cache.pogs.values()), pogs)
+        # changing a sequence only re-aligns nodes ancestral to it
+        orig["C"] = "tacta"
+        expect = self._make_aln(orig).to_dict()
+        got = self._make_aln(orig, pog_cache=cache).to_dict()
+        self.assertEqual(got, expect)
+        self.assertEqual(len(cache.pogs), 3)
+        with self.assertRaises(TypeError):
+            self._make_aln(orig, pog_cache={})
+
+    def test_progressive_pog_cache_added_seqs(self):
+        """sub-alignments of subtrees without added sequences are reused"""
+        orig = {"A": "tacagta", "B": "tacgtc", "C": "tata", "D": "tacgtc"}
+        seqs = {n: DNA.make_seq(s) for n, s in orig.items()}
+        cache = PogCache()
+        tree = cogent3.make_tree(treestring="(((A,B),C),D)")
+        cogent3.align.progressive.TreeAlign(
+            dna_model, seqs, tree=tree, show_progress=False, pog_cache=cache
+        )
+        cached = dict(cache.pogs)
+        seqs["E"] = DNA.make_seq("tacgta")
+        seqs["F"] = DNA.make_seq("taccgta")
+        tree = cogent3.make_tree(treestring="((((A,B),C),D),(E,F))")
+        got, _ = cogent3.align.progressive.TreeAlign(
+            dna_model, seqs, tree=tree, show_progress=False, pog_cache=cache
+        )
+        self.assertEqual(set(got.names), set(seqs))
+        # the untouched subtrees are the same objects
+        for key, pog in cached.items():
+            self.assertIs(cache.pogs[key], pog)
+        # plus ((A,B),C),D) and (E,F)
+        self.assertEqual(len(cache.pogs), 4)
+        # a guide tree not matching the sequences is an error
+        seqs["G"] = DNA.make_seq("tacgta")
+        with self.assertRaises(ValueError):
+            cogent3.align.progressive.TreeAlign(
+                dna_model, seqs, tree=tree, show_progress=False, pog_cache=cache
+            )
+
+    def test_progressive_pog_cache_topology(self):
+        """cached sub-alignments are specific to the subtree topology"""
+        orig = {"A": "tacagta", "B": "tacgtc", "C": "tata", "D": "tacgtc"}
+        seqs = {n: DNA.make_seq(s) for n, s in orig.items()}
+        cache = PogCache()
+        for treestring in ("(((A,B),C),D)", "(((A,C),B),D)"):
+            tree = cogent3.make_tree(treestring=treestring)
+            cogent3.align.progressive.TreeAlign(
+                dna_model, seqs, tree=tree, show_progress=False, pog_cache=cache
+            )
+        # the node with tips A, B, C differs between the trees
+        self.assertEqual(len(cache.pogs), 4)
+
+    def test_progressive_pog_cache_pairwise(self):
+        """pairwise estimates are reused when no tree is provided"""
+        orig = {
+            "A": "TGTGGCACAAATGCTCATGCCAGCTCTTTACAGCATGAGAACA",
+            "B": "TGTGGCACAGATACTCATGCCAGCTCATTACAGCATGAGAACAGCAGTTT",
+            "C": "TGTGGCACAAGTACTCATGCCAGCTCAGTACAGCATGAGAACAGCAGTTT",
+            "D": "TGTGGCACAAGTACTCATGCCAGCTCAGTACAGCATGAGAACAGCAGT",
+        }
+        seqs = make_unaligned_seqs(orig, moltype="dna")
+        expect, _ = cogent3.align.progressive.TreeAlign(
+            HKY85(), seqs, show_progress=False
+        )
+        cache = PogCache()
+        got, _ = cogent3.align.progressive.TreeAlign(
+            HKY85(), seqs, show_progress=False, pog_cache=cache
+        )
+        self.assertEqual(got.to_dict(), expect.to_dict())
+        self.assertEqual(
+            got.info["align_params"]["kappa"], expect.info["align_params"]["kappa"]
+        )
+        self.assertEqual(len(cache.pairs), 6)
+        pairs = dict(cache.pairs)
+        # adding a sequence only estimates the pairs it is in
+        orig["E"] = "TGTGGCACAAATGCTCATGCCAGCTCTTTACAGCATGAGAACAGCA"
+        seqs = make_unaligned_seqs(orig, moltype="dna")
+        got, _ = cogent3.align.progressive.TreeAlign(
+            HKY85(), seqs, show_progress=False, pog_cache=cache
+        )
+        self.assertEqual(set(got.names), set(orig))
+        self.assertEqual(len(cache.pairs), 10)
+        for key, ests in pairs.items():
+            self.assertIs(cache.pairs[key], ests)
+
+    def test_alignable_pog_children_weak(self):
+        """sub-alignments are not kept alive by their parent"""
+        orig = {"A": "tacagta", "B": "tacgtc", "C": "tata", "D": "tacgtc"}
+        cache = PogCache()
+        self._make_aln(orig, pog_cache=cache)
+        pogs = list(cache.pogs.values())
+        del cache
+        gc.collect()
+        self.assertTrue(all(pog.get_children() is None for pog in pogs))
+
+    def test_pog_cache_bounded(self):
+        """PogCache discards the least recently used entries"""
+        cache = PogCache(max_pogs=2)
+        cache._size_for(100)
+        self.assertEqual(cache.pogs.max_size, 2)
+        self.assertEqual(cache.pairs.max_size, 4950)
+        pogs = cache.pogs
+        pogs["a"] = 1
+        pogs["b"] = 2
+        self.assertEqual(pogs.get("a"), 1)
+        pogs["c"] = 3
+        self.assertEqual(list(pogs), ["a", "c"])
+        self.assertEqual(pogs.get("b", 0), 0)
+        # pairwise estimates do not displace sub-alignments
+        for i in range(100):
+            cache.pairs[i] = i
+        self.assertEqual(list(pogs), ["a", "c"])
+        # bounds grow with the number of sequences
+        cache = PogCache()
+        cache._size_for(1000)
+        cache._size_for(10)
+        self.assertEqual(cache.pogs.max_size, 2000)
+        self.assertEqual(cache.pairs.max_size, 499500)
+
     def test_TreeAlign_does_pairs(self):
         """test TreeAlign handles pairs of sequences"""
         self._test_aln({"A": "acttgtac", "B": "ac--gtac"})
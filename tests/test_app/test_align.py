@@ -133,6 +133,28 @@ class RefalignmentTests(TestCase):
         got = aligner(seqs)
         self.assertTrue(type(got), NotCompleted)
 
+    def test_progressive_align_incremental(self):
+        """incremental progressive alignment reuses sub-alignments"""
+        expect = align_app.progressive_align(
+            model="nucleotide", guide_tree=self.treestring
+        )(self.seqs)
+        aligner = align_app.progressive_align(
+            model="nucleotide", guide_tree=self.treestring, incremental=True
+        )
+        got = aligner(self.seqs)
+        self.assertEqual(got.to_dict(), expect.to_dict())
+        cache = aligner._kwargs["pog_cache"]
+        self.assertTrue(len(cache.pogs) > 0)
+        got = aligner(self.seqs)
+        self.assertEqual(got.to_dict(), expect.to_dict())
+        # the retained sub-alignments are bounded
+        aligner = align_app.progressive_align(
+            model="nucleotide", guide_tree=self.treestring, incremental=2
+        )
+        got = aligner(self.seqs)
+        self.assertEqual(got.to_dict(), expect.to_dict())
+        self.assertEqual(len(aligner._kwargs["pog_cache"].pogs), 2)
+
     def test_progress_with_guide_tree(self):
         """progressive align works with provided guide tree"""
         tree = make_tree(treestring=self.treestring)
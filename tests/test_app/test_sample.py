@@ -119,9 +119,24 @@ class TranslateTests(TestCase):
         ffold = sample.take_codon_positions(fourfold_degenerate=True)
         got = ffold(aln)
         self.assertEqual(got.to_dict(), expect)
+        # same result from an Alignment, which is preserved as the type
+        aln = aln.to_type(array_align=False)
+        got = ffold(aln)
+        self.assertIsInstance(got, alignment.Alignment)
+        self.assertEqual(got.to_dict(), expect)
         # error if no moltype
         with self.assertRaises(AssertionError):
             _ = sample.take_codon_positions(moltype=None)
+        # no fourfold degenerate positions returns NotCompleted
+        for array_align in (True, False):
+            aln = make_aligned_seqs(
+                data=[("a", "ATGAAA"), ("b", "ATGAAG")],
+                moltype=DNA,
+                array_align=array_align,
+            )
+            got = ffold(aln)
+            self.assertIsInstance(got, NotCompleted)
+            self.assertEqual(got.type, "ERROR")
 
     def test_take_named(self):
         """returns collections containing named seqs"""
@@ -140,6 +140,27 @@ class UPGMATests(TestCase):
             str(tree), "(((a:0.5,b:0.5):1.75,c:2.25):5.875,(d:1.0,e:1.0):7.125);"
         )
 
+    def test_upgma_cluster_stepwise(self):
+        """UPGMA_cluster matches stepwise condensing of the matrix"""
+        large_number = 9999999999
+        rng = numpy.random.RandomState(7)
+        for size in (2, 3, 10, 25):
+            # rounding produces ties
+            matrix = rng.randint(1, 10, size=(size, size)).astype(float)
+            matrix = matrix + matrix.T
+            numpy.fill_diagonal(matrix, large_number)
+            names = ["s%d" % i for i in range(size)]
+
+            node_order = list(map(PhyloNode, names))
+            expect = matrix.copy()
+            for _ in range(size - 1):
+                index = find_smallest_index(expect)
+                condense_node_order(expect, index, node_order)
+                expect = condense_matrix(expect, index, large_number)
+
+            got = UPGMA_cluster(matrix, list(map(PhyloNode, names)), large_number)
+            self.assertEqual(str(got), str(node_order[0]))
+
     def test_UPGMA_cluster_diag(self):
         """UPGMA_cluster works when the diagonal has lowest values"""
         # test that checking the diagonal works
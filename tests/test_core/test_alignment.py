@@ -6,6 +6,7 @@ import re
 import sys
 import unittest
 
+from itertools import combinations
 from os import remove
 from tempfile import TemporaryDirectory, mktemp
 from unittest import TestCase, main
@@ -26,6 +27,7 @@ from cogent3.core.alignment import (
     Alignment,
     ArrayAlignment,
     DataError,
+    GapsOk,
     SequenceCollection,
     _SequenceCollectionBase,
     aln_from_array,
@@ -1896,6 +1898,29 @@ class AlignmentBaseTests(SequenceCollectionBaseTests):
         self.assertEqual(len(got3), len(got1))
         self.assertEqual(got3.to_dict(), got1.to_dict())
 
+    def test_omit_gap_pos_codon(self):
+        """codon gap fractions match those from filtered, remainder dropped"""
+        data = {
+            "seq1": "ATG---AAA-CCTTTNN",
+            "seq2": "ATG-AAAAA-?CTTT-G",
+            "seq3": "ATGA--AAAGGCT?TTA",
+        }
+        aln = self.Class(data, moltype=DNA)
+        for frac in (0, 1 / 9, 0.2, 0.5, 1 - 1e-6):
+            got = aln.omit_gap_pos(frac, motif_length=3)
+            gaps_ok = GapsOk(
+                list("-?"), frac, is_array=self.Class is ArrayAlignment, motif_length=3
+            )
+            if self.Class is ArrayAlignment:
+                gaps_ok.gap_chars = {aln.alphabet.index(c) for c in "-?"}
+            expect = aln.filtered(gaps_ok, motif_length=3)
+            self.assertEqual(got.to_dict(), expect.to_dict())
+            self.assertEqual(len(got) % 3, 0)
+
+        got = aln.no_degenerates(motif_length=3).to_dict()
+        self.assertEqual(got, {"seq1": "ATGAAA", "seq2": "ATGAAA", "seq3": "ATGAAA"})
+        self.assertIsNone(aln[3:6].no_degenerates(motif_length=3))
+
     def test_omit_bad_seqs(self):
         """omit_bad_seqs should return alignment w/o seqs causing most gaps"""
         data = {
@@ -2634,6 +2659,46 @@ class AlignmentBaseTests(SequenceCollectionBaseTests):
         aln = self.Class(data)
         logo = aln.seqlogo()
 
+    def test_window_stats(self):
+        """window_stats matches statistics of individual windows"""
+        data = {"a": "ACGTACGT-A", "b": "ACGAACTTNA", "c": "ACGTTCGT-A"}
+        aln = self.Class(data=data, moltype=DNA)
+        got = aln.window_stats(4, 3)
+        self.assertEqual(
+            got.header, ("start", "gc", "gap_frac", "entropy", "variable", "pdist")
+        )
+        self.assertEqual(got.columns["start"].tolist(), [0, 3, 6])
+        for i, window in enumerate(aln.sliding_windows(4, 3)):
+            seqs = list(window.to_dict().values())
+            chars = "".join(seqs)
+            canonical = [c for c in chars if c in "ACGT"]
+            gc = sum(c in "GC" for c in canonical) / len(canonical)
+            assert_allclose(got[i, "gc"], gc)
+            assert_allclose(got[i, "gap_frac"], chars.count("-") / 12)
+            entropy = numpy.nanmean(window.entropy_per_pos())
+            assert_allclose(got[i, "entropy"], entropy)
+            diffs, pairs = 0, 0
+            for s1, s2 in combinations(seqs, 2):
+                for c1, c2 in zip(s1, s2):
+                    if c1 in "ACGT" and c2 in "ACGT":
+                        pairs += 1
+                        diffs += c1 != c2
+            assert_allclose(got[i, "pdist"], diffs / pairs)
+        self.assertEqual(got.columns["variable"].tolist(), [1, 3, 1])
+        got = aln.window_stats(4, 3, stats=["counts"])
+        self.assertEqual(got.header, ("start", "T", "C", "A", "G"))
+        self.assertEqual(got[0].array.tolist(), [[0, 2, 3, 4, 3]])
+        with self.assertRaises(ValueError):
+            aln.window_stats(4, 3, stats=["nonsense"])
+        # gc is only applicable to nucleic acids
+        aln = self.Class(data={"a": "GCWYAC", "b": "GCWY-C"}, moltype=PROTEIN)
+        got = aln.window_stats(4, 2)
+        self.assertEqual(
+            got.header, ("start", "gap_frac", "entropy", "variable", "pdist")
+        )
+        with self.assertRaises(ValueError):
+            aln.window_stats(4, 2, stats=["gc"])
+
 
 class ArrayAlignmentTests(AlignmentBaseTests, TestCase):
     Class = ArrayAlignment
@@ -2663,6 +2728,37 @@ class ArrayAlignmentTests(AlignmentBaseTests, TestCase):
 class AlignmentTests(AlignmentBaseTests, TestCase):
     Class = Alignment
 
+    def test_aligned_indel_map(self):
+        """Aligned constructed from gapped strings use an IndelMap"""
+        from cogent3.core.location import IndelMap
+
+        data = {"a": "AC--GTAC", "b": "ACGTGTAC", "c": "--GTGT--"}
+        aln = self.Class(data, moltype=DNA)
+        aligned = aln.named_seqs["a"]
+        self.assertIsInstance(aligned._indel_map, IndelMap)
+        self.assertIsNone(aligned._map)
+        sliced = aln[2:7]
+        self.assertEqual(sliced.to_dict(), {n: s[2:7] for n, s in data.items()})
+        self.assertIsInstance(sliced.named_seqs["a"]._indel_map, IndelMap)
+        # slicing retains the connection to the original sequence
+        self.assertEqual(str(sliced.get_seq("a")), "ACGTAC")
+        # and the Map is created on demand
+        self.assertEqual(len(aligned.map), len(data["a"]))
+        self.assertEqual(
+            str(aligned.data.gapped_by_map(aligned.map)), str(aligned.get_gapped_seq())
+        )
+
+    def test_aligned_ordering(self):
+        """Aligned instances are ordered by their gapped sequence"""
+        data = {"a": "AC--GTAC", "b": "ACGTGTAC"}
+        aln = self.Class(data, moltype=DNA)
+        first, second = aln.named_seqs["a"], aln.named_seqs["b"]
+        self.assertTrue(first <= second)
+        self.assertTrue(second >= first)
+        self.assertTrue(second > first)
+        self.assertTrue(first <= first)
+        self.assertFalse(first >= second)
+
     def test_sliced_deepcopy(self):
         """correctly deep copy aligned objects in an alignment"""
 
@@ -3292,6 +3388,104 @@ class ArrayAlignmentSpecificTests(TestCase):
         coevo = aln.coevolution(segments=[(4, 6), (11, 13)], show_progress=False)
         self.assertEqual(coevo.template.names[0], [4, 5, 11, 12])
 
+    def test_get_translation_matches_seqs(self):
+        """translating the array matches translating each sequence"""
+        data = {"a": "ATGNNNRAY---TA", "b": "ATG-TAAAYCCGTA", "c": "?ATGRGCTAGTTAC"}
+        aln = ArrayAlignment(data, moltype=DNA)
+        got = aln.get_translation(incomplete_ok=True)
+        expect = {
+            n: str(s.get_translation(incomplete_ok=True))
+            for n, s in aln.named_seqs.items()
+        }
+        self.assertEqual(got.to_dict(), expect)
+        self.assertEqual(got.names, aln.names)
+        self.assertEqual(got.moltype, PROTEIN)
+        with self.assertRaises(AlphabetError):
+            aln.get_translation()
+        # stop codon
+        aln = ArrayAlignment({"a": "ATGTAA", "b": "ATGATG"}, moltype=DNA)
+        with self.assertRaisesRegex(AlphabetError, "TAA"):
+            aln.get_translation()
+
+    def test_slice_is_view(self):
+        """slicing shares read-only data with the original alignment"""
+        aln = ArrayAlignment({"a": "ACGTACGT", "b": "AC-TACGG"}, moltype=DNA)
+        for got in (aln[2:6], aln[::-1]):
+            self.assertTrue(numpy.shares_memory(got.array_seqs, aln.array_seqs))
+            with self.assertRaises(ValueError):
+                got.array_seqs[0, 0] = 0
+        self.assertEqual(aln[2:6].to_dict(), {"a": "GTAC", "b": "-TAC"})
+        windows = list(aln.sliding_windows(4, 2))
+        self.assertEqual(len(windows), 3)
+        for window in windows:
+            self.assertTrue(numpy.shares_memory(window.array_seqs, aln.array_seqs))
+        # sub-alignments do not share data
+        got = aln.get_sub_alignment(seqs=[1])
+        self.assertFalse(numpy.shares_memory(got.array_seqs, aln.array_seqs))
+        got = aln.get_sub_alignment()
+        self.assertFalse(numpy.shares_memory(got.array_seqs, aln.array_seqs))
+
+    def test_slice_mutate_after_copy(self):
+        """mutating a slice requires a copy, which leaves the original intact"""
+        aln = ArrayAlignment({"a": "ACGTACGT", "b": "AC-TACGG"}, moltype=DNA)
+        sliced = aln[2:6]
+        with self.assertRaisesRegex(ValueError, "read-only"):
+            sliced.array_seqs[0, 0] = 0
+        for got in (sliced.copy(), sliced.get_sub_alignment()):
+            self.assertTrue(got.array_seqs.flags.writeable)
+            got.array_seqs[0, 0] = 0
+            self.assertEqual(str(got.get_seq("a")), "TTAC")
+        self.assertEqual(sliced.to_dict(), {"a": "GTAC", "b": "-TAC"})
+        self.assertEqual(aln.to_dict(), {"a": "ACGTACGT", "b": "AC-TACGG"})
+
+    def test_lazy(self):
+        """lazy selections match the eager equivalents"""
+        data = {
+            "a": "ATG-CANNNGCT-TCAGC",
+            "b": "ATG-CAAAAGCTTT--GC",
+            "c": "ATGCCAA?AGCT-TCAGY",
+            "d": "AT--CAAAAGCTGTCAGC",
+        }
+        aln = ArrayAlignment(data, moltype=DNA, info={"key": "value"})
+        names = ["d", "a", "b"]
+        got = aln.lazy().take_seqs(names).omit_gap_pos(0.3)[:12].no_degenerates()
+        self.assertEqual(got.names, names)
+        got = got.to_alignment()
+        expect = aln.take_seqs(names).omit_gap_pos(0.3)[:12].no_degenerates()
+        self.assertEqual(got.to_dict(), expect.to_dict())
+        self.assertEqual(got.names, names)
+        self.assertEqual(got.info["key"], "value")
+        # codon filters, and negated selections
+        got = aln.lazy().take_seqs("c", negate=True)
+        got = got.no_degenerates(motif_length=3).omit_gap_pos(0, motif_length=3)
+        self.assertEqual(len(got), 3)
+        self.assertEqual(got.array_seqs.shape, (3, 3))
+        expect = aln.take_seqs("c", negate=True).no_degenerates(motif_length=3)
+        expect = expect.omit_gap_pos(0, motif_length=3)
+        self.assertEqual(got.to_alignment().to_dict(), expect.to_dict())
+        # positions
+        got = aln.lazy()[::-1].take_positions([0, 1], negate=True)[2]
+        self.assertEqual(got.to_alignment().to_dict(), aln[13].to_dict())
+        # slices are views, other selections are copies
+        got = aln.lazy()[2:8].to_alignment()
+        self.assertTrue(numpy.shares_memory(got.array_seqs, aln.array_seqs))
+        got = aln.lazy().take_seqs(names).to_alignment()
+        self.assertFalse(numpy.shares_memory(got.array_seqs, aln.array_seqs))
+        # nothing remaining
+        self.assertIsNone(aln.lazy()[3:4].omit_gap_pos(0).to_alignment())
+        with self.assertRaises(KeyError):
+            aln.lazy().take_seqs(["a", "e"])
+
+    def test_rc(self):
+        """reverse complement of array matches that of sequences"""
+        data = {"a": "ATGNNNRAY---TA", "b": "ATG-TAAAYCCGTA"}
+        aln = ArrayAlignment(data, moltype=DNA, info={"key": "value"})
+        got = aln.rc()
+        expect = {n: str(s.rc()) for n, s in aln.named_seqs.items()}
+        self.assertEqual(got.to_dict(), expect)
+        self.assertEqual(got.info["key"], "value")
+        self.assertEqual(got.moltype, DNA)
+
 
 class IntegrationTests(TestCase):
     """Test for integration between regular and model seqs and alns"""
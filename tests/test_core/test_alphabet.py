@@ -10,13 +10,16 @@ from unittest import TestCase, main
 from numpy.testing import assert_equal
 
 from cogent3.core.alphabet import (
+    AlphabetError,
     CharAlphabet,
     Enumeration,
     JointEnumeration,
     _make_complement_array,
     _make_translation_tables,
     array,
+    bytes_to_indices,
     get_array_type,
+    get_char_index_table,
     uint8,
     uint16,
     uint32,
@@ -60,6 +63,19 @@ class translation_table_tests(TestCase):
         result = "".join([RNA.alphabet[i] for i in complements])
         self.assertEqual(result, "AGUC")
 
+    def test_get_char_index_table(self):
+        """byte lookup tables are cached and respect the case policy"""
+        table = get_char_index_table(RNA.alphabet)
+        self.assertIs(table, get_char_index_table(RNA.alphabet))
+        self.assertEqual(table.dtype, uint8)
+        self.assertFalse(table.flags.writeable)
+        assert_equal(bytes_to_indices("UCAGu-", table), [0, 1, 2, 3, 255, 255])
+        table = get_char_index_table(RNA.alphabet, invalid=-9, ignore_case=True)
+        assert_equal(bytes_to_indices(b"UCAGu-", table), [0, 1, 2, 3, 0, -9])
+        # invalid of None leaves bytes not in the alphabet unchanged
+        table = get_char_index_table(RNA.alphabet, invalid=None)
+        assert_equal(bytes_to_indices("UCAGu-", table), [0, 1, 2, 3, 117, 45])
+
 
 class get_array_type_tests(TestCase):
     """Tests of the get_array_type top-level function."""
@@ -237,6 +253,29 @@ class CharAlphabetTests(TestCase):
         """CharAlphabet from_string should return correct array"""
         r = CharAlphabet("UCAG")
         assert_equal(r.from_string("UUCUGA"), array([0, 0, 1, 0, 3, 2], "B"))
+        # characters not in the alphabet are unchanged
+        assert_equal(r.from_string("UxA"), array([0, 120, 2], "B"))
+        assert_equal(r.from_array(array(list("UxA"), "c")), array([0, 120, 2], "B"))
+
+    def test_to_index_array(self):
+        """CharAlphabet to_index_array should return uint8 array"""
+        r = CharAlphabet("UCAG")
+        got = r.to_index_array("UUCUGA")
+        assert_equal(got, array([0, 0, 1, 0, 3, 2], "B"))
+        self.assertEqual(got.dtype, uint8)
+        self.assertEqual(r.to_indices("UUCUGA"), [0, 0, 1, 0, 3, 2])
+        with self.assertRaises(KeyError):
+            r.to_index_array("UUT")
+
+    def test_get_matched_array(self):
+        """CharAlphabet get_matched_array resolves ambiguities"""
+        got = RNA.alphabet.get_matched_array(["Y", "A", "?", "Y", "U"])
+        assert_equal(
+            got,
+            [[1, 1, 0, 0], [0, 0, 1, 0], [1, 1, 1, 1], [1, 1, 0, 0], [1, 0, 0, 0]],
+        )
+        with self.assertRaises(AlphabetError):
+            RNA.alphabet.get_matched_array(["Y", "X"])
 
     def test_is_valid(self):
         """CharAlphabet is_valid should return True for valid sequence"""
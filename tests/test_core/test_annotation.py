@@ -219,6 +219,54 @@ class TestAnnotations(unittest.TestCase):
                     observed,
                 )
 
+    def test_annotations_in_region(self):
+        """region queries match a linear scan of annotations"""
+        import random
+
+        random.seed(7)
+        seq = DNA.make_seq("ACGT" * 250, name="x")
+        for i in range(200):
+            start = random.randint(0, 990)
+            end = min(start + random.choice([1, 5, 50, 500]), 1000)
+            seq.add_feature(random.choice(["gene", "exon"]), f"f{i}", [(start, end)])
+
+        for start, end in [(0, 10), (100, 400), (995, 1000), (500, 501)]:
+            for annot_type in ("*", "gene", "ex*"):
+                got = seq.get_annotations_matching(annot_type, start=start, end=end)
+                expect = [
+                    a
+                    for a in seq.get_annotations_matching(annot_type)
+                    if a.map.start < end and a.map.end > start
+                ]
+                self.assertEqual(got, expect)
+
+        got = seq.get_annotations_matching("gene", name="f1*", start=0, end=1000)
+        self.assertTrue(all(a.type == "gene" and a.name.startswith("f1") for a in got))
+        # index updated when annotations added
+        new = seq.add_feature("repeat", "r", [(2, 4)])
+        self.assertEqual(seq.get_annotations_matching("repeat", start=0, end=3), [new])
+        seq.detach_annotations([new])
+        self.assertEqual(seq.get_annotations_matching("repeat", start=0, end=3), [])
+        # slicing uses the index
+        sub = seq[100:400]
+        self.assertEqual(
+            len(sub.annotations),
+            len(seq.get_annotations_matching("*", start=100, end=400)),
+        )
+
+    def test_annotations_in_region_replaced(self):
+        """region queries reflect annotations replaced in place"""
+        seq = DNA.make_seq("ACGT" * 25, name="x")
+        seq.add_feature("gene", "a", [(0, 10)])
+        seq.add_feature("gene", "b", [(20, 30)])
+        self.assertEqual(len(seq.get_annotations_matching("gene", start=50)), 0)
+        # same list, same length, different annotation
+        seq.annotations[0] = Feature(seq, "gene", "c", [(60, 70)])
+        got = seq.get_annotations_matching("gene", start=50)
+        self.assertEqual([a.name for a in got], ["c"])
+        got = seq.get_annotations_matching("gene", start=0, end=10)
+        self.assertEqual(got, [])
+
 
 class TestMapSpans(unittest.TestCase):
     """Test attributes of Map & Spans classes critical to annotation
@@ -105,6 +105,26 @@ class TestConstructorFunctions(unittest.TestCase):
         self.assertTrue("Human" in got.to_dict())
         self.assertEqual(got.info["source"], path)
 
+    def test_load_unaligned_seqs_lazy(self):
+        """lazy loading of unaligned from a FASTA file"""
+        path = os.path.join(data_path, "brca1.fasta")
+        expect = load_unaligned_seqs(path, moltype="dna")
+        with TemporaryDirectory(dir=".") as dirname:
+            new_path = os.path.join(dirname, "brca1.fasta")
+            with open(new_path, "w") as out:
+                out.write(expect.to_fasta())
+            got = load_unaligned_seqs(new_path, moltype="dna", lazy=True)
+            self.assertEqual(got.names, expect.names)
+            self.assertEqual(str(got.get_seq("Human")), str(expect.named_seqs["Human"]))
+            got.close()
+        with self.assertRaises(ValueError):
+            load_unaligned_seqs(path + ".gz", lazy=True)
+        # arguments that cannot be applied lazily are not ignored
+        with self.assertRaises(ValueError):
+            load_unaligned_seqs(path, lazy=True, label_to_name=str.upper)
+        with self.assertRaises(ValueError):
+            load_unaligned_seqs(path, lazy=True, info={"a": 1})
+
     def test_load_unaligned_seqs_no_format(self):
         """test loading unaligned from file"""
         with self.assertRaises(ValueError):
@@ -123,6 +143,17 @@ class TestConstructorFunctions(unittest.TestCase):
         self.assertEqual(got.moltype.label, "dna")
         self.assertIsInstance(got, Alignment)
 
+    def test_load_aligned_seqs_lowercase(self):
+        """lower case FASTA sequences are loaded as upper case"""
+        path = os.path.join(data_path, "c_elegans_WS199_dna_shortened.fasta")
+        info = {"key": "value"}
+        for moltype in (None, "dna", "text"):
+            got = load_aligned_seqs(path, moltype=moltype, info=info)
+            self.assertTrue(str(got.seqs[0]).startswith("GCCTAAGC"))
+            self.assertEqual(got.info["source"], path)
+        # the callers info is not modified
+        self.assertEqual(info, {"key": "value"})
+
     def test_load_aligned_seqs_no_format(self):
         """test loading unaligned from file"""
         with self.assertRaises(ValueError):
@@ -868,6 +899,15 @@ class SequenceTestMethods(unittest.TestCase):
         with self.assertRaises(AlphabetError):
             _ = seq.get_translation(incomplete_ok=False)
 
+    def test_translate_errors(self):
+        """translation errors identify the offending codon"""
+        seq = make_seq("ATGTAAATG", moltype=DNA)
+        with self.assertRaisesRegex(AlphabetError, "TAA"):
+            _ = seq.get_translation()
+        seq = make_seq("ATG-CA", moltype=DNA)
+        with self.assertRaisesRegex(AlphabetError, "-CA"):
+            _ = seq.get_translation()
+
     def test_slidingWindows(self):
         """test sliding window along sequences"""
         result = []
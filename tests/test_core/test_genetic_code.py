@@ -3,6 +3,8 @@
 """
 from unittest import TestCase, main
 
+import numpy
+
 from cogent3 import DNA, RNA
 from cogent3.core.genetic_code import (
     DEFAULT,
@@ -12,7 +14,9 @@ from cogent3.core.genetic_code import (
     InvalidCodonError,
     available_codes,
     get_code,
+    to_codon_indices,
 )
+from cogent3.core.moltype import PROTEIN_WITH_STOP
 
 
 __author__ = "Greg Caporaso"
@@ -321,6 +325,13 @@ class GeneticCodeTests(TestCase):
             sgc.sixframes(test_rna), ["MLT*", "C*HK", "ANI", "FMLA", "LC*H", "YVS"]
         )
 
+        # codons with non-canonical characters are X
+        test_dna = DNA.make_seq("ATGNTA-CA")
+        self.assertEqual(
+            sgc.sixframes(test_dna), ["MXX", "XX", "XX", "XXH", "XX", "XX"]
+        )
+        self.assertEqual(sgc.sixframes(""), [""] * 6)
+
     def test_stop_indexes(self):
         """should return stop codon indexes for a specified frame"""
         sgc = GeneticCode(self.SGC)
@@ -329,6 +340,48 @@ class GeneticCodeTests(TestCase):
         for frame, expect in enumerate(expected):
             got = sgc.get_stop_indices(seq, start=frame)
             self.assertEqual(got, expect)
+        # case insensitive and RNA stops are recognised
+        for seq in ("atgctaacataaa", "AUGCUAACAUAAA"):
+            for frame, expect in enumerate(expected):
+                self.assertEqual(sgc.get_stop_indices(seq, start=frame), expect)
+
+    def test_to_codon_indices(self):
+        """codon indices from strings or alphabet index arrays"""
+        self.assertEqual(to_codon_indices("TTTGGGAUGNT").tolist(), [0, 63, 35])
+        alphabet = DNA.alphabets.degen_gapped
+        seqs = numpy.array([alphabet.to_indices(s) for s in ("ATG", "A-G")])
+        got = to_codon_indices(seqs, alphabet)
+        self.assertEqual(got.tolist(), [[35], [64]])
+
+    def test_compiled_arrays(self):
+        """stop and fourfold degenerate masks match codons"""
+        sgc = GeneticCode(self.SGC)
+        codons = sgc._codons
+        stops = [c for c, is_stop in zip(codons, sgc.stop_mask) if is_stop]
+        self.assertEqual(set(stops), set(sgc["*"]))
+        ffold = [c for c, ff in zip(codons, sgc.fourfold_degenerate_mask) if ff]
+        self.assertEqual(len(ffold), 32)
+        self.assertTrue(set(sgc["A"]) <= set(ffold))
+        self.assertFalse(set(sgc["C"]) & set(ffold))
+        # translating codon indices
+        codons = to_codon_indices("ATGTAAGCTNNN")
+        aa = PROTEIN_WITH_STOP.alphabets.degen_gapped.to_string(
+            sgc.translate_codon_indices(codons)
+        )
+        self.assertEqual(aa, "M*AX")
+        got = sgc.get_stop_mask(codons)
+        self.assertEqual(got.tolist(), [False, True, False, False])
+
+    def test_get_longest_orfs(self):
+        """longest stretch of codons without stops"""
+        sgc = GeneticCode(self.SGC)
+        codons = to_codon_indices("ATGTAAATGATGATGTAGCCC")
+        self.assertEqual(sgc.get_longest_orfs(codons).tolist(), [2, 5])
+        codons = to_codon_indices(
+            numpy.array([[0, 2, 2, 0, 2, 2], [0, 0, 0, 0, 2, 2], [0, 0, 0, 1, 1, 1]])
+        )
+        got = sgc.get_longest_orfs(codons)
+        self.assertEqual(got.tolist(), [[0, 0], [0, 1], [0, 2]])
 
     def test_Synonyms(self):
         """GeneticCode synonyms should return aa -> codon set mapping."""
@@ -3,8 +3,12 @@
 """Unit tests for Range, Span and Point classes.
 """
 from unittest import TestCase, main
+from unittest.mock import patch
 
-from cogent3.core.location import Map, Range, RangeFromString, Span
+from numpy.testing import assert_equal
+
+from cogent3 import DNA
+from cogent3.core.location import IndelMap, Map, Range, RangeFromString, Span
 
 
 __author__ = "Rob Knight"
@@ -529,6 +533,128 @@ class MapTests(TestCase):
         self.assertEqual(coords, spans)
 
 
+def _positions(map):
+    """parent position for each position of map, None for gaps"""
+    result = []
+    for span in map.spans:
+        result.extend(
+            [None] * span.length if span.lost else range(span.start, span.end)
+        )
+    return result
+
+
+class IndelMapTests(TestCase):
+    """tests of the array based IndelMap class"""
+
+    def test_from_gapped_seq(self):
+        """correctly identifies gap positions and lengths"""
+        indel_map, ungapped = IndelMap.from_gapped_seq("--AC-GT---A-")
+        self.assertEqual(ungapped, "ACGTA")
+        assert_equal(indel_map.gap_pos, [0, 2, 4, 5])
+        assert_equal(indel_map.gap_lengths, [2, 1, 3, 1])
+        self.assertEqual(len(indel_map), 12)
+        self.assertEqual(indel_map.num_gaps, 7)
+        indel_map, ungapped = IndelMap.from_gapped_seq("ACGT")
+        self.assertEqual(ungapped, "ACGT")
+        self.assertTrue(indel_map.complete)
+        self.assertEqual(len(indel_map), 4)
+
+    def test_map_roundtrip(self):
+        """conversion to and from Map is lossless"""
+        for seq in ("--AC-GT---A-", "ACGT", "AC--GT", "----"):
+            indel_map, _ = IndelMap.from_gapped_seq(seq)
+            map = indel_map.to_map()
+            self.assertEqual(len(map), len(indel_map))
+            self.assertEqual(IndelMap.from_map(map), indel_map)
+
+        with self.assertRaises(ValueError):
+            IndelMap.from_map(Map([(0, 3), (5, 8)], parent_length=10))
+        with self.assertRaises(ValueError):
+            IndelMap.from_map(Map([(3, 0)], parent_length=10))
+
+    def test_getitem(self):
+        """slicing matches slicing a Map"""
+        gapped = "--AC-GT---A-"
+        indel_map, ungapped = IndelMap.from_gapped_seq(gapped)
+        map = indel_map.to_map()
+        seq = DNA.make_seq(ungapped)
+        for start in range(len(gapped)):
+            for end in range(start + 1, len(gapped) + 1):
+                got = indel_map[start:end]
+                self.assertEqual(len(got), end - start)
+                self.assertEqual(str(seq.gapped_by_map(got)), gapped[start:end])
+                expect = seq.gapped_by_map(map[start:end])
+                self.assertEqual(str(seq.gapped_by_map(got.to_map())), str(expect))
+
+    def test_add(self):
+        """adjacent segments concatenate"""
+        indel_map, _ = IndelMap.from_gapped_seq("--AC-GT---A-")
+        for i in range(1, len(indel_map)):
+            self.assertEqual(indel_map[:i] + indel_map[i:], indel_map)
+
+    def test_coordinate_conversion(self):
+        """correctly converts between sequence and alignment coordinates"""
+        indel_map, _ = IndelMap.from_gapped_seq("--AC-GT---A-")
+        assert_equal(indel_map.get_align_index([0, 1, 2, 3, 4]), [2, 3, 5, 6, 10])
+        assert_equal(
+            indel_map.get_seq_index([0, 2, 4, 5, 7, 10, 11]), [0, 0, 2, 2, 4, 4, 5]
+        )
+
+    def test_getitem_step(self):
+        """slicing with a step other than 1 returns the equivalent Map"""
+        seq = "--AC-GT---A-"
+        indel_map, _ = IndelMap.from_gapped_seq(seq)
+        for index in (slice(None, None, 2), slice(1, 9, 3), slice(None, None, -1)):
+            expect = indel_map.to_map()[list(range(len(seq)))[index]]
+            fresh, _ = IndelMap.from_gapped_seq(seq)
+            with patch.object(IndelMap, "to_map", side_effect=AssertionError):
+                got = fresh[index]
+            self.assertIsInstance(got, Map)
+            self.assertEqual(repr(got), repr(expect))
+            self.assertEqual(
+                [span.lost for span in got.spans],
+                [c == "-" for c in seq[index]],
+            )
+
+    def test_add_inverse_without_map(self):
+        """composition and inversion match Map without creating one"""
+        for seq in ("--AC-GT---A-", "ACGT", "---", "A-C", "-A-"):
+            indel_map, _ = IndelMap.from_gapped_seq(seq)
+            length = len(seq)
+            cases = [indel_map, indel_map[1:length], indel_map[0 : length - 1]]
+            for m in cases:
+                expect = m.to_map().inverse()
+                fresh = IndelMap(
+                    m.gap_pos, m.gap_lengths, m.start, m.end, m.parent_length
+                )
+                with patch.object(IndelMap, "to_map", side_effect=AssertionError):
+                    got = fresh.inverse()
+                self.assertEqual(repr(got), repr(expect))
+                self.assertEqual(len(got), len(expect))
+
+            for mid in range(length):
+                first, second = indel_map[:mid], indel_map[mid + 1 :]
+                first_map = first.to_map()
+                expect = first_map + second.to_map()
+                first = IndelMap(
+                    first.gap_pos,
+                    first.gap_lengths,
+                    first.start,
+                    first.end,
+                    first.parent_length,
+                )
+                with patch.object(IndelMap, "to_map", side_effect=AssertionError):
+                    got = first + second
+                    with_map = first + expect
+                if isinstance(got, IndelMap):
+                    # adjacent segments, so spans are merged
+                    got = got.to_map()
+                    self.assertEqual(_positions(got), _positions(expect))
+                else:
+                    self.assertEqual(repr(got), repr(expect))
+                self.assertEqual(repr(with_map), repr(first_map + expect))
+
+
 # run the following if invoked from command-line
 if __name__ == "__main__":
     main()
@@ -6,9 +6,12 @@ import json
 import os
 import re
 
-from pickle import dumps
+from gc import get_referents
+from pickle import dumps, loads
 from unittest import TestCase, main
 
+import numpy
+
 from numpy import array
 from numpy.testing import assert_allclose, assert_equal
 
@@ -31,8 +34,10 @@ from cogent3.core.sequence import (
     ArrayRnaCodonSequence,
     ArrayRnaSequence,
     ArraySequence,
+    ByteSequence,
     DnaSequence,
     ProteinSequence,
+    ProteinWithStopSequence,
     RnaSequence,
     Sequence,
 )
@@ -248,6 +253,33 @@ class SequenceTests(TestCase):
         # 13 features with one having 2 parents, so 14 instances should be found
         self.assertEqual(len(matches), 14)
 
+        # same result from pre-parsed records
+        from cogent3.parse.gff import gff_records
+
+        records = gff_records(gff3_path)
+        sequence = Sequence(seq)
+        sequence.annotate_from_gff(records)
+        got = sequence.get_annotations_matching("*", extend_query=True)
+        self.assertEqual(
+            sorted((m.type, m.name) for m in got),
+            sorted((m.type, m.name) for m in matches),
+        )
+
+    def test_annotate_from_gff_deep(self):
+        """annotate_from_gff handles deeply nested features"""
+        depth = 2000
+        lines = ["##gff-version 3\n", "s\t.\tgene\t1\t10\t.\t+\t.\tID=f0\n"]
+        for i in range(1, depth):
+            lines.append(f"s\t.\tpart\t1\t10\t.\t+\t.\tID=f{i};Parent=f{i - 1}\n")
+        sequence = Sequence("ACGT" * 10)
+        # children listed before parents
+        sequence.annotate_from_gff(lines[:1] + lines[:0:-1], pre_parsed=False)
+        annot = sequence.annotations[0]
+        for i in range(1, depth):
+            self.assertEqual(len(annot.annotations), 1)
+            annot = annot.annotations[0]
+            self.assertEqual(annot.name, f"f{i}")
+
     def test_strip_degenerate(self):
         """Sequence strip_degenerate should remove any degenerate bases"""
         self.assertEqual(self.RNA("UCAG-").strip_degenerate(), "UCAG-")
@@ -1009,6 +1041,65 @@ class SequenceSubclassTests(TestCase):
         self.assertRaises(AlphabetError, x.__add__, "z")
         self.assertEqual(DnaSequence("TTTAc").rc(), "GTAAA")
 
+    def test_compact(self):
+        """no instance dict unless required, info is created on demand"""
+        for cls in (
+            Sequence,
+            DnaSequence,
+            RnaSequence,
+            ProteinSequence,
+            ProteinWithStopSequence,
+            ByteSequence,
+        ):
+            seq = cls("ACG", name="x")
+            self.assertFalse(any(isinstance(r, dict) for r in get_referents(seq)))
+            seq.label = "y"
+            self.assertEqual(seq.label, "y")
+
+        x = DnaSequence("ACGGTA", name="x")
+        self.assertIsNone(x._info)
+        # constructing from a sequence does not create info
+        self.assertIsNone(DnaSequence(x)._info)
+        self.assertIsNone(x._info)
+        self.assertEqual(x.info, {"Refs": {}})
+        x.info["key"] = "value"
+        self.assertEqual(x.rc().info["key"], "value")
+        self.assertEqual(DnaSequence(x).info["key"], "value")
+        y = loads(dumps(x))
+        self.assertEqual((y.name, str(y), y.info["key"]), ("x", "ACGGTA", "value"))
+        x.add_feature("gene", "a", [(0, 3)])
+        y = loads(dumps(x))
+        self.assertEqual(str(y.get_annotations_matching("gene")[0].get_slice()), "ACG")
+
+    def test_derived_share_info(self):
+        """derived sequences share info with the original"""
+        s = DnaSequence("ACGGTA", name="x")
+        derived = [s[1:4], s.rc(), s.complement(), s.degap(), s[1:4].rc()]
+        s.info["key"] = "value"
+        for d in derived[:-1]:
+            self.assertIs(d.info, s.info)
+        # the slice of a slice shares with the slice
+        self.assertEqual(derived[-1].info["key"], "value")
+
+    def test_repr_policy_shared(self):
+        """the shared default repr policy cannot be modified"""
+        x = DnaSequence("ACGGTA", name="x")
+        with self.assertRaises(TypeError):
+            x._repr_policy["num_pos"] = 2
+        self.assertEqual(DnaSequence("A")._repr_policy["num_pos"], 60)
+        # slicing copies a custom policy
+        x._repr_policy = dict(num_pos=2)
+        y = x[1:4]
+        self.assertEqual(y._repr_policy, {"num_pos": 2})
+        self.assertIsNot(y._repr_policy, x._repr_policy)
+        self.assertEqual(DnaSequence("A")._repr_policy["num_pos"], 60)
+
+    def test_ordering(self):
+        """sequences support all rich comparisons"""
+        x, y = DnaSequence("AC"), DnaSequence("AG")
+        self.assertTrue(x < y and x <= y and y > x and y >= x)
+        self.assertTrue(x <= DnaSequence("AC") and x >= DnaSequence("AC"))
+
 
 # TODO move methods of this class onto the single class that inherits from it!
 class ModelSequenceTests(object):
@@ -1225,6 +1316,28 @@ class ModelSequenceTests(SequenceTests):
         c = seq.counts(allow_gap=True)
         self.assertEqual(c.to_dict(), {"a": 3, "b": 1, "-": 1})
 
+    def test_slice_is_view(self):
+        """slices share read-only data with the original"""
+        r = self.DNA("ACGTACGTAC")
+        got = r[2:6]
+        self.assertEqual(str(got), "GTAC")
+        self.assertTrue(numpy.shares_memory(got._data, r._data))
+        with self.assertRaises(ValueError):
+            got._data[0] = 0
+        copied = got.copy()
+        self.assertTrue(copied._data.flags.writeable)
+        copied._data[0] = 0
+        self.assertEqual(str(copied), "TTAC")
+        self.assertEqual(str(got), "GTAC")
+        self.assertEqual(str(r), "ACGTACGTAC")
+
+    def test_sliding_windows(self):
+        """sliding_windows yields views of the sequence"""
+        r = self.DNA("ACGTACGTAC")
+        got = list(r.sliding_windows(4, 3))
+        self.assertEqual([str(w) for w in got], ["ACGT", "TACG", "GTAC"])
+        self.assertTrue(all(numpy.shares_memory(w._data, r._data) for w in got))
+
 
 # run if called from command-line
 if __name__ == "__main__":
@@ -3,6 +3,7 @@
 """
 import json
 import os
+import pickle
 import sys
 import unittest
 
@@ -10,11 +11,14 @@ from copy import copy, deepcopy
 from tempfile import TemporaryDirectory
 from unittest import TestCase, main
 
+import numpy
+
 from numpy import arange, array
 
-from cogent3 import load_tree, make_tree
-from cogent3.core.tree import PhyloNode, TreeError, TreeNode
+from cogent3 import load_tree, load_trees, make_tree
+from cogent3.core.tree import ArrayTree, PhyloNode, TreeError, TreeNode
 from cogent3.maths.stats.test import correlation
+from cogent3.parse.newick import TreeParseError
 from cogent3.parse.tree import DndParser
 from cogent3.util.misc import get_object_provenance, open_
 
@@ -73,6 +77,40 @@ class TreeTests(TestCase):
         self.assertEqual(str(t), result_str)
         self.assertEqual(t.get_newick(with_distances=True), result_str)
 
+    def test_make_tree_quoted(self):
+        """quoted labels and comments give the same tree as plain newick"""
+        plain = make_tree("((a:1,b:2)ab:3,c,(d,e)):0.5;")
+        quoted = make_tree("(('a':1,b[x]:2)'ab':3,\"c\",(d,e)):0.5;")
+        self.assertEqual(str(quoted), str(plain))
+        self.assertEqual(quoted.get_node_names(), plain.get_node_names())
+        with self.assertRaises(TreeParseError):
+            make_tree("((a,b),c:1:2);")
+        with self.assertRaises(TreeParseError):
+            make_tree("((a,b):x,c);")
+        with self.assertRaises(TreeParseError):
+            make_tree("((a,b),c;")
+
+    def test_load_trees(self):
+        """load_trees generates each tree in a file"""
+        treestrings = ["((a,b),c);", "(a,(b,c)bc:0.2)x;", "((a:0.1,'b c'),c);"]
+        with TemporaryDirectory(dir=".") as dirname:
+            path = os.path.join(dirname, "trees.tre")
+            with open(path, "w") as out:
+                out.write("%s\n%s %s\n" % tuple(treestrings))
+            got = list(load_trees(path))
+            self.assertEqual(len(got), 3)
+            for tree, treestring in zip(got, treestrings):
+                self.assertEqual(str(tree), str(make_tree(treestring)))
+                self.assertEqual(
+                    tree.get_node_names(), make_tree(treestring).get_node_names()
+                )
+            with open(path, "w") as out:
+                out.write("((a,b),c);\n((a,b),c:1:2);\n")
+            got = load_trees(path)
+            self.assertEqual(str(next(got)), "((a,b),c);")
+            with self.assertRaises(TreeParseError):
+                next(got)
+
 
 def _new_child(old_node, constructor):
     """Returns new_node which has old_node as its parent."""
@@ -1092,6 +1130,24 @@ class TreeNodeTests(TestCase):
 
         u = TreeNode("a", children=[t])
 
+    def test_last_common_ancestor_modified(self):
+        """last_common_ancestor reflects changes to the tree"""
+        tree = DndParser("((a,(b,c)d)e,f,(g,h)i)j;")
+        nodes = {n.name: n for n in tree.preorder()}
+        self.assertIs(nodes["b"].last_common_ancestor(nodes["g"]), tree)
+        # move the clade of g and h into d
+        nodes["d"].append(nodes["i"])
+        self.assertIs(nodes["b"].last_common_ancestor(nodes["g"]), nodes["d"])
+        self.assertIs(nodes["g"].last_common_ancestor(nodes["f"]), tree)
+        # a detached clade no longer shares an ancestor with the tree
+        nodes["d"].remove_node(nodes["i"])
+        self.assertIsNone(nodes["b"].last_common_ancestor(nodes["g"]))
+        self.assertIs(nodes["h"].last_common_ancestor(nodes["g"]), nodes["i"])
+        # copies do not share the index of the original
+        copied = pickle.loads(pickle.dumps(tree))
+        a, c = copied.get_node_matching_name("a"), copied.get_node_matching_name("c")
+        self.assertIs(a.last_common_ancestor(c), copied.get_node_matching_name("e"))
+
     def test_separation(self):
         """TreeNode separation should return correct number of edges"""
         nodes, tree = self.TreeNode, self.TreeRoot
@@ -1470,6 +1526,26 @@ class PhyloNodeTests(TestCase):
         assert_equal(obs[0], exp[0])
         assert_equal(obs[1], exp[1])
 
+        with self.assertRaises(TreeError):
+            self.t.tip_to_tip_distances(endpoints=["H", "missing"])
+
+    def test_get_distance_matrix(self):
+        """returns a DistanceMatrix consistent with get_distances"""
+        from cogent3.evolve.fast_distance import DistanceMatrix
+
+        names = ["H", "G", "M"]
+        dmat = self.t.get_distance_matrix(endpoints=names)
+        self.assertIsInstance(dmat, DistanceMatrix)
+        self.assertEqual(list(dmat.names), names)
+        assert_equal(dmat.array, array([[0, 2.0, 6.7], [2.0, 0, 6.7], [6.7, 6.7, 0.0]]))
+        dmat = self.t.get_distance_matrix()
+        self.assertEqual(list(dmat.names), self.t.get_tip_names())
+        dists = self.t.get_distances()
+        for (a, b), dist in dmat.to_dict().items():
+            self.assertAlmostEqual(dist, dists[a, b])
+        # exactly symmetric
+        assert_equal(dmat.array, dmat.array.T)
+
     def test_prune(self):
         """prune should reconstruct correct topology and Lengths of tree."""
         tree = DndParser("((a:3,((c:1):1):1):2);", constructor=PhyloNode)
@@ -1795,6 +1871,17 @@ class TreeInterfaceForLikelihoodFunction(TestCase):
         self.assertEqual(tree.get_connecting_node("A", "B").name, "ab")
         self.assertEqual(tree.get_connecting_node("A", "C").name, "root")
 
+    def test_get_connecting_nodes(self):
+        """batch of connecting nodes matches get_connecting_node"""
+        tree = self.default_tree
+        pairs = [("A", "B"), ("A", "C"), ("D", "E"), ("cd", "D"), ("E", "E")]
+        got = tree.get_connecting_nodes(pairs)
+        self.assertEqual([n.name for n in got], ["ab", "root", "cde", "cd", "E"])
+        for node, (name1, name2) in zip(got, pairs):
+            self.assertIs(node, tree.get_connecting_node(name1, name2))
+        with self.assertRaises(TreeError):
+            tree.get_connecting_nodes([("A", "missing")])
+
     def test_get_connecting_edges(self):
         """correctly identify connecting edges"""
         tree = make_tree(treestring="(((Human,HowlerMon)a,Mouse)b,NineBande,DogFaced);")
@@ -2242,6 +2329,141 @@ class BigTreeSingleTests(TestTree):
         self.assertEqual(len(tips), 55)
 
 
+class ArrayTreeTests(TestCase):
+    """ArrayTree results match those of PhyloNode"""
+
+    newick = (
+        "(((a:0.1,b:0.2)ab:0.3,(c:0.4,(d:0.5,e)de:0.6)cde:0.7)abcde:0.8,"
+        "f:0.9,(g:1.0,h:1.1,i:1.2)ghi:1.3)root;"
+    )
+
+    def setUp(self):
+        self.tree = make_tree(self.newick)
+        self.array_tree = ArrayTree.from_tree(self.tree)
+
+    def test_construction(self):
+        """preorder arrays and round trip to PhyloNode"""
+        at = self.array_tree
+        self.assertEqual(len(at), 15)
+        self.assertEqual(at.names[0], "root")
+        self.assertEqual(at.parents[:4].tolist(), [-1, 0, 1, 2])
+        self.assertEqual(at.sizes[:4].tolist(), [15, 9, 3, 1])
+        self.assertEqual(at.levels[:4].tolist(), [0, 1, 2, 3])
+        self.assertTrue(numpy.isnan(at.lengths[at.get_node_index("e")]))
+        postorder = [n.name for n in self.tree.postorder()]
+        self.assertEqual(at.names[at.postorder].tolist(), postorder)
+        got = at.to_tree()
+        self.assertIsInstance(got, PhyloNode)
+        self.assertEqual(str(got), str(self.tree))
+        self.assertEqual(str(at), str(self.tree))
+        with self.assertRaises(TreeError):
+            ArrayTree(["a", "b", "c"], [-1, 2, 0])
+        with self.assertRaises(TreeError):
+            at.get_node_index("missing")
+
+    def test_from_newick(self):
+        """directly parsed ArrayTree matches that from make_tree"""
+        for newick in (self.newick, "((a,b),(c,d));", "(a,a,(,)x);"):
+            got = ArrayTree.from_newick(newick)
+            expect = ArrayTree.from_tree(make_tree(newick))
+            self.assertEqual(got.names.tolist(), expect.names.tolist())
+            assert_equal(got.parents, expect.parents)
+            assert_equal(got.lengths, expect.lengths)
+            assert_equal(got.name_loaded, expect.name_loaded)
+
+    def test_round_trip_newick(self):
+        """generated names are not written by get_newick after a round trip"""
+        for newick in (self.newick, "((a,b),(c,d));", "((a:1,b:2)x:3,c:4);"):
+            tree = make_tree(newick)
+            for at in (ArrayTree.from_tree(tree), ArrayTree.from_newick(newick)):
+                got = at.to_tree()
+                self.assertEqual(got.get_newick(), tree.get_newick())
+                self.assertEqual(
+                    got.get_newick(with_distances=True),
+                    tree.get_newick(with_distances=True),
+                )
+                self.assertEqual(
+                    at.get_sub_tree(["a", "b", "c"]).to_tree().get_newick(),
+                    tree.get_sub_tree(["a", "b", "c"]).get_newick(),
+                )
+
+    def test_names(self):
+        """tip and node names in preorder"""
+        at = self.array_tree
+        self.assertEqual(at.get_tip_names(), self.tree.get_tip_names())
+        self.assertEqual(at.get_node_names(), self.tree.get_node_names())
+        self.assertEqual(
+            at.get_node_names(includeself=False),
+            self.tree.get_node_names(includeself=False),
+        )
+
+    def test_distances(self):
+        """tip to tip distances match PhyloNode"""
+        at = self.array_tree
+        expect = self.tree.get_distances()
+        got = at.get_distances()
+        self.assertEqual(got.keys(), expect.keys())
+        for key in expect:
+            assert_allclose(got[key], expect[key])
+        endpoints = ["h", "a", "e", "f"]
+        expect = self.tree.tip_to_tip_distances(endpoints=endpoints)[0]
+        got, names = at.tip_to_tip_distances(endpoints=endpoints)
+        self.assertEqual(names, endpoints)
+        assert_allclose(got, expect)
+        with self.assertRaises(TreeError):
+            at.tip_to_tip_distances(endpoints=["a", "ab"])
+
+    def test_lowest_common_ancestor(self):
+        """names of lowest common ancestors match PhyloNode"""
+        at = self.array_tree
+        for names in (["a", "b"], ["a", "e"], ["d"], ["a", "g"], ["g", "i"]):
+            expect = self.tree.lowest_common_ancestor(names).name
+            self.assertEqual(at.lowest_common_ancestor(names), expect)
+        self.assertIsNone(at.lowest_common_ancestor(["missing"]))
+        # arrays of node indices give the same result as single pairs
+        first, last = numpy.triu_indices(len(at))
+        expect = [at._lca(int(i), int(j)) for i, j in zip(first, last)]
+        self.assertEqual(at._lca(first, last).tolist(), expect)
+
+    def test_get_sub_tree(self):
+        """sub trees match PhyloNode, including merged lengths"""
+        at = self.array_tree
+        for names in (["a", "e", "f"], ["a", "d", "e"], ["cde", "g", "h"]):
+            for keep_root in (False, True):
+                expect = self.tree.get_sub_tree(names, keep_root=keep_root)
+                got = at.get_sub_tree(names, keep_root=keep_root)
+                self.assertIsInstance(got, ArrayTree)
+                assert_allclose(
+                    got.tip_to_tip_distances()[0], expect.tip_to_tip_distances()[0]
+                )
+                self.assertEqual(got.to_tree().get_newick(), expect.get_newick(), names)
+        names = ["cde", "a", "f"]
+        expect = self.tree.get_sub_tree(names, ignore_missing=True, tipsonly=True)
+        got = at.get_sub_tree(names, ignore_missing=True, tipsonly=True)
+        self.assertEqual(got.get_tip_names(), expect.get_tip_names())
+        with self.assertRaises(ValueError):
+            at.get_sub_tree(["a", "missing"])
+        with self.assertRaises(TreeError):
+            at.get_sub_tree(["a"])
+
+    def test_get_sub_tree_zero_length_chain(self):
+        """merged lengths are None when a partial sum is zero, as PhyloNode"""
+        for newick in (
+            "((((a:0,b:1)x:0,c:1)y:1,d:1)z:0,(e:0,f:1)w:0,g:1)root;",
+            "((((a:0,b:1)x:1,c:1)y:-1,d:1)z:0,(e:0.5,f:1)w:-0.5,g:1)root;",
+        ):
+            tree = make_tree(newick)
+            at = ArrayTree.from_tree(tree)
+            for names in (["a", "d"], ["a", "e"], ["b", "f"], ["x", "e"]):
+                expect = tree.get_sub_tree(names).get_newick(with_distances=True)
+                got = at.get_sub_tree(names).to_tree()
+                self.assertEqual(got.get_newick(with_distances=True), expect)
+        # a chain of zero lengths above a positive length is also None
+        tree = make_tree("((((a:0,b:1)x:0,c:1)y:1,d:1)z:0,(e:0,f:1)w:0,g:1)root;")
+        got = ArrayTree.from_tree(tree).get_sub_tree(["a", "d"])
+        self.assertTrue(numpy.isnan(got.lengths[got.get_node_index("a")]))
+
+
 # run if called from command line
 if __name__ == "__main__":
     main()
@@ -856,6 +856,15 @@ class DistancesTests(TestCase):
         result = d.get_pairwise_distances().to_dict()
         self.assertDistsAlmostEqual(canned_result, result)
 
+    def test_EstimateDistances_combinations(self):
+        """only the requested combinations are estimated"""
+        d = EstimateDistances(self.collection, JC69(), do_pair_align=True)
+        d.run(combinations=[("c", "a"), ("b", "e")], show_progress=False)
+        result = d.get_pairwise_distances().to_dict()
+        self.assertDistsAlmostEqual(
+            {("a", "c"): 0.088337, ("b", "e"): 0.440840}, result
+        )
+
     def test_EstimateDistances_other_model_params(self):
         """test getting other model params from EstimateDistances"""
         d = EstimateDistances(self.al, HKY85(), est_params=["kappa"])
@@ -3,8 +3,16 @@
 """
 import os
 
+from tempfile import TemporaryDirectory
 from unittest import TestCase, main
 
+import numpy
+
+from numpy.testing import assert_equal
+
+from cogent3 import make_aligned_seqs
+from cogent3.core.alignment import ArrayAlignment, SequenceCollection
+from cogent3.core.alphabet import AlphabetError
 from cogent3.core.info import Info
 from cogent3.core.sequence import DnaSequence
 from cogent3.core.sequence import ProteinSequence as Protein
@@ -12,11 +20,15 @@ from cogent3.core.sequence import Sequence
 from cogent3.parse.fasta import (
     FastaParser,
     GroupFastaParser,
+    IndexedFasta,
     LabelParser,
     MinimalFastaParser,
     NcbiFastaLabelParser,
     NcbiFastaParser,
     RichLabel,
+    fasta_bytes_parser,
+    fasta_to_seqs,
+    make_fasta_index,
 )
 from cogent3.parse.record import RecordError
 
@@ -135,6 +147,143 @@ class MinimalFastaParserTests(GenericFastaTest):
         self.assertTrue("Human" in seqs)
 
 
+class FastaBytesParserTests(GenericFastaTest):
+    """Tests of fasta_bytes_parser and fasta_to_seqs"""
+
+    def _parsed(self, lines, newline="\n", **kwargs):
+        data = newline.join(lines).encode("utf-8")
+        names, seqs, lengths = fasta_bytes_parser(data, **kwargs)
+        seqs = seqs.tobytes().decode("utf-8")
+        ends = numpy.cumsum(lengths)
+        return [(n, seqs[e - l : e]) for n, e, l in zip(names, ends, lengths)]
+
+    def test_same_as_minimal(self):
+        """fasta_bytes_parser matches MinimalFastaParser"""
+        for lines in (self.empty, self.oneseq, self.multiline, self.threeseq):
+            expect = list(MinimalFastaParser(lines))
+            for newline in ("\n", "\r\n", "\r"):
+                self.assertEqual(self._parsed(lines, newline=newline), expect)
+
+        for name in ("brca1.fasta", "formattest.fasta.gz", "long_testseqs.fasta"):
+            path = os.path.join(data_path, name)
+            names, seqs, lengths = fasta_bytes_parser(path)
+            expect = list(MinimalFastaParser(path))
+            self.assertEqual(names, [n for n, _ in expect])
+            self.assertEqual(lengths.tolist(), [len(s) for _, s in expect])
+            self.assertEqual(seqs.tobytes().decode(), "".join(s for _, s in expect))
+
+    def test_bad(self):
+        """fasta_bytes_parser complains or skips bad records"""
+        self.assertRaises(RecordError, self._parsed, self.labels)
+        self.assertRaises(RecordError, self._parsed, self.nolabels)
+        self.assertRaises(RecordError, self._parsed, self.twogood)
+        self.assertEqual(self._parsed(self.labels, strict=False), [])
+        self.assertEqual(self._parsed(self.nolabels, strict=False), [])
+        self.assertEqual(
+            self._parsed(self.twogood, strict=False), [("abc", "caggac"), ("456", "cg")]
+        )
+
+    def test_fasta_to_seqs(self):
+        """fasta_to_seqs returns ArrayAlignment or SequenceCollection"""
+        data = b">a x\nacgt\nAC\n\n>b\nAC-T\n#comment\nNN\n"
+        aln = fasta_to_seqs(data, moltype="dna")
+        self.assertIsInstance(aln, ArrayAlignment)
+        self.assertEqual(aln.names, ["a x", "b"])
+        self.assertEqual(aln.to_dict(), {"a x": "ACGTAC", "b": "AC-TNN"})
+        expect = make_aligned_seqs(
+            {"a x": "ACGTAC", "b": "AC-TNN"}, moltype="dna", array_align=True
+        )
+        assert_equal(aln.array_seqs, expect.array_seqs)
+        # bytes moltype preserves case
+        aln = fasta_to_seqs(data, label_to_name=lambda x: x.split()[0])
+        self.assertEqual(aln.to_dict(), {"a": "acgtAC", "b": "AC-TNN"})
+        seqs = fasta_to_seqs(data, moltype="dna", aligned=False)
+        self.assertIsInstance(seqs, SequenceCollection)
+        self.assertEqual(seqs.to_dict(), {"a x": "ACGTAC", "b": "AC-TNN"})
+        # unequal lengths, invalid characters
+        with self.assertRaises(ValueError):
+            fasta_to_seqs(b">a\nACGT\n>b\nACG\n", moltype="dna")
+        with self.assertRaises(AlphabetError):
+            fasta_to_seqs(b">a\nACGT\n>b\nACGJ\n", moltype="dna")
+
+    def test_fasta_to_seqs_path(self):
+        """fasta_to_seqs consistent with load_aligned_seqs"""
+        path = os.path.join(data_path, "brca1.fasta")
+        got = fasta_to_seqs(path, moltype="dna")
+        expect = ArrayAlignment(list(MinimalFastaParser(path)), moltype="dna")
+        self.assertEqual(got.names, expect.names)
+        assert_equal(got.array_seqs, expect.array_seqs)
+
+
+class IndexedFastaTests(TestCase):
+    """Tests of faidx compatible indexing and IndexedFasta"""
+
+    def setUp(self):
+        self.dirname = TemporaryDirectory(dir=".")
+        self.path = os.path.join(self.dirname.name, "test.fasta")
+        self.seqs = {
+            "a": "ACGTACGTAC" * 13,
+            "b": "TTGCA" * 4,
+            "c": "",
+            "d": "ACGTA",
+            "e": "GGGCC" * 6,
+        }
+        with open(self.path, "w") as out:
+            for name, seq in self.seqs.items():
+                out.write(f">{name} description\n")
+                out.writelines(seq[i : i + 30] + "\n" for i in range(0, len(seq), 30))
+
+    def tearDown(self):
+        self.dirname.cleanup()
+
+    def test_make_fasta_index(self):
+        """index matches that of samtools faidx"""
+        expect = [
+            ("a", 130, 15, 30, 31),
+            ("b", 20, 165, 20, 21),
+            ("c", 0, 201, 0, 0),
+            ("d", 5, 216, 5, 6),
+            ("e", 30, 237, 30, 31),
+        ]
+        self.assertEqual(make_fasta_index(self.path), expect)
+        with open(self.path, "a") as out:
+            out.write(">f\nACGT\nACGTA\nA\n")
+        with self.assertRaises(ValueError):
+            make_fasta_index(self.path)
+
+    def test_make_fasta_index_duplicates(self):
+        """duplicate sequence names raise a ValueError"""
+        with open(self.path, "a") as out:
+            out.write(">b other\nACGT\n")
+        with self.assertRaises(ValueError):
+            make_fasta_index(self.path)
+
+    def test_indexed_fasta(self):
+        """IndexedFasta returns sequences and regions"""
+        seqs = IndexedFasta(self.path, moltype="dna")
+        self.assertFalse(os.path.exists(self.path + ".fai"))
+        self.assertEqual(seqs.names, list(self.seqs))
+        self.assertTrue(os.path.exists(self.path + ".fai"))
+        self.assertEqual(seqs.to_dict(), self.seqs)
+        self.assertEqual(seqs.seq_lengths["a"], 130)
+        for start, end in [(0, 30), (5, 31), (29, 91), (-7, None), (4, 4), (3, 200)]:
+            got = seqs.get_seq("a", start=start, end=end)
+            self.assertEqual(str(got), self.seqs["a"][start:end])
+            self.assertEqual(got.name, "a")
+        got = seqs.take_seqs(["e", "b"])
+        self.assertIsInstance(got, SequenceCollection)
+        self.assertEqual(got.to_dict(), {"e": self.seqs["e"], "b": self.seqs["b"]})
+        self.assertEqual(got.moltype.label, "dna")
+        self.assertEqual(seqs.take_seqs(["a", "b", "c"], negate=True).names, ["d", "e"])
+        seqs.close()
+
+        # existing index is used
+        with open(self.path + ".fai", "w") as out:
+            out.write("x\t4\t15\t30\t31\n")
+        with IndexedFasta(self.path) as seqs:
+            self.assertEqual(seqs.to_dict(), {"x": "ACGT"})
+
+
 class FastaParserTests(GenericFastaTest):
     """Tests of FastaParser: returns sequence objects."""
 
@@ -148,6 +148,40 @@ class GffTest(TestCase):
         # 15 total lines, but 2 comments
         self.assertEqual(i + 1, 15 - 2)
 
+    def test_gff_records(self):
+        """gff_records produces the same records as gff_parser"""
+        for path in ("data/gff2_test.gff", "data/c_elegans_WS199_shortened_gff.gff3"):
+            expect = list(gff_parser(path))
+            for chunk_size in (2, 100):
+                got = gff_records(path, chunk_size=chunk_size)
+                self.assertEqual(len(got), len(expect))
+                self.assertEqual(list(got), expect)
+
+        data = "".join([x[0] for x in data_lines])
+        got = gff_records(StringIO(data))
+        self.assertFalse(got.gff3)
+        self.assertEqual(list(got), list(gff_parser(StringIO(data))))
+        self.assertEqual(got["End"].tolist(), [x[1][4] for x in data_lines])
+
+    def test_gff_records_filtered(self):
+        """gff_records filters by seqid and type, subsets by index"""
+        gff3_path = "data/c_elegans_WS199_shortened_gff.gff3"
+        expect = list(gff_parser(gff3_path))
+        got = gff_records(gff3_path, types=["exon", "CDS"])
+        self.assertEqual(list(got), [r for r in expect if r["Type"] in ("exon", "CDS")])
+        got = gff_records(gff3_path, seqids=["not present"])
+        self.assertEqual(len(got), 0)
+        self.assertEqual(list(got), [])
+
+        got = gff_records(gff3_path)
+        self.assertEqual(got.ids.tolist(), [r["Attributes"]["ID"] for r in expect])
+        self.assertEqual(
+            got.parents, [r["Attributes"].get("Parent", []) for r in expect]
+        )
+        subset = got[got["Type"] == "mRNA"]
+        self.assertEqual(list(subset), [r for r in expect if r["Type"] == "mRNA"])
+        self.assertEqual(got[3], expect[3])
+
 
 if __name__ == "__main__":
     main()
@@ -1,21 +1,42 @@
 #! /usr/bin/env python
 import os
+import pickle
 import unittest
 import warnings
 
 from numpy import exp, log
 
 from cogent3 import get_model, load_aligned_seqs, load_tree, make_tree
-from cogent3.phylo.consensus import get_splits, get_tree, majority_rule
-from cogent3.phylo.least_squares import wls
+from cogent3.phylo.consensus import (
+    get_split_bits,
+    get_split_support,
+    get_splits,
+    get_tree,
+    majority_rule,
+    robinson_foulds,
+    robinson_foulds_matrix,
+)
+from cogent3.phylo.least_squares import (
+    WLS,
+    _ancestry2tips,
+    _normal_equations,
+    wls,
+)
 from cogent3.phylo.maximum_likelihood import ML
 from cogent3.phylo.nj import gnj, nj
+from cogent3.phylo.nj_numba import nj_joins
 from cogent3.phylo.tree_collection import (
     LogLikelihoodScoredTreeCollection,
     ScoredTreeCollection,
     WeightedTreeCollection,
     make_trees,
 )
+from cogent3.phylo.tree_space import (
+    ancestry2splits,
+    nni_rearrangements,
+    spr_rearrangements,
+    tree2ancestry,
+)
 from cogent3.util.misc import remove_files
 
 
@@ -408,6 +429,69 @@ class ConsensusTests(unittest.TestCase):
         tree = load_tree(os.path.join(data_path, "murphy.tree"))
         self.assertTrue(tree.same_topology(get_tree(get_splits(tree))))
 
+    def test_get_split_bits(self):
+        """splits are encoded by the side without the first tip"""
+        tree = Tree("((a:1,b:2):3,c:4,(d:5,e:6):7);")
+        tip_index = {n: i for i, n in enumerate("abcde")}
+        got = get_split_bits(tree, tip_index)
+        expect = {
+            0b11110: 1,
+            0b00010: 2,
+            0b11100: 3,
+            0b00100: 4,
+            0b01000: 5,
+            0b10000: 6,
+            0b11000: 7,
+        }
+        self.assertEqual(got, expect)
+        # the same splits from a tree rooted elsewhere
+        rerooted = tree.rooted_with_tip("d")
+        self.assertEqual(set(get_split_bits(rerooted, tip_index)), set(expect))
+
+    def test_robinson_foulds(self):
+        """counts splits present in only one tree"""
+        tree1 = Tree("((a:1,b:2):3,c:4,(d:5,e:6):7);")
+        tree2 = Tree("((a:1,c:2):3,b:4,(d:5,e:6):7);")
+        self.assertEqual(robinson_foulds(tree1, tree1), 0)
+        self.assertEqual(robinson_foulds(tree1, tree2), 2)
+        self.assertEqual(robinson_foulds(tree1, tree1.rooted_with_tip("c")), 0)
+        # branch lengths: a 1, b 2 vs 4, c 4 vs 2, ab 3 and ac 3
+        self.assertAlmostEqual(robinson_foulds(tree1, tree2, weighted=True), 10)
+        with self.assertRaises(ValueError):
+            robinson_foulds(tree1, Tree("((a,b),c,(d,f));"))
+
+    def test_robinson_foulds_matrix(self):
+        """pairwise distances match robinson_foulds"""
+        trees = [
+            Tree("((a:1,b:2):3,c:4,(d:5,e:6):7);"),
+            Tree("((a:1,c:2):3,b:4,(d:5,e:6):7);"),
+            Tree("(((a,b),c),d,e);"),
+            Tree("(a,b,c,d,e);"),
+        ]
+        for weighted in (False, True):
+            got = robinson_foulds_matrix(trees, weighted=weighted)
+            self.assertEqual(got.shape, (4, 4))
+            for i, tree1 in enumerate(trees):
+                for j, tree2 in enumerate(trees):
+                    expect = robinson_foulds(tree1, tree2, weighted=weighted)
+                    self.assertAlmostEqual(got[i, j], expect)
+        with self.assertRaises(ValueError):
+            robinson_foulds_matrix(trees + [Tree("((a,b),c,(d,f));")])
+
+        sct = ScoredTreeCollection([(1, t) for t in trees])
+        dists = sct.get_robinson_foulds()
+        self.assertEqual(dists[0, 1], 2)
+        self.assertEqual(dists.shape, (4, 4))
+
+    def test_get_split_support(self):
+        """proportion of trees with each edge"""
+        support = get_split_support(Tree("((a,b)ab,c,d);"), self.trees)
+        self.assertEqual(support, {"ab": 0.75})
+        tree = Tree("((a,b)ab,c,(d,e)de);")
+        trees = [Tree("((a,b),(c,(d,e)));"), Tree("((a,c),b,(d,e));")]
+        support = get_split_support(tree, trees)
+        self.assertEqual(support, {"ab": 0.5, "de": 1.0})
+
     def test_consensus_tree_branch_lengths(self):
         """consensus trees should average branch lengths properly"""
 
@@ -509,6 +593,40 @@ class TreeReconstructionTests(unittest.TestCase):
         reconstructed = nj(self.dists, show_progress=False)
         self.assertTreeDistancesEqual(self.tree, reconstructed)
 
+    def test_nj_large(self):
+        """nj recovers a larger additive tree, from a DistanceMatrix"""
+        lengths = iter(range(100))
+
+        def get_clade(names):
+            length = 1 + next(lengths) / 17
+            if len(names) == 1:
+                return "%s:%s" % (names[0], length)
+            half = len(names) // 3 + 1
+            left, right = get_clade(names[:half]), get_clade(names[half:])
+            return "(%s,%s):%s" % (left, right, length)
+
+        names = ["t%d" % i for i in range(40)]
+        tree = make_tree(treestring="(%s,t40);" % get_clade(names))
+        dists = tree.get_distance_matrix()
+        reconstructed = nj(dists, show_progress=False)
+        self.assertTreeDistancesEqual(tree, reconstructed)
+        self.assertEqual(len(reconstructed.children), 3)
+
+        def get_clades(joins):
+            clades = [frozenset([i]) for i in range(len(names) + 1)]
+            for i, j in joins.tolist():
+                clades.append(clades[i] | clades[j])
+            return set(clades)
+
+        # only keeping the nearest node to each node sorted gives the same tree
+        expect = nj_joins(dists.array.copy())
+        got = nj_joins(dists.array.copy(), width=1)
+        self.assertAlmostEqual(got[-1], expect[-1])
+        self.assertEqual(get_clades(got[0]), get_clades(expect[0]))
+
+        with self.assertRaises(ValueError):
+            nj({("a", "b"): 1.0}, show_progress=False)
+
     def test_gnj(self):
         """testing gnj"""
         results = gnj(self.dists, keep=1, show_progress=False)
@@ -546,6 +664,65 @@ class TreeReconstructionTests(unittest.TestCase):
         reconstructed = wls(self.dists, a=4, show_progress=False)
         self.assertTreeDistancesEqual(self.tree, reconstructed)
 
+    def test_wls_normal_equations(self):
+        """normal equations match those from the tip-to-tip path matrix"""
+        from numpy import array, dot, random
+        from numpy.testing import assert_allclose
+
+        tree = Tree("((a,b),(c,(d,e)),(f,(g,h)))")
+        (ancestry, names, lengths) = tree2ancestry(tree)
+        tips = _ancestry2tips(ancestry)
+        num = len(names)
+        weights = random.uniform(size=(num, num))
+        weights = weights + weights.T
+        weights[range(num), range(num)] = 0
+        dists = random.uniform(size=(num, num))
+        dists = dists + dists.T
+        paths = []
+        path_weights = []
+        path_dists = []
+        for i in range(num):
+            for j in range(i):
+                paths.append(tips[i] != tips[j])
+                path_weights.append(weights[i, j])
+                path_dists.append(dists[i, j])
+        paths = array(paths, float)
+        path_weights = array(path_weights)
+        X, y = _normal_equations(ancestry, tips, weights, weights * dists)
+        assert_allclose(X, dot(paths.T * path_weights, paths))
+        assert_allclose(y, dot(paths.T, path_weights * array(path_dists)))
+
+    def test_wls_cache(self):
+        """caching scored trees does not change wls results"""
+        expect = WLS(self.dists).trex(k=5, return_all=True, show_progress=False)
+        evaluator = WLS(self.dists)
+        for k in (2, 5, 5):
+            got = evaluator.trex(k=k, return_all=True, cache=True, show_progress=False)
+        self.assertEqual(len(got), len(expect))
+        for ((err1, tree1), (err2, tree2)) in zip(got, expect):
+            self.assertEqual(err1, err2)
+            self.assertTrue(tree1.same_topology(tree2))
+        # cached trees are not sent to worker processes
+        self.assertTrue(len(evaluator._score_cache) > 0)
+        self.assertIsNone(pickle.loads(pickle.dumps(evaluator))._score_cache)
+
+    def test_ancestry2splits(self):
+        """topologies are identified by their splits, not their edge order"""
+        names = ["a", "b", "c", "d", "e"]
+        trees = [
+            "((a,b),c,(d,e))",
+            "((d,e),(a,b),c)",
+            "(a,b,(c,(d,e)))",
+            "((a,c),b,(d,e))",
+        ]
+        keys = [
+            ancestry2splits(tree2ancestry(Tree(t), order=names)[0], names)
+            for t in trees
+        ]
+        self.assertEqual(keys[0], keys[1])
+        self.assertEqual(keys[0], keys[2])
+        self.assertNotEqual(keys[0], keys[3])
+
     def test_truncated_wls(self):
         """testing wls with order option"""
         order = ["e", "b", "c", "d"]
@@ -582,6 +759,51 @@ class TreeReconstructionTests(unittest.TestCase):
         assert_allclose(lnL, -8882.217502905267)
         self.assertTrue(tree.same_topology(make_tree("(Mouse,Rat,(Human,Dog));")))
 
+        # the evaluator can be sent to worker processes
+        evaluator = pickle.loads(pickle.dumps(ML(model, aln)))
+        lnL, tree = evaluator.trex(a=3, k=1, show_progress=False)
+        assert_allclose(lnL, -8882.217502905267)
+
+    def test_rearrangements(self):
+        """nni and spr give the expected number of distinct neighbours"""
+        tree = Tree("((a:1,b:2),(c:4,d:5),(e:7,(f:8,g:9)));")
+        num = len(tree.get_tip_names())
+        lengths = dict((tip.name, tip.length) for tip in tree.tips())
+        nni = list(nni_rearrangements(tree))
+        self.assertEqual(len(nni), 2 * (num - 3))
+        spr = list(spr_rearrangements(tree, radius=num))
+        self.assertEqual(len(spr), 2 * (num - 3) * (2 * num - 7))
+        # nni are the spr within 2 nodes
+        spr = [t for (t, edges) in spr_rearrangements(tree, radius=2)]
+        for (rearranged, edges) in nni:
+            self.assertEqual(len(rearranged.get_tip_names()), num)
+            self.assertEqual(len(rearranged.children), 3)
+            self.assertFalse(rearranged.same_topology(tree))
+            self.assertEqual(sum(t.same_topology(rearranged) for t in spr), 1)
+            # lengths of unchanged edges are kept
+            for tip in rearranged.tips():
+                if tip.name not in edges:
+                    self.assertEqual(tip.length, lengths[tip.name])
+
+    def test_ml_tree_search(self):
+        """tree rearrangement search finds the best topology"""
+        aln = load_aligned_seqs(os.path.join(data_path, "brca1.fasta"), moltype="dna")
+        aln = aln.take_seqs(["Human", "Mouse", "Rat", "Dog", "Cat"])
+        aln = aln.omit_gap_pos(allowed_gap_frac=0)
+        model = get_model("JC69")
+        expect, expect_tree = ML(model, aln).trex(show_progress=False)
+        start = make_tree("((Human,Rat),Mouse,(Dog,Cat));")
+        for moves in ("nni", "spr"):
+            lnL, tree = ML(model, aln).tree_search(start, moves=moves)
+            self.assertAlmostEqual(lnL, expect, places=3)
+            self.assertTrue(tree.same_topology(expect_tree))
+
+        lnL, tree = ML(model, aln).tree_search(start, max_rounds=0)
+        self.assertTrue(tree.same_topology(start))
+        self.assertLess(lnL, expect)
+        with self.assertRaises(ValueError):
+            ML(model, aln).tree_search(start, moves="tbr")
+
 
 if __name__ == "__main__":
     unittest.main()